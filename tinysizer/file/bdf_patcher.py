@@ -0,0 +1,269 @@
+import os
+import re
+from pyNastran.bdf.field_writer_8 import print_field_8
+from pyNastran.bdf.field_writer_16 import print_field_16
+
+# Property cards the sizing writes back
+PATCHED_CARDS = ("PSHELL", "PCOMP", "PBARL")
+
+_CARD_START = re.compile(rb"^(PSHELL|PCOMP|PBARL)(\*?)[ \t,]", re.M | re.I)
+_INCLUDE = re.compile(rb"^INCLUDE[ \t]", re.M | re.I)
+
+
+def property_field_updates(card_type, values):
+    """
+    Card field numbers (card name = field 0, continuation fields not counted) to new values
+
+    Args:
+        card_type: "PSHELL", "PCOMP" or "PBARL"
+        values: {'t': thickness} for PSHELL, {'thicknesses': [ply t, ...]} or a new stack
+                {'plies': [(MID, T, THETA, SOUT), ...], 'old_ply_count': n, 'lam': LAM}
+                for PCOMP, {'dims': [DIM1, ...]} for PBARL
+    """
+    if card_type == "PSHELL":
+        return {3: values['t']}
+    if card_type == "PCOMP" and 'plies' in values:
+        # plies of the old stack beyond the new one are blanked (empty lines are dropped)
+        fields = {9 + i: "" for i in range(4 * values.get('old_ply_count', 0))}
+        for i, ply in enumerate(values['plies']):
+            fields.update({9 + 4 * i + k: value for k, value in enumerate(ply)})
+        if 'lam' in values:
+            fields[8] = values['lam']
+        return fields
+    if card_type == "PCOMP":
+        # plies start at field 9 as MID, T, THETA, SOUT
+        return {10 + 4 * i: t for i, t in enumerate(values['thicknesses'])}
+    if card_type == "PBARL":
+        return {9 + i: dim for i, dim in enumerate(values['dims'])}
+    raise ValueError(f"Card {card_type} can not be patched")
+
+
+class BdfPropertyPatcher:
+    """
+    Writes sized property values back into a copy of a Nastran deck
+
+    The deck (and every INCLUDE file) is scanned once for the byte ranges of its PSHELL,
+    PCOMP and PBARL cards. Writing replaces only the fields of those cards and copies the
+    remaining bytes as they are, so card order, comments and INCLUDE structure are kept.
+    Files holding changed cards (and the files including them) are written next to the
+    originals with a suffix; the INCLUDE statements are redirected to the patched copies.
+    """
+    def __init__(self, bdf_file):
+        self.bdf_file = os.path.abspath(bdf_file)
+        self.cards = {}     # pid -> {'path', 'start', 'end', 'type', 'format'}
+        self.includes = {}  # path -> [{'start', 'end', 'text', 'target'}]
+        self.files = []
+        self._index_file(self.bdf_file)
+        print(f"Indexed {len(self.cards)} property cards in {len(self.files)} file(s)")
+
+    #########################################
+    # I N D E X
+    #########################################
+    def _index_file(self, path):
+        if path in self.files:
+            return
+        self.files.append(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        for match in _CARD_START.finditer(data):
+            start = match.start()
+            end = self._card_end(data, start)
+            line_end = data.find(b"\n", start)
+            first_line = data[start:line_end if line_end != -1 else end]
+            fmt = "free" if b"," in first_line[:10] else ("large" if match.group(2) else "small")
+            card_type = match.group(1).decode().upper()
+            try:
+                pid = int(self._split_line(first_line.decode("latin-1").rstrip("\r\n"), fmt)[1][0].strip())
+            except (ValueError, IndexError):
+                continue
+            if pid in self.cards:
+                print(f"Warning: property {pid} is defined more than once, the last card is patched")
+            self.cards[pid] = {'path': path, 'start': start, 'end': end, 'type': card_type, 'format': fmt}
+
+        includes = []
+        for match in _INCLUDE.finditer(data):
+            start = match.start()
+            end = self._include_end(data, start)
+            text = data[start:end].decode("latin-1")
+            target = self._include_target(text, path)
+            includes.append({'start': start, 'end': end, 'text': text, 'target': target})
+        self.includes[path] = includes
+
+        for include in includes:
+            if include['target'] and os.path.exists(include['target']):
+                self._index_file(include['target'])
+            else:
+                print(f"Warning: INCLUDE file not found: {include['target']}")
+
+    @staticmethod
+    def _card_end(data, start):
+        """Byte offset after the last continuation line of the card starting at start"""
+        pos = data.find(b"\n", start)
+        while pos != -1:
+            next_pos = pos + 1
+            line_end = data.find(b"\n", next_pos)
+            line = data[next_pos:line_end if line_end != -1 else len(data)]
+            # continuation lines start with +, * or a blank first field; blank and comment lines end the card
+            if not line.strip() or line[:1] not in (b"+", b"*", b" ", b",", b"\t"):
+                return next_pos
+            pos = line_end
+        return len(data)
+
+    @staticmethod
+    def _include_end(data, start):
+        """INCLUDE statements continue on further lines until the quotes are balanced"""
+        pos = start
+        while True:
+            line_end = data.find(b"\n", pos)
+            if line_end == -1:
+                return len(data)
+            if data[start:line_end].count(b"'") % 2 == 0:
+                return line_end + 1
+            pos = line_end + 1
+
+    def _include_target(self, text, including_path):
+        body = text.strip()[len("INCLUDE"):]
+        if "'" in body:
+            name = "".join(part.strip() for part in body.split("'")[1::2][0].splitlines())
+        else:
+            name = body.strip()
+        if os.path.isabs(name):
+            return name
+        # Relative to the main deck first (how Nastran is usually started), then to the including file
+        for base in (os.path.dirname(self.bdf_file), os.path.dirname(including_path)):
+            candidate = os.path.normpath(os.path.join(base, name))
+            if os.path.exists(candidate):
+                return candidate
+        return os.path.normpath(os.path.join(os.path.dirname(including_path), name))
+
+    #########################################
+    # F I E L D S
+    #########################################
+    @staticmethod
+    def _split_line(line, fmt):
+        """(leading field, data fields, trailing continuation) of one physical line, fields unstripped"""
+        if fmt == "free":
+            parts = [part.strip() for part in line.split(",")]
+            return parts[0], parts[1:9], ",".join(parts[9:])
+        width, count = (16, 4) if fmt == "large" else (8, 8)
+        line = line.ljust(8 + width * count)
+        fields = [line[8 + i * width:8 + (i + 1) * width] for i in range(count)]
+        return line[:8], fields, line[8 + width * count:].rstrip()
+
+    @staticmethod
+    def _join_line(head, fields, tail, fmt):
+        """Physical line from split fields, untouched fields keep their original text"""
+        if fmt == "free":
+            fields = [value if isinstance(value, str) else print_field_16(value).strip() for value in fields]
+            return ",".join([head.strip()] + fields + ([tail] if tail else [])).rstrip(",")
+        width = 16 if fmt == "large" else 8
+        writer = print_field_16 if fmt == "large" else print_field_8
+        text = head.ljust(8)
+        for value in fields:
+            text += writer(value) if not isinstance(value, str) else value.ljust(width)[:width]
+        return (text + tail).rstrip()
+
+    def _patch_card(self, card_bytes, fmt, field_values):
+        """Card text with the given card fields replaced"""
+        text = card_bytes.decode("latin-1")
+        newline = "\r\n" if "\r\n" in text else "\n"
+        lines = text.split(newline)
+        trailing = lines.pop() if lines and lines[-1] == "" else None
+        per_line = 4 if fmt == "large" else 8
+
+        split = [list(self._split_line(line, fmt)) for line in lines]
+        changed = set()
+        for field, value in field_values.items():
+            line_idx, pos = divmod(field - 1, per_line)
+            while line_idx >= len(split):
+                # A short card gets new continuation lines, named after the previous continuation field
+                marker = split[-1][2].strip(", ") or ("*" if fmt == "large" else "+")
+                split.append([marker, [""] * per_line, ""])
+                lines.append("")
+                changed.add(len(split) - 1)
+            fields = split[line_idx][1]
+            while len(fields) <= pos:
+                fields.append("")
+            fields[pos] = value
+            changed.add(line_idx)
+
+        # Continuation lines left without any field (shortened ply stacks) are dropped
+        while len(split) > 1 and len(split) - 1 in changed and not any(str(f).strip() for f in split[-1][1]):
+            split.pop()
+            lines.pop()
+            split[-1][2] = ""  # no continuation follows anymore
+            changed.add(len(split) - 1)
+
+        # Lines without changed fields are kept byte for byte
+        lines = [self._join_line(*split[i], fmt) if i in changed else line for i, line in enumerate(lines)]
+        if trailing is not None:
+            lines.append(trailing)
+        return newline.join(lines).encode("latin-1")
+
+    #########################################
+    # W R I T E
+    #########################################
+    def write(self, updates, suffix="_sized"):
+        """
+        Write a patched copy of the deck
+
+        Args:
+            updates: {pid: values} as accepted by property_field_updates (per card type)
+            suffix: Added to the file name of every written file
+
+        Returns:
+            str: Path of the patched main deck
+        """
+        patches = {}
+        for pid, values in updates.items():
+            if pid not in self.cards:
+                print(f"Warning: property {pid} not found in the deck, not written")
+                continue
+            card = self.cards[pid]
+            patches.setdefault(card['path'], []).append((card, property_field_updates(card['type'], values)))
+
+        # A file is rewritten if it has patched cards or includes a rewritten file
+        dirty = set(patches) | {self.bdf_file}
+        changed = True
+        while changed:
+            changed = False
+            for path, includes in self.includes.items():
+                if path not in dirty and any(include['target'] in dirty for include in includes):
+                    dirty.add(path)
+                    changed = True
+
+        for path in dirty:
+            with open(path, "rb") as f:
+                data = f.read()
+
+            edits = [(card['start'], card['end'], self._patch_card(data[card['start']:card['end']], card['format'], fields))
+                     for card, fields in patches.get(path, [])]
+            for include in self.includes.get(path, []):
+                if include['target'] in dirty:
+                    text = include['text']
+                    name = os.path.basename(include['target'])
+                    edits.append((include['start'], include['end'],
+                                  text.replace(name, self.output_name(name, suffix)).encode("latin-1")))
+
+            chunks, pos = [], 0
+            for start, end, replacement in sorted(edits):
+                chunks.append(data[pos:start])
+                chunks.append(replacement)
+                pos = end
+            chunks.append(data[pos:])
+
+            with open(self.output_path(path, suffix), "wb") as f:
+                f.write(b"".join(chunks))
+
+        output = self.output_path(self.bdf_file, suffix)
+        print(f"Wrote {sum(len(p) for p in patches.values())} property cards to {output}")
+        return output
+
+    @staticmethod
+    def output_name(name, suffix):
+        stem, ext = os.path.splitext(name)
+        return f"{stem}{suffix}{ext}"
+
+    def output_path(self, path, suffix):
+        return os.path.join(os.path.dirname(path), self.output_name(os.path.basename(path), suffix))
@@ -0,0 +1,369 @@
+"""
+Linear load case combinations
+
+A combination matrix F (n_combination x n_subcase) defines every combination as a factored
+sum of Nastran subcases, e.g. 1.5 (SC1 + 0.8 SC2) is the row [1.5, 1.2]. The result of a
+combination is the matrix product of its row with the stacked subcase data arrays of a
+result table; derived columns (principal stresses, von Mises, bar extremes) are computed
+again from the combined components since they are not linear.
+
+Combinations get IDs of their own and are installed into the OP2 result tables and
+ModelData.results as CombinedTable entries: the tables list the combination IDs like
+subcase IDs and build the combined pyNastran object on first access, so combinations can
+be viewed, enveloped and sized wherever a subcase ID is accepted.
+
+Many combinations over large meshes are never materialized: combination_envelope tiles
+the product over element blocks x combination blocks within a memory budget and reduces
+every tile straight to the envelope and critical combination IDs, tiles of different
+element blocks running in a thread pool.
+
+File layout (CSV or Excel, first sheet): one row per combination, the first column holds
+the combination ID, the subcase columns are headed by the subcase ID ("1", "SC1",
+"SUBCASE 1"); other text columns (e.g. a name) are kept as combination names.
+"""
+import copy
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from tinysizer.file.envelope import ENVELOPE, RESULT_TABLES, op2_result_table, result_arrays
+from tinysizer.file.principal import principal_values
+
+# Bytes of combined values held at once by the chunked executor (all worker tiles together)
+COMBINATION_MEMORY_BUDGET = 256 * 2**20
+
+# Worker threads of the chunked executor (numpy matmul releases the GIL)
+COMBINATION_WORKERS = min(8, os.cpu_count() or 1)
+
+# Preferred combinations per tile (matmul rows)
+COMBINATION_BLOCK = 1024
+
+# Result columns that are not linear in the loads (recomputed by update_derived_columns)
+NONLINEAR_COLUMNS = {'fiber_distance', 'fiber_curvature', 'angle', 'omax', 'omin', 'major', 'minor',
+                     'emax', 'emin', 'von_mises', 'max_shear', 'smaxa', 'smina', 'smaxb', 'sminb',
+                     'MS_tension', 'MS_compression'}
+
+
+class LoadCombinations:
+    def __init__(self, combination_ids, subcase_ids, factors, names=None):
+        self.combination_ids = np.asarray(combination_ids, dtype=int)
+        self.subcase_ids = np.asarray(subcase_ids, dtype=int)
+        self.factors = np.asarray(factors, dtype=float)  # (n_combination, n_subcase)
+        self.names = list(names) if names is not None else [f"COMB {cid}" for cid in self.combination_ids]
+        if self.factors.shape != (len(self.combination_ids), len(self.subcase_ids)):
+            raise ValueError("Combination matrix does not match its combination / subcase IDs")
+        if len(np.unique(self.combination_ids)) != len(self.combination_ids):
+            raise ValueError("Combination IDs are not unique")
+        self._rows = {int(cid): k for k, cid in enumerate(self.combination_ids)}
+
+    @classmethod
+    def from_file(cls, path):
+        """Read a combination matrix from a .csv or Excel (.xlsx/.xls) file"""
+        if path.lower().endswith((".xlsx", ".xlsm", ".xls")):
+            try:
+                table = pd.read_excel(path, sheet_name=0)
+            except ImportError as e:
+                raise ValueError(f"Reading Excel combination files needs openpyxl / xlrd: {e}")
+        else:
+            table = pd.read_csv(path, sep=None, engine="python")
+        if table.shape[1] < 2:
+            raise ValueError(f"No subcase columns in {path}")
+
+        subcase_columns, subcase_ids, name_column = [], [], None
+        for column in table.columns[1:]:
+            match = re.search(r"(\d+)\s*$", str(column))
+            if match and pd.api.types.is_numeric_dtype(table[column]):
+                subcase_columns.append(column)
+                subcase_ids.append(int(match.group(1)))
+            elif name_column is None:
+                name_column = column
+        if not subcase_columns:
+            raise ValueError(f"No subcase columns in {path} (headers must end with the subcase ID)")
+
+        table = table.dropna(subset=[table.columns[0]])
+        names = table[name_column].astype(str).tolist() if name_column is not None else None
+        factors = table[subcase_columns].fillna(0.0).to_numpy(dtype=float)
+        print(f"Read {len(table)} load combinations of {len(subcase_ids)} subcases from {os.path.basename(path)}")
+        return cls(table[table.columns[0]].astype(int).to_numpy(), subcase_ids, factors, names)
+
+    def __len__(self):
+        return len(self.combination_ids)
+
+    def __contains__(self, combination_id):
+        return isinstance(combination_id, (int, np.integer)) and int(combination_id) in self._rows
+
+    def factors_of(self, combination_id):
+        """(subcase IDs, factors) of the non-zero terms of one combination"""
+        row = self.factors[self._rows[int(combination_id)]]
+        used = row != 0.0
+        return self.subcase_ids[used], row[used]
+
+    def combine_arrays(self, stacked, combination_ids=None):
+        """
+        Combined arrays of several combinations as one matrix product
+
+        Args:
+            stacked: (n_subcase, ...) data, subcases in the order of self.subcase_ids
+            combination_ids: Combinations to evaluate (default all)
+
+        Returns:
+            np.ndarray: (n_combination, ...)
+        """
+        rows = (slice(None) if combination_ids is None
+                else [self._rows[int(cid)] for cid in combination_ids])
+        stacked = np.asarray(stacked)
+        product = self.factors[rows] @ stacked.reshape(stacked.shape[0], -1)
+        return product.reshape((product.shape[0],) + stacked.shape[1:])
+
+    def combine(self, table, combination_id):
+        """
+        Combined result object of one combination from a pyNastran result table
+
+        Raises:
+            KeyError: when a subcase of the combination is not in the table
+        """
+        subcase_ids, factors = self.factors_of(combination_id)
+        objects = [table[subcase_id] for subcase_id in subcase_ids]
+        shapes = {obj.data.shape for obj in objects}
+        if len(shapes) > 1:
+            raise ValueError(f"Subcases {list(subcase_ids)} of combination {combination_id} "
+                             f"have different result layouts {shapes}")
+        combined = copy.copy(objects[0])
+        combined.data = np.tensordot(factors, np.stack([obj.data for obj in objects]), axes=1)
+        update_derived_columns(combined, objects[0])
+        combined.isubcase = int(combination_id)
+        combined.label = self.names[self._rows[int(combination_id)]]
+        if getattr(objects[0], 'dataframe', None) is not None:
+            combined.build_dataframe()
+        return combined
+
+    def install(self, model_data):
+        """
+        Make the combinations available as subcases of the OP2 tables and ModelData.results
+
+        Combinations of subcases missing from a table are left out of that table.
+        """
+        op2 = model_data.op2
+        if op2 is None:
+            raise ValueError("Load combinations need OP2 results")
+        # Tables of an earlier install are replaced, not combined again
+        tables = {}
+        for table_name in op2.get_table_types():
+            table = op2_result_table(op2, table_name)
+            table = table.base if isinstance(table, CombinedTable) else table
+            if isinstance(table, dict) and table and all(np.ndim(getattr(obj, 'data', None)) for obj in table.values()):
+                tables[table_name] = table
+
+        subcases = set(model_data.get_case_control_subcases())
+        for table in tables.values():
+            subcases.update(table.keys())
+        clash = sorted(subcases & set(self.combination_ids.tolist()))
+        if clash:
+            raise ValueError(f"Combination IDs {clash[:10]} are also subcase IDs")
+
+        for table_name, table in tables.items():
+            combined = CombinedTable(self, table, lambda cid, name=table_name: model_data.derived.get('combined table', name, cid))
+            _set_op2_table(op2, table_name, combined)
+
+        for result_type, table_names in RESULT_TABLES.items():
+            result_tables = [op2_result_table(op2, name) for name in table_names]
+            result_tables = [table for table in result_tables if isinstance(table, CombinedTable)]
+            if not result_tables:
+                continue
+            results = model_data.results.get(result_type, {})
+            results = results.base if isinstance(results, CombinedTable) else results
+            model_data.results[result_type] = CombinedTable(
+                self, results, lambda cid, tables=result_tables: [table[cid] for table in tables if cid in table],
+                available=lambda cid, tables=result_tables: any(cid in table for table in tables))
+            # ENVELOPE listed after the combinations
+            dict.pop(model_data.results[result_type], ENVELOPE, None)
+            if len(model_data.results[result_type]) > 1:
+                dict.__setitem__(model_data.results[result_type], ENVELOPE, [])
+        print(f"Installed {len(self)} load combinations into {len(tables)} OP2 result tables")
+
+
+def stack_subcase_arrays(model_data, result_type, subcase_ids, component=None):
+    """
+    (subcase x id) array of one result component over the given (real) subcases
+
+    Returns:
+        tuple: (ids, values (n_subcase, n_ids), NaN where a subcase has no value)
+    """
+    parts = [result_arrays(model_data, result_type, subcase_id, component) for subcase_id in subcase_ids]
+    ids = np.unique(np.concatenate([part_ids for part_ids, _ in parts])) if parts else np.array([], dtype=int)
+    values = np.full((len(parts), len(ids)), np.nan)
+    for k, (part_ids, part_values) in enumerate(parts):
+        values[k, np.searchsorted(ids, part_ids)] = part_values
+    return ids, values
+
+
+def combination_tiles(n_subcase, n_combination, n_ids, memory_budget=COMBINATION_MEMORY_BUDGET,
+                      workers=COMBINATION_WORKERS):
+    """
+    (combination block, element block) sizes whose tiles fit the memory budget
+
+    A tile holds the combined values and their magnitudes (2 x n_comb_block x n_id_block)
+    and a copy of the subcase values of its elements (n_subcase x n_id_block), 8 bytes each.
+    """
+    per_worker = max(memory_budget // max(workers, 1) // 8, 1)
+    # element blocks narrow enough for combination blocks of up to COMBINATION_BLOCK rows
+    id_block = max(min(n_ids, per_worker // (n_subcase + 2 * min(n_combination, COMBINATION_BLOCK))), 1)
+    combination_block = max(min(n_combination, (per_worker - n_subcase * id_block) // (2 * id_block)), 1)
+    return combination_block, id_block
+
+
+def combination_envelope(combinations, stacked, ids, combination_ids=None, memory_budget=COMBINATION_MEMORY_BUDGET,
+                         workers=COMBINATION_WORKERS, progress_callback=None):
+    """
+    Envelope of combined values over combinations without materializing them
+
+    Args:
+        combinations: LoadCombinations
+        stacked: (n_subcase, n_ids) values, rows in the order of combinations.subcase_ids
+                 (any array-like that slices into numpy arrays, e.g. np.memmap)
+        ids: Node / element IDs of the columns
+        combination_ids: Combinations to evaluate (default all)
+        memory_budget: Bytes of tile data held at once over all workers
+        workers: Threads running element blocks in parallel
+        progress_callback: Optional callable(done, total) after each element block
+
+    Returns:
+        dict: compute_envelope layout with the governing combination IDs as
+              '<statistic>_subcase', plus 'combination_absmax' (largest |value| of
+              every combination over all ids)
+    """
+    if combination_ids is None:
+        combination_ids = combinations.combination_ids
+    combination_ids = np.asarray(combination_ids, dtype=int)
+    factors = combinations.factors[[combinations._rows[int(cid)] for cid in combination_ids]]
+    n_subcase, n_ids = np.shape(stacked)
+    combination_block, id_block = combination_tiles(n_subcase, len(combination_ids), n_ids, memory_budget, workers)
+
+    envelope = {'ids': np.asarray(ids), 'subcase_ids': combination_ids, 'component': None}
+    for statistic, fill in (("max", -np.inf), ("min", np.inf), ("absmax", np.nan)):
+        envelope[statistic] = np.full(n_ids, fill)
+        envelope[f"{statistic}_subcase"] = np.zeros(n_ids, dtype=int)
+    id_starts = list(range(0, n_ids, id_block))
+    combination_absmax = np.zeros((len(id_starts), len(combination_ids)))
+
+    def run_block(block):
+        columns = slice(id_starts[block], min(id_starts[block] + id_block, n_ids))
+        # missing subcase values do not contribute to a combination
+        values = np.nan_to_num(np.asarray(stacked[:, columns], dtype=float))
+        width = values.shape[1]
+        local = np.arange(width)
+        best = {"max": np.full(width, -np.inf), "min": np.full(width, np.inf), "absmax": np.full(width, -np.inf)}
+        rows = {statistic: np.zeros(width, dtype=int) for statistic in best}
+        signed = np.zeros(width)
+        for start in range(0, len(combination_ids), combination_block):
+            combined = factors[start:start + combination_block] @ values  # (n_comb_block, n_id_block)
+            magnitude = np.abs(combined)
+            combination_absmax[block, start:start + len(combined)] = magnitude.max(axis=1)
+
+            arg = combined.argmax(axis=0)
+            better = combined[arg, local] > best["max"]
+            best["max"][better], rows["max"][better] = combined[arg, local][better], start + arg[better]
+            arg = combined.argmin(axis=0)
+            better = combined[arg, local] < best["min"]
+            best["min"][better], rows["min"][better] = combined[arg, local][better], start + arg[better]
+            arg = magnitude.argmax(axis=0)
+            better = magnitude[arg, local] > best["absmax"]
+            best["absmax"][better], rows["absmax"][better] = magnitude[arg, local][better], start + arg[better]
+            signed[better] = combined[arg, local][better]
+        # each block writes only its own columns of the envelope
+        envelope["max"][columns], envelope["min"][columns], envelope["absmax"][columns] = best["max"], best["min"], signed
+        for statistic in best:
+            envelope[f"{statistic}_subcase"][columns] = combination_ids[rows[statistic]]
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for done, _ in enumerate(pool.map(run_block, range(len(id_starts))), start=1):
+            if progress_callback is not None:
+                progress_callback(done, len(id_starts))
+    envelope['combination_absmax'] = combination_absmax.max(axis=0) if id_starts else np.zeros(len(combination_ids))
+    return envelope
+
+
+class CombinedTable(dict):
+    """
+    Result table with load combinations, the combined entries are built on access
+
+    Keys are the subcase IDs of the table and the IDs of the combinations whose subcases
+    are all present. Combined entries are not stored here, build is memoized by the
+    derived results of the model ('combined table') and dropped when the combinations change.
+    """
+    def __init__(self, combinations, table, build, available=None):
+        super().__init__(table)
+        self.base = table  # the table without combinations
+        self._build = build
+        self._combined = set()
+        for cid in combinations.combination_ids.tolist():
+            subcase_ids, _ = combinations.factors_of(cid)
+            if available(cid) if available is not None else all(dict.__contains__(self, sc) for sc in subcase_ids.tolist()):
+                dict.__setitem__(self, cid, None)
+                self._combined.add(cid)
+
+    def __getitem__(self, key):
+        if key in self._combined:
+            return self._build(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
+def update_derived_columns(combined, reference):
+    """
+    Recompute the non linear columns of a combined result object in place
+
+    Principal values, angles, von Mises / max shear of plates and composites and the bar
+    stress extremes follow from the combined components; fibre positions are taken from
+    the reference subcase; margins that can not be recomputed are NaN.
+    """
+    if not hasattr(combined, 'get_headers'):
+        return
+    headers = list(combined.get_headers())
+    column = {name: k for k, name in enumerate(headers)}
+    data = combined.data
+    for fibre in ('fiber_distance', 'fiber_curvature'):
+        if fibre in column:
+            data[..., column[fibre]] = reference.data[..., column[fibre]]
+
+    for (sx, sy, txy, shear_factor), (maximum, minimum) in (
+            (('oxx', 'oyy', 'txy', 1.0), ('omax', 'omin')),
+            (('o11', 'o22', 't12', 1.0), ('major', 'minor')),
+            (('exx', 'eyy', 'exy', 0.5), ('emax', 'emin'))):  # engineering shear strain
+        if not {sx, sy, txy} <= column.keys():
+            continue
+        first, second, angle, radius = principal_values(data[..., column[sx]], data[..., column[sy]],
+                                                        data[..., column[txy]] * shear_factor)
+        data[..., column[maximum]] = first
+        data[..., column[minimum]] = second
+        if 'angle' in column:
+            data[..., column['angle']] = angle
+        if 'max_shear' in column:
+            data[..., column['max_shear']] = radius / shear_factor
+        if 'von_mises' in column:
+            data[..., column['von_mises']] = (np.sqrt(first**2 - first * second + second**2)
+                                              if shear_factor == 1.0 else np.nan)
+
+    for end in ('a', 'b'):
+        bending = [f"s{k}{end}" for k in range(1, 5)]
+        if set(bending) <= column.keys() and 'axial' in column:
+            values = data[..., [column[name] for name in bending]]
+            data[..., column[f"smax{end}"]] = data[..., column['axial']] + values.max(axis=-1)
+            data[..., column[f"smin{end}"]] = data[..., column['axial']] + values.min(axis=-1)
+    for margin in ('MS_tension', 'MS_compression'):
+        if margin in column:
+            data[..., column[margin]] = np.nan
+
+
+def _set_op2_table(op2, name, table):
+    group, _, table_name = name.rpartition('.')
+    setattr(getattr(op2.op2_results, group) if group else op2, table_name, table)
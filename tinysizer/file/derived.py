@@ -0,0 +1,82 @@
+"""
+Derived results of a model and the inputs they depend on
+
+A derived result declares its inputs, either sources of the model (loaded BDF / OP2, the
+load combination matrix, sizing results) or other derived results, and a compute
+function. Values are memoized per (name, arguments) together with the versions of all
+upstream sources; DerivedGraph.invalidate(source) bumps a source version and drops only
+the memoized values downstream of it, everything else is served from the memo.
+
+Derived results flagged `shown` appear as result types on the mesh (ModelData.results),
+their compute function returns (element IDs, values) arrays.
+"""
+
+# Inputs that change from outside the graph
+SOURCES = ("bdf", "op2", "combinations", "sizing")
+
+
+class DerivedResult:
+    def __init__(self, name, inputs, compute, shown=False):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.compute = compute
+        self.shown = shown
+
+
+class DerivedGraph:
+    def __init__(self):
+        self.results = {}  # name -> DerivedResult, in registration order
+        self.versions = {source: 0 for source in SOURCES}
+        self.memo = {}  # (name, *args) -> (source versions, value)
+
+    def register(self, name, inputs, compute, shown=False):
+        """Add a derived result, its inputs must be sources or registered results"""
+        unknown = [name_ for name_ in inputs if name_ not in self.versions and name_ not in self.results]
+        if unknown:
+            raise ValueError(f"Derived result {name} depends on unknown inputs {unknown}")
+        self.results[name] = DerivedResult(name, inputs, compute, shown)
+        return self.results[name]
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def shown(self):
+        """Names of the derived results shown as result types"""
+        return [name for name, result in self.results.items() if result.shown]
+
+    def sources(self, name):
+        """Sources a derived result depends on, directly or through other derived results"""
+        found = set()
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in self.versions:
+                found.add(current)
+            else:
+                pending.extend(self.results[current].inputs)
+        return tuple(sorted(found))
+
+    def stamp(self, name):
+        """Versions of the upstream sources of a derived result"""
+        return tuple(self.versions[source] for source in self.sources(name))
+
+    def get(self, name, *args):
+        """Memoized value of a derived result, recomputed once an upstream source changed"""
+        key = (name,) + args
+        stamp = self.stamp(name)
+        entry = self.memo.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        value = self.results[name].compute(*args)
+        self.memo[key] = (stamp, value)
+        return value
+
+    def invalidate(self, *sources):
+        """Bump source versions and drop the memoized values downstream of them"""
+        for source in sources:
+            self.versions[source] += 1
+        stale = [key for key, (stamp, _) in self.memo.items() if stamp != self.stamp(key[0])]
+        for key in stale:
+            del self.memo[key]
+        if stale:
+            print(f"Inputs {', '.join(sources)} changed, {len(stale)} derived results dropped")
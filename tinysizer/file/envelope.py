@@ -0,0 +1,354 @@
+"""
+Subcase envelopes of OP2 results
+
+The values of one result type / component are stacked into a (subcase x id) array (ids
+are nodes or elements, NaN where a subcase has no value) and reduced once along the
+subcase axis: max, min and abs-max (signed value of largest magnitude) per id, each with
+the subcase that governs it. Envelopes are shown through the pseudo-subcase ENVELOPE
+of ModelData.results, the component names carry the statistic ("mx max", "mx max subcase").
+
+For OP2s too large to hold, stream_envelope reads the tables of a result type in one pass
+over the file and folds every result object into running accumulators (EnvelopeAccumulator)
+as soon as its subtable is read, dropping its arrays before the next one; only the per-id
+envelope stays in memory.
+"""
+import numpy as np
+from pyNastran.op2.op2 import OP2
+from pyNastran.op2.op2_interface.op2_reader import OP2Reader
+from tinysizer.file.principal import derived_column
+from tinysizer.file.reduction import DEFAULT_REDUCTION, reduce_rows, result_row_ids
+
+# Pseudo-subcase key in ModelData.results
+ENVELOPE = "ENVELOPE"
+
+ENVELOPE_STATISTICS = ("max", "min", "absmax")
+
+# OP2 tables behind the result types of ModelData.results (names as accepted by OP2.set_results)
+RESULT_TABLES = {
+    'DISPLACEMENT': ['displacements'],
+    'EIGENVECTORS': ['eigenvectors'],
+    'FORCE_SHELL': ['force.cquad4_force', 'force.ctria3_force'],
+    'FORCE_BAR': ['force.cbar_force'],
+    'STRESS': ['stress.cquad4_stress', 'stress.ctria3_stress', 'stress.cquad4_composite_stress',
+               'stress.ctria3_composite_stress', 'stress.cbar_stress'],
+    'STRAIN': ['strain.cquad4_strain', 'strain.ctria3_strain', 'strain.cquad4_composite_strain',
+               'strain.ctria3_composite_strain', 'strain.cbar_strain'],
+}
+
+# Value plotted when no component is selected (same defaults as ModelData.get_result_data)
+DEFAULT_COMPONENTS = {
+    'DISPLACEMENT': [('t1', 't2', 't3')],
+    'EIGENVECTORS': [('t1', 't2', 't3')],
+    'FORCE_SHELL': [('mx', 'my', 'mxy'), ('bmx', 'bmy', 'bmxy'), ('tx', 'ty')],
+    'STRESS': [('von_mises',), ('max_principal',)],
+    'STRAIN': [('von_mises',), ('max_principal',)],
+}
+
+
+def object_arrays(result_obj, result_type, component=None, reduction=DEFAULT_REDUCTION, companion=None):
+    """
+    IDs and values of one pyNastran result object (first time step)
+
+    Several rows per element (corners, fibres, plies) are reduced to one value with the
+    reduction mode (reduction module). Derived principal components (principal module)
+    are computed for every row before the reduction.
+
+    Args:
+        companion: Optional second component taken from the rows the reduced values come
+                   from (e.g. the principal angle of the displayed principal stress)
+
+    Returns:
+        tuple: (ids, values) arrays, (ids, values, companion values) with a companion,
+               or None when the object has no array data
+    """
+    data = getattr(result_obj, 'data', None)
+    if not isinstance(data, np.ndarray) or not hasattr(result_obj, 'get_headers'):
+        return None
+    if data.ndim == 3:
+        data = data[0]
+    row_ids = result_row_ids(result_obj, len(data))
+    if row_ids is None:
+        return None
+    ids, positions = row_ids
+
+    headers = list(result_obj.get_headers())
+    if component is not None:
+        if component in headers:
+            values = data[:, headers.index(component)]
+        else:
+            values = derived_column(data, headers, component)  # principal values of shells
+            if values is None:
+                return None
+    else:
+        for group in DEFAULT_COMPONENTS.get(result_type, []):
+            if all(name in headers for name in group):
+                columns = data[:, [headers.index(name) for name in group]]
+                values = columns[:, 0] if len(group) == 1 else np.linalg.norm(columns, axis=1)
+                break
+        else:
+            return None
+
+    if companion is None:
+        return reduce_rows(ids, values, positions, reduction)
+    companion_values = data[:, headers.index(companion)] if companion in headers else derived_column(data, headers, companion)
+    if companion_values is None:
+        return None
+    unique_ids, values, rows = reduce_rows(ids, values, positions, reduction, return_rows=True)
+    return unique_ids, values, np.where(rows >= 0, companion_values[rows], np.nan)
+
+
+def has_multiple_rows(model_data, result_type, subcase_id):
+    """True when some element of the result has several rows (corners, fibres, plies)"""
+    for result_obj in model_data.results.get(result_type, {}).get(subcase_id, []):
+        data = getattr(result_obj, 'data', None)
+        row_ids = result_row_ids(result_obj, np.shape(data)[-2]) if np.ndim(data) >= 2 else None
+        if row_ids is not None and len(np.unique(row_ids[0])) < len(row_ids[0]):
+            return True
+    return False
+
+
+def result_arrays(model_data, result_type, subcase_id, component=None):
+    """IDs and values of one result type / subcase / component, all result objects merged"""
+    reduction = getattr(model_data, 'element_reduction', DEFAULT_REDUCTION)
+    ids, values = [], []
+    for result_obj in model_data.results.get(result_type, {}).get(subcase_id, []):
+        arrays = object_arrays(result_obj, result_type, component, reduction)
+        if arrays is None:
+            # Objects without array data go through the generic per-row extraction
+            result_data = model_data.get_result_data(result_type, subcase_id, component)
+            return (np.fromiter(result_data.keys(), dtype=int, count=len(result_data)),
+                    np.fromiter(result_data.values(), dtype=float, count=len(result_data)))
+        ids.append(arrays[0])
+        values.append(arrays[1])
+    if not ids:
+        return np.array([], dtype=int), np.array([])
+    return np.concatenate(ids), np.concatenate(values)
+
+
+def numeric_subcases(model_data, result_type):
+    """Real subcase IDs of a result type (pseudo-subcases left out)"""
+    return sorted(sc for sc in model_data.results.get(result_type, {}) if isinstance(sc, (int, np.integer)))
+
+
+def compute_envelope(model_data, result_type, component=None, subcases=None):
+    """
+    Max, min and abs-max over subcases of a result component, with the governing subcases
+
+    Args:
+        model_data: ModelData with extracted OP2 results
+        result_type: Key of ModelData.results ('DISPLACEMENT', 'FORCE_SHELL', ...)
+        component: Component name (None = default magnitude of the result type)
+        subcases: Subcase IDs to envelope (default all)
+
+    Returns:
+        dict: 'ids', 'subcase_ids', and per id '<statistic>' values and
+              '<statistic>_subcase' governing subcase IDs for each of ENVELOPE_STATISTICS
+    """
+    if subcases is None:
+        subcases = numeric_subcases(model_data, result_type)
+    parts = [(subcase_id, *result_arrays(model_data, result_type, subcase_id, component)) for subcase_id in subcases]
+    parts = [part for part in parts if part[1].size]
+    if not parts:
+        return None
+
+    subcase_ids = np.array([part[0] for part in parts])
+    ids = np.unique(np.concatenate([part[1] for part in parts]))
+    values = np.full((len(parts), len(ids)), np.nan)
+    for k, (_, part_ids, part_values) in enumerate(parts):
+        values[k, np.searchsorted(ids, part_ids)] = part_values
+
+    missing = np.isnan(values)
+    columns = np.arange(len(ids))
+    governing = {
+        'max': np.where(missing, -np.inf, values).argmax(axis=0),
+        'min': np.where(missing, np.inf, values).argmin(axis=0),
+        'absmax': np.where(missing, -np.inf, np.abs(values)).argmax(axis=0),
+    }
+    envelope = {'ids': ids, 'subcase_ids': subcase_ids, 'component': component}
+    for statistic, rows in governing.items():
+        envelope[statistic] = values[rows, columns]
+        envelope[f"{statistic}_subcase"] = subcase_ids[rows]
+    return envelope
+
+
+def merge_envelopes(first, second):
+    """Envelope over the subcases of two envelopes (ties go to first)"""
+    if first is None or second is None:
+        return first if second is None else second
+    ids = np.union1d(first['ids'], second['ids'])
+    merged = {'ids': ids, 'subcase_ids': np.concatenate([first['subcase_ids'], second['subcase_ids']]),
+              'component': first['component']}
+    for statistic in ENVELOPE_STATISTICS:
+        values, governing = [], []
+        for envelope in (first, second):
+            value = np.full(len(ids), np.nan)
+            subcase = np.zeros(len(ids), dtype=int)
+            positions = np.searchsorted(ids, envelope['ids'])
+            value[positions] = envelope[statistic]
+            subcase[positions] = envelope[f"{statistic}_subcase"]
+            values.append(value)
+            governing.append(subcase)
+        key = {"max": values[0], "min": -values[0], "absmax": np.abs(values[0])}[statistic]
+        other = {"max": values[1], "min": -values[1], "absmax": np.abs(values[1])}[statistic]
+        take_second = np.isnan(key) | (other > key)
+        merged[statistic] = np.where(take_second, values[1], values[0])
+        merged[f"{statistic}_subcase"] = np.where(take_second, governing[1], governing[0])
+    return merged
+
+
+def envelope_components(components):
+    """Component names of the ENVELOPE pseudo-subcase for the components of a real subcase"""
+    names = []
+    for component in components:
+        names.extend(f"{component} {statistic}" for statistic in ENVELOPE_STATISTICS)
+        names.extend(f"{component} {statistic} subcase" for statistic in ENVELOPE_STATISTICS)
+    return names
+
+
+def parse_envelope_component(name):
+    """
+    Split an ENVELOPE component name into (component, statistic, governing subcase wanted)
+
+    None (no component selected) is the abs-max of the default value.
+    """
+    if not name:
+        return None, "absmax", False
+    words = name.split()
+    want_subcase = words[-1] == "subcase"
+    if want_subcase:
+        words = words[:-1]
+    if len(words) > 1 and words[-1] in ENVELOPE_STATISTICS:
+        component, statistic = " ".join(words[:-1]), words[-1]
+    else:
+        component, statistic = " ".join(words), "absmax"
+    return (None if component == "Magnitude" else component), statistic, want_subcase
+
+
+class EnvelopeAccumulator:
+    """Running max / min / abs-max per id, updated one subcase at a time"""
+    def __init__(self, component=None):
+        self.component = component
+        self.ids = np.array([], dtype=int)
+        self.subcase_ids = set()
+        self.values = {statistic: np.array([]) for statistic in ENVELOPE_STATISTICS}
+        self.governing = {statistic: np.array([], dtype=int) for statistic in ENVELOPE_STATISTICS}
+        self._magnitude = np.array([])  # |absmax|, compared without the sign
+
+    def _extend(self, ids):
+        """Add IDs not seen in earlier subcases"""
+        new_ids = np.setdiff1d(ids, self.ids)
+        if not new_ids.size:
+            return
+        all_ids = np.union1d(self.ids, new_ids)
+        old = np.searchsorted(all_ids, self.ids)
+        for statistic, fill in (("max", -np.inf), ("min", np.inf), ("absmax", np.nan)):
+            values = np.full(len(all_ids), fill)
+            values[old] = self.values[statistic]
+            self.values[statistic] = values
+            governing = np.full(len(all_ids), -1)
+            governing[old] = self.governing[statistic]
+            self.governing[statistic] = governing
+        magnitude = np.full(len(all_ids), -np.inf)
+        magnitude[old] = self._magnitude
+        self._magnitude = magnitude
+        self.ids = all_ids
+
+    def update(self, subcase_id, ids, values):
+        """Fold the values of one subcase in (earlier subcases win ties, as in compute_envelope)"""
+        ids = np.asarray(ids, dtype=int)
+        values = np.asarray(values, dtype=float)
+        self._extend(ids)
+        self.subcase_ids.add(subcase_id)
+        positions = np.searchsorted(self.ids, ids)
+        magnitude = np.abs(values)
+        larger = magnitude > self._magnitude[positions]
+        self._magnitude[positions[larger]] = magnitude[larger]
+        for statistic, better in (("max", values > self.values["max"][positions]),
+                                  ("min", values < self.values["min"][positions]),
+                                  ("absmax", larger)):
+            rows = positions[better]
+            self.values[statistic][rows] = values[better]
+            self.governing[statistic][rows] = subcase_id
+
+    def result(self):
+        """Envelope dict in the layout of compute_envelope, None before the first subcase"""
+        if not self.subcase_ids:
+            return None
+        envelope = {'ids': self.ids, 'subcase_ids': np.array(sorted(self.subcase_ids)), 'component': self.component}
+        for statistic in ENVELOPE_STATISTICS:
+            values = self.values[statistic]
+            envelope[statistic] = np.where(np.isinf(values), np.nan, values)
+            envelope[f"{statistic}_subcase"] = self.governing[statistic]
+        return envelope
+
+
+def op2_result_table(op2, name):
+    """Result table of an OP2 by set_results name ('displacements', 'force.cquad4_force')"""
+    group, _, table_name = name.rpartition('.')
+    container = getattr(op2.op2_results, group, None) if group else op2
+    return getattr(container, table_name, None) or {}
+
+
+class _FoldingReader(OP2Reader):
+    """OP2 reader calling back after every subtable of the second (data) pass"""
+    def __init__(self, op2, on_subtable):
+        super().__init__(op2)
+        self.on_subtable = on_subtable
+
+    def _read_subtable_3_4(self, table3_parser, table4_parser, passer):
+        finished = super()._read_subtable_3_4(table3_parser, table4_parser, passer)
+        if self.op2.read_mode == 2:
+            self.on_subtable()
+        return finished
+
+
+def stream_envelope(op2_file, result_type, component=None, subcases=None, progress_callback=None,
+                    reduction=DEFAULT_REDUCTION):
+    """
+    Envelope of a result component read from an OP2 file without holding all subcases
+
+    The file is read once: each result object is folded into the accumulator and removed
+    from its table as soon as all its time steps are read, so at most one object holds data.
+
+    Args:
+        op2_file: OP2 path
+        result_type: Key of RESULT_TABLES
+        component: Component name (None = default magnitude of the result type)
+        subcases: Subcase IDs (e.g. from the case control of the BDF), None = all
+        progress_callback: Optional callable(done, total) after each folded result object
+        reduction: Reduction mode of multi-row element results
+
+    Returns:
+        dict: compute_envelope layout
+    """
+    if result_type not in RESULT_TABLES:
+        raise ValueError(f"Result type {result_type} can not be streamed from the OP2")
+    table_names = RESULT_TABLES[result_type]
+    accumulator = EnvelopeAccumulator(component)
+    op2 = OP2(debug=None)
+    folded = [0]
+
+    def fold(finished_only=True):
+        tables = [op2_result_table(op2, name) for name in table_names]
+        for table in tables:
+            # Objects are keyed by their subcase code until the read is finished
+            for key in [key for key, result_obj in table.items()
+                        if isinstance(getattr(result_obj, 'data', None), np.ndarray)
+                        and (not finished_only or result_obj.itime >= result_obj.ntimes)]:
+                result_obj = table.pop(key)
+                arrays = object_arrays(result_obj, result_type, component, reduction)
+                if arrays is not None:
+                    accumulator.update(result_obj.isubcase, *arrays)
+                folded[0] += 1
+                del result_obj  # subcase arrays are dropped before the next subtable is read
+                if progress_callback is not None:
+                    progress_callback(folded[0], folded[0] + sum(len(table) for table in tables))
+
+    op2.op2_reader = _FoldingReader(op2, fold)
+    if subcases is not None:
+        op2.set_subcases(list(subcases))
+    op2.set_results(table_names)
+    op2.read_op2(op2_file, build_dataframe=False)
+    fold(finished_only=False)
+    del op2
+    return accumulator.result()
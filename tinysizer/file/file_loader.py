@@ -1,9 +1,25 @@
 from PySide6.QtWidgets import QFileDialog, QMessageBox
 from pyNastran.bdf.bdf import BDF
 from pyNastran.op2.op2 import OP2
-import random
+import hashlib
 import numpy as np
 import os
+from tinysizer.file.bdf_patcher import BdfPropertyPatcher
+from tinysizer.file.envelope import (ENVELOPE, RESULT_TABLES, compute_envelope, envelope_components,
+                                     has_multiple_rows, merge_envelopes, numeric_subcases, object_arrays,
+                                     op2_result_table, parse_envelope_component, stream_envelope)
+from tinysizer.file.principal import derived_components, parse_derived_component
+from tinysizer.file.derived import DerivedGraph
+from tinysizer.file.grouped import reduce_by_groups
+from tinysizer.file.reduction import DEFAULT_REDUCTION
+from tinysizer.file.model_cache import ModelCache
+from tinysizer.file.combinations import (NONLINEAR_COLUMNS, LoadCombinations, combination_envelope,
+                                         stack_subcase_arrays)
+from tinysizer.geometry.element_geometry import ElementGeometry
+
+# How the OP2 is loaded: all result tables in memory, or only the envelopes of the
+# streamable result types (RESULT_TABLES) read in one pass and kept in the model cache
+OP2_LOAD_MODES = ("full results", "envelopes only")
 
 class ModelData:
     def __init__(self):
@@ -25,15 +41,134 @@ class ModelData:
             'FORCE_SHELL': {}, # For CQUAD4 and CTRIA3 forces
             'FORCE_BAR': {},   # For CBAR forces
             'EIGENVECTORS': {},
-            'THICKNESS':{},
-            'ÖMER JOINTS':{},
-            'BURAK BUFFETS':{},
         }
         self.coordinate_systems = {}
         self.bdf = None
         self.op2= None
         self.is_loaded = None
+        self.bdf_file = None
+        self.op2_file = None
+        self.cache_key = None  # identifies the loaded files, caches built on this model compare it
+        self.property_patcher = None  # byte offsets of PSHELL/PCOMP/PBARL cards for writing sized values
+        self.envelope_subcases = None  # subcases enveloped by the ENVELOPE pseudo-subcase, None = all
+        self.model_cache = None  # ModelCache of the loaded files, see get_model_cache()
+        self.load_mode = OP2_LOAD_MODES[0]
+        self.streamed_components = {}  # result type -> OP2 table components, "envelopes only" mode
+        self.combinations = None  # LoadCombinations installed as extra subcases
+        self.combinations_file = None
+        self.element_reduction = DEFAULT_REDUCTION  # rows of an element (corners, fibres, plies) -> one value
+        self.nodal_averaging = "none"  # one of AVERAGING_MODES, contour of element results
+        self.sized_thicknesses = {}  # pid -> total thickness from the sizing tab, shown as SIZED
+        self.derived = DerivedGraph()  # memoized geometry, envelopes, nodal averages, thickness, ...
+        self.register_derived_results()
+
+    def register_derived_results(self):
+        """Derived results of the model with the inputs they are recomputed from"""
+        self.derived.register('geometry', ('bdf',), self._compute_geometry)
+        self.derived.register('combined table', ('op2', 'combinations'), self._compute_combined_table)
+        self.derived.register('envelope', ('op2', 'combinations'), self._compute_envelope)
+        self.derived.register('nodal average', ('geometry', 'op2', 'combinations', 'sizing'), self._compute_nodal_average)
+        self.derived.register('grouped summary', ('geometry', 'op2', 'combinations', 'sizing'),
+                              self._compute_grouped_summary)
+        self.derived.register('property thickness', ('bdf',), self._compute_property_thickness)
+        # Result types without OP2 table: (element IDs, values) shown on the mesh
+        self.derived.register('THICKNESS', ('geometry', 'property thickness'),
+                              lambda: self._element_thickness(sized=False), shown=True)
+        self.derived.register('SIZED', ('geometry', 'property thickness', 'sizing'),
+                              lambda: self._element_thickness(sized=True), shown=True)
+        self.derived.register('ÖMER JOINTS', ('bdf',), lambda: self._placeholder_result(2.0), shown=True)
+        self.derived.register('BURAK BUFFETS', ('bdf',), lambda: self._placeholder_result(1.2), shown=True)
+        for name in self.derived.shown():
+            self.results.setdefault(name, {})
+
+    def update_cache_key(self):
+        """Fingerprint of the loaded BDF/OP2 and combination matrix (path, modification time, size)"""
+        fingerprint = []
+        for path in (self.bdf_file, self.op2_file, self.combinations_file):
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                fingerprint.append(f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}")
+            else:
+                fingerprint.append("")
+        self.cache_key = hashlib.sha1("\n".join(fingerprint).encode("utf-8")).hexdigest()
+        return self.cache_key
+
+    def load_combinations(self, path):
+        """
+        Read a load combination matrix (CSV / Excel) and add its combinations as subcases
+
+        Returns:
+            LoadCombinations
+        """
+        combinations = LoadCombinations.from_file(path)
+        combinations.install(self)
+        self.combinations = combinations
+        self.combinations_file = path
+        self.derived.invalidate('combinations')
+        self.update_cache_key()  # caches of the previous subcase set are dropped
+        return combinations
+
+    def get_model_cache(self):
+        """On-disk cache of the loaded files (None before the files are fingerprinted)"""
+        if self.cache_key is None:
+            return None
+        if self.model_cache is None or self.model_cache.cache_key != self.cache_key:
+            self.model_cache = ModelCache(self.cache_key)
+        return self.model_cache
+
+    def get_case_control_subcases(self):
+        """Subcase IDs of the BDF case control"""
+        if self.bdf is None:
+            return []
+        return sorted(sc for sc in getattr(self.bdf, 'subcases', {}) if sc > 0)
+
+    def get_envelope(self, result_type, component=None, subcases=None, stream=False):
+        """
+        Subcase envelope of a result component (envelope module), computed once per subcase set
 
+        Envelopes are looked up in memory, then in the model cache. Otherwise they are reduced
+        from the loaded results, or streamed from the OP2 file (stream set, or the result
+        type not loaded) and written to the model cache, so the OP2 is not read again.
+        """
+        if subcases is None:
+            subcases = self.envelope_subcases if self.envelope_subcases is not None else numeric_subcases(self, result_type)
+        if not subcases and result_type in RESULT_TABLES and self.op2_file:
+            stream = True
+        if stream and not subcases:
+            subcases = self.get_case_control_subcases()
+        key = (result_type, component, tuple(subcases) if subcases else None, self.element_reduction)
+        return self.derived.get('envelope', *key, stream)
+
+    def _compute_envelope(self, result_type, component, subcases, reduction, stream):
+        key = (result_type, component, subcases, reduction)
+        cache = self.get_model_cache()
+        envelope = cache.load_envelope(*key) if cache is not None else None
+        if envelope is None and stream:
+            print(f"Streaming {result_type} envelope from {self.op2_file}")
+            envelope = stream_envelope(self.op2_file, result_type, component, subcases and list(subcases),
+                                       reduction=reduction)
+            if envelope is not None and cache is not None:
+                cache.save_envelope(*key, envelope)
+        elif envelope is None:
+            combined = [sc for sc in subcases if self.combinations is not None and sc in self.combinations]
+            if (combined and component is not None and component not in NONLINEAR_COLUMNS
+                    and parse_derived_component(component) is None
+                    and not has_multiple_rows(self, result_type, int(self.combinations.subcase_ids[0]))):
+                # Linear components of combinations are reduced in tiles, never materialized
+                envelope = merge_envelopes(
+                    compute_envelope(self, result_type, component, [sc for sc in subcases if sc not in combined]),
+                    self.get_combination_envelope(result_type, component, combined))
+            else:
+                envelope = compute_envelope(self, result_type, component, subcases)
+        return envelope
+
+    def get_combination_envelope(self, result_type, component, combination_ids=None):
+        """Envelope of a linear result component over load combinations (chunked executor)"""
+        combinations = self.combinations
+        ids, stacked = stack_subcase_arrays(self, result_type, combinations.subcase_ids.tolist(), component)
+        envelope = combination_envelope(combinations, stacked, ids, combination_ids)
+        envelope['component'] = component
+        return envelope
             
     def get_result_data(self, result_type, subcase_id, component=None):
         """
@@ -55,46 +190,18 @@ class ModelData:
         """
 
         result_data={}
-        # Handle thickness as a special case - it doesn't come from OP2 results
-        if result_type == 'THICKNESS':
-            if self.bdf and self.bdf.elements:
-                for elid, element in self.bdf.elements.items():
-                    try:
-                        prop = self.bdf.properties[element.pid]
-                        if prop.type == "PSHELL":
-                            thickness = prop.t
-                        elif prop.type == "PCOMP":
-                            thickness = prop.thicknesses[0]
-                        else:
-                            thickness = 0
-                        result_data[elid] = thickness
-                    except (KeyError, AttributeError, IndexError) as e:
-                        print(f"Warning: Could not get thickness for element {elid}: {e}")
-                        result_data[elid] = 0
-            return result_data
+        # Results without OP2 table (thickness, ...) come from the derived results
+        if result_type in self.derived:
+            element_ids, values = self.derived.get(result_type)
+            return dict(zip(element_ids.tolist(), values.tolist()))
         
-
-        if "ömer" in result_type.lower():
-            if self.bdf and self.bdf.elements:
-                for elid, element in self.bdf.elements.items():
-                    try:
-                        thickness=random.randint(0,10)
-                        result_data[elid] = elid**2
-                    except (KeyError, AttributeError, IndexError) as e:
-                        print(f"Warning: Could not get thickness for element {elid}: {e}")
-                        result_data[elid] = 0
-            return result_data
-        
-        if "burak" in result_type.lower():
-            if self.bdf and self.bdf.elements:
-                for elid, element in self.bdf.elements.items():
-                    try:
-                        thickness=random.randint(0,10)
-                        result_data[elid] = elid**1.2
-                    except (KeyError, AttributeError, IndexError) as e:
-                        print(f"Warning: Could not get thickness for element {elid}: {e}")
-                        result_data[elid] = 0
-            return result_data
+        if subcase_id == ENVELOPE:
+            component, statistic, want_subcase = parse_envelope_component(component)
+            envelope = self.get_envelope(result_type, component)
+            if envelope is None:
+                return {}
+            values = envelope[f"{statistic}_subcase" if want_subcase else statistic]
+            return dict(zip(envelope['ids'].tolist(), values.tolist()))
         
         # Check if the requested result exists
         if result_type not in self.results or subcase_id not in self.results[result_type]:
@@ -105,6 +212,12 @@ class ModelData:
         
         # For each result object (there might be multiple for some result types)
         for result_obj in result_objects:
+            # Array backed objects: one value per element with the selected row reduction
+            arrays = object_arrays(result_obj, result_type, component, self.element_reduction)
+            if arrays is not None:
+                result_data.update(zip(arrays[0].tolist(), arrays[1].tolist()))
+                continue
+            
             # Handle dataframe-based results (most common in newer versions)
             if hasattr(result_obj, 'dataframe'):
                 df = result_obj.dataframe.reset_index()
@@ -239,6 +352,127 @@ class ModelData:
         return result_data
 
 
+    def get_nodal_result(self, result_type, subcase_id, component=None, by_property=False):
+        """
+        Element results averaged at the nodes through the node x element incidence matrix
+
+        Args:
+            by_property: Average only over elements of the same property, values are then
+                         per element corner
+
+        Returns:
+            tuple: (node IDs, averages) or with by_property (element IDs, corner node IDs,
+                   corner values), None when there is no geometry / element result
+        """
+        if result_type in ('DISPLACEMENT', 'EIGENVECTORS'):
+            return None  # already nodal
+        return self.derived.get('nodal average', result_type, subcase_id, component, by_property,
+                                self.element_reduction, self.envelope_subcases)
+
+    def _compute_nodal_average(self, result_type, subcase_id, component, by_property, reduction, envelope_subcases):
+        geometry = self.get_geometry()
+        result_data = self.get_result_data(result_type, subcase_id, component)
+        if geometry is None or not result_data:
+            return None
+        element_ids = np.fromiter(result_data.keys(), dtype=int, count=len(result_data))
+        values = np.fromiter(result_data.values(), dtype=float, count=len(result_data))
+        geometry.get_incidence()
+        known = np.isin(element_ids, geometry.incidence_element_ids)
+        if by_property:
+            return geometry.property_nodal_average(element_ids[known], values[known])
+        return geometry.nodal_average(element_ids[known], values[known])
+
+    def get_grouped_summary(self, result_type, subcase_id, component=None, assemblies=None):
+        """
+        Statistics of an element result per property or per assembly (grouped module)
+
+        Args:
+            assemblies: None to group by property, or {assembly name: property IDs}
+
+        Returns:
+            dict: grouped_reduce layout (max / min with element IDs, mean, percentiles),
+                  None when the result has no element values
+        """
+        if result_type in ('DISPLACEMENT', 'EIGENVECTORS'):
+            return None  # nodal results have no property
+        groups = None if assemblies is None else tuple((name, tuple(pids)) for name, pids in assemblies.items())
+        return self.derived.get('grouped summary', result_type, subcase_id, component, groups,
+                                self.element_reduction, self.envelope_subcases)
+
+    def _compute_grouped_summary(self, result_type, subcase_id, component, groups, reduction, envelope_subcases):
+        geometry = self.get_geometry()
+        result_data = self.get_result_data(result_type, subcase_id, component)
+        if geometry is None or not result_data:
+            return None
+        element_ids = np.fromiter(result_data.keys(), dtype=int, count=len(result_data))
+        values = np.fromiter(result_data.values(), dtype=float, count=len(result_data))
+        known = np.isin(element_ids, geometry.element_ids)
+        element_ids, values = element_ids[known], values[known]
+        element_pids = geometry.element_pids[np.searchsorted(geometry.element_ids, element_ids)]
+        return reduce_by_groups(element_ids, values, element_pids, None if groups is None else dict(groups))
+
+    def get_geometry(self):
+        """Element areas, centroids, normals and bar lengths/directions (computed once per model)"""
+        return self.derived.get('geometry')
+
+    def _compute_geometry(self):
+        return ElementGeometry(self.bdf) if self.bdf is not None else None
+
+    def _compute_combined_table(self, table_name, combination_id):
+        table = op2_result_table(self.op2, table_name)
+        return self.combinations.combine(getattr(table, 'base', table), combination_id)
+
+    def _compute_property_thickness(self):
+        """
+        Columnar thickness table of the properties: PSHELL t, PCOMP total laminate
+        thickness (both halves of symmetric laminates), 0 for other properties
+
+        Returns:
+            tuple: (sorted property IDs, thicknesses)
+        """
+        properties = self.bdf.properties if self.bdf is not None else {}
+        pids = np.array(sorted(properties), dtype=int)
+        thicknesses = np.zeros(len(pids))
+        for row, pid in enumerate(pids.tolist()):
+            prop = properties[pid]
+            if prop.type == "PSHELL":
+                thicknesses[row] = prop.t
+            elif prop.type == "PCOMP":
+                thicknesses[row] = prop.Thickness()
+        return pids, thicknesses
+
+    def _element_thickness(self, sized=False):
+        """Thickness of every shell / bar element, a gather of the property table by element pid"""
+        geometry = self.get_geometry()
+        if geometry is None:
+            return np.array([], dtype=int), np.array([])
+        pids, thicknesses = self.derived.get('property thickness')
+        if sized and self.sized_thicknesses:
+            thicknesses = thicknesses.copy()
+            sized_pids = np.fromiter(self.sized_thicknesses.keys(), dtype=int, count=len(self.sized_thicknesses))
+            rows = np.searchsorted(pids, sized_pids)
+            known = (rows < len(pids)) & (pids[np.minimum(rows, len(pids) - 1)] == sized_pids)
+            thicknesses[rows[known]] = np.fromiter(self.sized_thicknesses.values(), dtype=float)[known]
+        if len(pids) == 0:
+            return geometry.element_ids, np.zeros(len(geometry.element_ids))
+        # one lookup per distinct property, then a gather over the elements
+        rows = np.minimum(np.searchsorted(pids, geometry.property_ids), len(pids) - 1)
+        property_thickness = np.where(pids[rows] == geometry.property_ids, thicknesses[rows], 0.0)
+        return geometry.element_ids, property_thickness[geometry.element_property_rows]
+
+    def set_sized_thickness(self, property_id, thickness):
+        """Thickness of a sized property shown as SIZED (None removes the override)"""
+        if thickness is None:
+            self.sized_thicknesses.pop(property_id, None)
+        else:
+            self.sized_thicknesses[property_id] = float(thickness)
+        self.derived.invalidate('sizing')
+
+    def _placeholder_result(self, exponent):
+        """Placeholder values (element ID ** exponent) of result types still to be implemented"""
+        element_ids = np.array(sorted(self.bdf.elements), dtype=int) if self.bdf else np.array([], dtype=int)
+        return element_ids, element_ids.astype(float) ** exponent
+
     def get_node_coordinates(self):
         """Return node coordinates as a numpy array for PyVista"""
         if not self.nodes:
@@ -284,9 +518,19 @@ class ModelData:
         """Get available components for a specific result type and subcase"""
         if result_type not in self.results or subcase_id not in self.results[result_type]:
             return []
+        if subcase_id == ENVELOPE:
+            subcases = numeric_subcases(self, result_type)
+            if subcases:
+                components = self.get_available_components(result_type, subcases[0])
+            else:
+                components = self.streamed_components.get(result_type, [])
+            return envelope_components([c for c in components if c != 'Type'])
         
         components = set()
         for result_obj in self.results[result_type].get(subcase_id, []):
+            if hasattr(result_obj, 'get_headers'):
+                # principal values / angles / max shear of shell results
+                components.update(derived_components(result_obj.get_headers()))
             if hasattr(result_obj, 'components'):
                 components.update(result_obj.components)
             elif hasattr(result_obj, 'dataframe'):
@@ -312,6 +556,25 @@ class ModelData:
         
         return mesh_data
     
+def get_op2_table(op2_data, table_name, group="stress"):
+    """
+    Get a pyNastran result table dict ({subcase_id: result object}) by name
+
+    Newer pyNastran versions keep tables under op2_results.<group> and deprecate the
+    flat attributes (e.g. op2.cquad4_stress), older ones only have the flat ones.
+    group=None reads top level tables such as displacements.
+    """
+    if op2_data is None:
+        return {}
+    op2_results = getattr(op2_data, 'op2_results', None)
+    container = getattr(op2_results, group, None) if op2_results is not None and group else None
+    if container is not None and hasattr(container, table_name):
+        return getattr(container, table_name) or {}
+    try:
+        return getattr(op2_data, table_name, None) or {}
+    except Exception:
+        return {}
+
 #OP2'DAN DATAYI CEKTIGIMIZ YER...
 def extract_op2_results(model_data, model_results):
     """
@@ -372,29 +635,60 @@ def extract_op2_results(model_data, model_results):
             model_data.results["EIGENVECTORS"][subcase_id] = [eigenvector]
             print(f"Loaded eigenvector results for subcase {subcase_id}")
     
-    # Extract thickness results
+    # Envelope over all subcases as a pseudo-subcase of every result with several subcases
+    for result_type in model_data.results:
+        if len(numeric_subcases(model_data, result_type)) > 1:
+            model_data.results[result_type][ENVELOPE] = []
+    
+    # Derived results without OP2 table (thickness, ...) as a single pseudo-subcase
     if model_data.bdf:
-        model_data.results.setdefault("THICKNESS", {})[" "] = []
+        for name in model_data.derived.shown():
+            model_data.results.setdefault(name, {})[" "] = []
         print(f"Thickness is stored !")
-
-    # Extract thickness results
-    if model_data.bdf:
-        model_data.results.setdefault("BURAK BUFFETS", {})[" "] = []
-
-    # Extract thickness results  
-    if model_data.bdf:
-        model_data.results.setdefault("ÖMER JOİNTS", {})[" "] = []
-
     else:
         print("(WARNING) Thickness data is missing.")
 
     return model_data
     
 
-def validate_and_load(bdf_file, op2_file=None):
-    """Validate and load BDF and OP2 files, makes model_data.result fulfilled"""
+def scan_op2_tables(model_data, op2_file):
+    """
+    Offer the envelopes of the streamable result types of an OP2 without loading its tables
+
+    Only the first case control subcase is read to find the tables and their components,
+    envelopes are streamed from the file on request (ModelData.get_envelope) and cached.
+    """
+    subcases = model_data.get_case_control_subcases()
+    op2 = OP2(debug=None)
+    if subcases:
+        op2.set_subcases(subcases[:1])
+    op2.set_results([name for names in RESULT_TABLES.values() for name in names])
+    op2.read_op2(op2_file, build_dataframe=False)
+    for result_type, table_names in RESULT_TABLES.items():
+        components = set()
+        for name in table_names:
+            for result_obj in op2_result_table(op2, name).values():
+                if hasattr(result_obj, 'get_headers'):
+                    headers = list(result_obj.get_headers())
+                    components.update(headers + derived_components(headers))
+        if components:
+            model_data.results[result_type][ENVELOPE] = []
+            model_data.streamed_components[result_type] = sorted(components)
+            print(f"{result_type} envelopes are streamed from the OP2")
+    del op2
+
+
+def validate_and_load(bdf_file, op2_file=None, load_mode=OP2_LOAD_MODES[0]):
+    """
+    Validate and load BDF and OP2 files, makes model_data.result fulfilled
+
+    With load_mode "envelopes only" the OP2 result tables are not read: only the
+    envelopes of RESULT_TABLES are available (streamed, see scan_op2_tables), there are
+    no per subcase results and no sizing on the OP2 stresses.
+    """
     # Reset current data
     model_data = ModelData()
+    model_data.load_mode = load_mode
     
     if not os.path.exists(bdf_file):
         return model_data, None, "BDF file path is empty"
@@ -424,6 +718,8 @@ def validate_and_load(bdf_file, op2_file=None):
         # Extract nodes
         model_data.nodes = model.nodes
         model_data.bdf = model
+        model_data.derived.invalidate("bdf")
+        model_data.bdf_file = bdf_file
         print(f"Loaded {len(model_data.nodes)} nodes")
         
         # Extract element IDs by type for easier reference
@@ -458,6 +754,12 @@ def validate_and_load(bdf_file, op2_file=None):
         for eid, element in model.elements.items():
             model_data.attributes.setdefault
 
+        # Index the property cards so sized values can be written back without write_bdf
+        try:
+            model_data.property_patcher = BdfPropertyPatcher(bdf_file)
+        except Exception as e:
+            print(f"Warning: Could not index property cards of {bdf_file}: {e}")
+
         # Store coordinate systems if available
         if hasattr(model, 'coords'):
             model_data.coordinate_systems = model.coords
@@ -475,7 +777,19 @@ def validate_and_load(bdf_file, op2_file=None):
         return model_data, False, text
     
     # Load OP2 file if provided
-    if op2_file and os.path.exists(op2_file):
+    if op2_file and os.path.exists(op2_file) and load_mode == "envelopes only":
+        try:
+            print(f"Scanning OP2 file: {op2_file}")
+            model_data.op2_file = op2_file
+            model_data.derived.invalidate("op2")
+            scan_op2_tables(model_data, op2_file)
+            extract_op2_results(model_data, None)  # no tables, the derived pseudo-subcases only
+            model_data.is_loaded = "both"
+            text = "BDF loaded, OP2 envelopes are streamed"
+        except Exception as e:
+            text = f"Error scanning OP2 file: {str(e)}\n"
+            print(text)
+    elif op2_file and os.path.exists(op2_file):
         try:
             print(f"Loading OP2 file: {op2_file}")
             model_results = OP2()
@@ -483,6 +797,8 @@ def validate_and_load(bdf_file, op2_file=None):
             
             # Store the OP2 model for direct access if needed
             model_data.op2 = model_results
+            model_data.derived.invalidate("op2")
+            model_data.op2_file = op2_file
             
             # Extract results using the simplified function
             model_data = extract_op2_results(model_data, model_results)
@@ -495,6 +811,7 @@ def validate_and_load(bdf_file, op2_file=None):
             print(error_msg)
             text = error_msg
     
+    model_data.update_cache_key()
     return model_data, model_data.is_loaded, text
 
 def browse_file(parent, file_type):
@@ -0,0 +1,105 @@
+"""
+Grouped reductions of result arrays
+
+Values are reduced per group (property, assembly or any set of element / property IDs)
+in one pass: sorting on (group, value) makes every group a contiguous segment sorted
+by value, so min / max and their IDs are the segment ends, percentiles are interpolated
+between two positions of the segment and sums come from ufunc.reduceat. Groups may
+overlap (a property in several assemblies), values are then repeated once per group.
+"""
+import numpy as np
+
+SUMMARY_PERCENTILES = (50, 90, 99)
+
+
+def grouped_reduce(keys, values, ids=None, percentiles=SUMMARY_PERCENTILES):
+    """
+    Statistics of the values of every group
+
+    Args:
+        keys: Group key of every value (int)
+        values: Values, NaN are left out
+        ids: Element / property ID of every value, reported for the min and max
+        percentiles: Percentiles (0-100) per group, linear interpolation as np.percentile
+
+    Returns:
+        dict: 'group' (sorted keys), 'count', 'max', 'max_id', 'min', 'min_id', 'mean'
+              and 'p<q>' arrays, one entry per group with values
+    """
+    keys = np.asarray(keys, dtype=int)
+    values = np.asarray(values, dtype=float)
+    ids = np.arange(len(values)) if ids is None else np.asarray(ids, dtype=int)
+    valid = ~np.isnan(values)
+    keys, values, ids = keys[valid], values[valid], ids[valid]
+    if len(values) == 0:
+        empty = {name: np.array([]) for name in ('count', 'max', 'min', 'mean')}
+        empty.update({'group': np.array([], dtype=int), 'max_id': np.array([], dtype=int),
+                      'min_id': np.array([], dtype=int)})
+        empty.update({f"p{q:g}": np.array([]) for q in percentiles})
+        return empty
+
+    # sort by value, then stable by key (same order as np.lexsort((values, keys)), faster)
+    order = np.argsort(values)
+    order = order[np.argsort(keys[order], kind="stable")]
+    keys, values, ids = keys[order], values[order], ids[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    count = ends - starts
+    summary = {
+        'group': keys[starts],
+        'count': count,
+        'max': values[ends - 1],
+        'max_id': ids[ends - 1],
+        'min': values[starts],
+        'min_id': ids[starts],
+        'mean': np.add.reduceat(values, starts) / count,
+    }
+    for q in percentiles:
+        position = starts + (count - 1) * (q / 100.0)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, ends - 1)
+        summary[f"p{q:g}"] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return summary
+
+
+def group_members(member_keys, groups):
+    """
+    Rows of the values in each group of a {name: keys} mapping (keys are e.g. pids)
+
+    Returns:
+        tuple: (group index of every pair, row of every pair, group names)
+    """
+    member_keys = np.asarray(member_keys, dtype=int)
+    names = list(groups)
+    group_index, rows = [], []
+    for index, name in enumerate(names):
+        selected = np.flatnonzero(np.isin(member_keys, np.asarray(list(groups[name]), dtype=int)))
+        group_index.append(np.full(len(selected), index))
+        rows.append(selected)
+    if not names:
+        return np.array([], dtype=int), np.array([], dtype=int), names
+    return np.concatenate(group_index), np.concatenate(rows), names
+
+
+def reduce_by_groups(ids, values, member_keys, groups=None, percentiles=SUMMARY_PERCENTILES):
+    """
+    Grouped statistics with group names
+
+    Args:
+        ids: ID of every value (element or property)
+        values: Values
+        member_keys: Key every value is grouped by (e.g. pid of every element)
+        groups: None to group by the keys themselves, or {name: keys} for named groups
+                such as assemblies {name: pids}
+
+    Returns:
+        dict: grouped_reduce layout, 'group' holds the key or the group name
+    """
+    ids = np.asarray(ids, dtype=int)
+    values = np.asarray(values, dtype=float)
+    if groups is None:
+        return grouped_reduce(member_keys, values, ids, percentiles)
+    group_index, rows, names = group_members(member_keys, groups)
+    summary = grouped_reduce(group_index, values[rows], ids[rows], percentiles)
+    summary['group'] = np.array([names[index] for index in summary['group'].tolist()], dtype=object)
+    return summary
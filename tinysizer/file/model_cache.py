@@ -0,0 +1,56 @@
+"""
+On-disk cache of arrays derived from a model
+
+Entries live in one directory per model fingerprint (ModelData.cache_key), so a changed
+BDF or OP2 never reads stale data. Each entry is a compressed .npz named after a hash of
+its key; envelopes streamed from a large OP2 are stored here and read back instead of the
+OP2 on the next session.
+"""
+import hashlib
+import os
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".tinysizer", "cache")
+
+
+class ModelCache:
+    def __init__(self, cache_key, directory=DEFAULT_CACHE_DIR):
+        self.cache_key = cache_key
+        self.directory = os.path.join(directory, cache_key)
+
+    def path(self, key):
+        """File of an entry, key is any tuple / string"""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.npz")
+
+    def load_arrays(self, key):
+        """Arrays stored under key, None when there is no (readable) entry"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                return {name: stored[name] for name in stored.files}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read model cache entry {path}: {e}")
+            return None
+
+    def save_arrays(self, key, arrays):
+        """Store a dict of arrays under key"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        try:
+            np.savez_compressed(path, **arrays)
+        except OSError as e:
+            print(f"Warning: Could not write model cache entry {path}: {e}")
+
+    def load_envelope(self, result_type, component, subcases, reduction):
+        stored = self.load_arrays(("envelope", result_type, component, subcases, reduction))
+        if stored is None:
+            return None
+        stored['component'] = component
+        return stored
+
+    def save_envelope(self, result_type, component, subcases, reduction, envelope):
+        arrays = {name: values for name, values in envelope.items() if name != 'component'}
+        self.save_arrays(("envelope", result_type, component, subcases, reduction), arrays)
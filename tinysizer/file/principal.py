@@ -0,0 +1,79 @@
+"""
+In-plane principal values of shell results as derived components
+
+Every (x, y, xy) column triple of a shell result object (plate / composite stresses and
+strains, membrane and bending resultants) gives principal values, the principal angle
+and the max shear for all elements, corners, fibres and plies at once. They are offered
+as extra components "<label> principal 1", "<label> principal 2", "<label> principal
+angle" and "<label> max shear" next to the columns of the OP2 table.
+
+Angles are in degrees from the x axis of the result system to principal direction 1.
+"""
+import numpy as np
+
+# (x, y, xy, factor applied to xy) column triples and their component label; strains
+# carry engineering shear strain
+PRINCIPAL_SOURCES = {
+    'stress': ('oxx', 'oyy', 'txy', 1.0),
+    'ply': ('o11', 'o22', 't12', 1.0),
+    'strain': ('exx', 'eyy', 'exy', 0.5),
+    'membrane': ('mx', 'my', 'mxy', 1.0),
+    'bending': ('bmx', 'bmy', 'bmxy', 1.0),
+}
+
+PRINCIPAL_QUANTITIES = ("principal 1", "principal 2", "principal angle", "max shear")
+
+
+def principal_values(x, y, xy):
+    """
+    Principal values, angle and max shear of in-plane tensors (broadcast arrays)
+
+    Returns:
+        tuple: (principal 1, principal 2, angle in degrees, max shear)
+    """
+    centre = 0.5 * (x + y)
+    radius = np.hypot(0.5 * (x - y), xy)
+    angle = 0.5 * np.degrees(np.arctan2(2.0 * xy, x - y))
+    return centre + radius, centre - radius, angle, radius
+
+
+def derived_components(headers):
+    """Derived component names available for the columns of a result object"""
+    names = []
+    for label, (x, y, xy, _) in PRINCIPAL_SOURCES.items():
+        if {x, y, xy} <= set(headers):
+            names.extend(f"{label} {quantity}" for quantity in PRINCIPAL_QUANTITIES)
+    return names
+
+
+def parse_derived_component(name):
+    """(label, quantity) of a derived component name, None for other names"""
+    if not isinstance(name, str):
+        return None
+    label, _, quantity = name.partition(" ")
+    if label in PRINCIPAL_SOURCES and quantity in PRINCIPAL_QUANTITIES:
+        return label, quantity
+    return None
+
+
+def derived_column(data, headers, name):
+    """
+    Values of a derived component from the (..., column) data of a result object
+
+    Returns:
+        np.ndarray: data[..., 0] shaped values, None when the columns are missing
+    """
+    parsed = parse_derived_component(name)
+    if parsed is None:
+        return None
+    label, quantity = parsed
+    x, y, xy, shear_factor = PRINCIPAL_SOURCES[label]
+    headers = list(headers)
+    if not {x, y, xy} <= set(headers):
+        return None
+    values = principal_values(data[..., headers.index(x)], data[..., headers.index(y)],
+                              data[..., headers.index(xy)] * shear_factor)
+    values = dict(zip(PRINCIPAL_QUANTITIES, values))
+    if quantity == "max shear":
+        return values[quantity] / shear_factor  # engineering shear strain for strains
+    return values[quantity]
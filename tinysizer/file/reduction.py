@@ -0,0 +1,91 @@
+"""
+One value per element from multi-row element results
+
+CQUAD4 results with corner output have a centre row (grid 0) and one row per corner,
+plate stresses have two fibre rows at each of them and composite stresses one row per
+ply. The rows of every element are brought together by a stable sort on the element ID
+and reduced with ufunc.reduceat over the contiguous groups:
+
+    centre       value of largest magnitude over the centre rows (fibres)
+    max corners  maximum over the corner rows (centre rows when there is no corner output)
+    max layers   maximum over the centre rows (fibres / plies)
+    max abs      value of largest magnitude over all rows, sign kept
+"""
+import numpy as np
+
+REDUCTION_MODES = ("max abs", "centre", "max corners", "max layers")
+DEFAULT_REDUCTION = "max abs"
+
+
+def reduce_rows(ids, values, positions=None, mode=DEFAULT_REDUCTION, return_rows=False):
+    """
+    Reduce the rows of each element to one value
+
+    Args:
+        ids: Element (or node) ID of every row
+        values: Value of every row
+        positions: Grid ID of every row, 0 at the centre (None = all rows at the centre,
+                   e.g. ply rows of composite stresses)
+        mode: One of REDUCTION_MODES
+        return_rows: Also return the row (index into ids / values) every value comes from
+
+    Returns:
+        tuple: (sorted unique IDs, reduced values), NaN for elements without rows of the mode,
+               and with return_rows the source rows, -1 for those elements
+    """
+    if mode not in REDUCTION_MODES:
+        raise ValueError(f"Unknown reduction mode {mode}, expected one of {REDUCTION_MODES}")
+    ids = np.asarray(ids, dtype=int)
+    values = np.asarray(values, dtype=float)
+    if ids.size == 0:
+        return (ids, values, ids.copy()) if return_rows else (ids, values)
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    unique_ids = sorted_ids[starts]
+    if len(unique_ids) == len(ids):
+        # one row per element, nothing to reduce
+        return (unique_ids, values, np.where(np.isnan(values), -1, order)) if return_rows else (unique_ids, values)
+
+    centre = np.ones(len(ids), dtype=bool) if positions is None else np.asarray(positions)[order] == 0
+    if mode == "max corners":
+        has_corners = np.logical_or.reduceat(~centre, starts)
+        # elements without corner output fall back to their centre rows
+        selected = np.where(np.repeat(has_corners, np.diff(np.r_[starts, len(ids)])), ~centre, centre)
+    elif mode in ("centre", "max layers"):
+        selected = centre
+    else:
+        selected = np.ones(len(ids), dtype=bool)
+    selected &= ~np.isnan(values)
+    found = np.logical_or.reduceat(selected, starts)
+
+    # the first row of every element holding its max (magnitude), signed value kept
+    if mode in ("max corners", "max layers"):
+        score = np.where(selected, values, -np.inf)
+    else:
+        score = np.where(selected, np.abs(values), -np.inf)
+    largest = np.maximum.reduceat(score, starts)
+    group = np.cumsum(np.r_[False, sorted_ids[1:] != sorted_ids[:-1]])
+    rows = np.where(score == largest[group], np.arange(len(ids)), len(ids))
+    rows = np.minimum(np.minimum.reduceat(rows, starts), len(ids) - 1)
+    reduced = np.where(found, values[rows], np.nan)
+    if return_rows:
+        return unique_ids, reduced, np.where(found, order[rows], -1)
+    return unique_ids, reduced
+
+
+def result_row_ids(result_obj, n_rows):
+    """
+    Element / node ID and grid position of every row of a pyNastran result object
+
+    Returns:
+        tuple: (ids, positions or None), None when the object has no ID array of n_rows
+    """
+    for id_attr in ('node_gridtype', 'element', 'element_node', 'element_layer'):
+        ids = getattr(result_obj, id_attr, None)
+        if isinstance(ids, np.ndarray) and len(ids) == n_rows:
+            if ids.ndim == 1:
+                return ids, None
+            return ids[:, 0], (ids[:, 1] if id_attr == 'element_node' else None)
+    return None
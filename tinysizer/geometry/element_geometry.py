@@ -0,0 +1,258 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+
+SHELL_TYPES = ("CQUAD4", "CTRIA3")
+BAR_TYPES = ("CBAR", "CBEAM")
+AVERAGING_MODES = ("none", "nodal", "nodal by property")  # contour of element results
+
+
+class ElementGeometry:
+    """
+    Geometry of all shell and bar elements of a model as numpy arrays
+
+    Node coordinates and connectivity are collected once, after that areas, centroids,
+    normals, lengths and directions are a handful of array operations over the whole
+    model. Rows are sorted by element ID, use shell_rows() / bar_rows() to look up
+    elements.
+
+    The node x element incidence matrix (shells and bars, columns sorted by element ID)
+    is built on first use; nodal averages of element results, panel connectivity and the
+    element-at-node / node-of-element queries are sparse products / slices of it.
+    """
+    def __init__(self, bdf_model):
+        # Node coordinates in the basic system, rows sorted by node ID
+        self.node_ids = np.array(sorted(bdf_model.nodes), dtype=int)
+        self.xyz = np.array([bdf_model.nodes[nid].get_position() for nid in self.node_ids], dtype=float).reshape(-1, 3)
+
+        shells, bars = [], []
+        for eid, element in bdf_model.elements.items():
+            if element.type in SHELL_TYPES:
+                nodes = list(element.node_ids[:4])
+                if element.type == "CTRIA3":
+                    nodes = nodes[:3] + [nodes[2]]  # degenerate quad, the 4th corner repeats the 3rd
+                shells.append([eid, element.pid, SHELL_TYPES.index(element.type)] + nodes)
+            elif element.type in BAR_TYPES:
+                bars.append([eid, element.pid] + list(element.node_ids[:2]))
+
+        shells = np.array(sorted(shells), dtype=int).reshape(-1, 7)
+        bars = np.array(sorted(bars), dtype=int).reshape(-1, 4)
+
+        self.shell_ids = shells[:, 0]
+        self.shell_pids = shells[:, 1]
+        self.shell_types = np.array(SHELL_TYPES)[shells[:, 2]] if len(shells) else np.array([], dtype=str)
+        self.shell_nodes = shells[:, 3:]
+        self.bar_ids = bars[:, 0]
+        self.bar_pids = bars[:, 1]
+        self.bar_nodes = bars[:, 2:]
+        # All shells and bars sorted by element ID, the columns of the incidence matrix
+        order = np.argsort(np.concatenate([self.shell_ids, self.bar_ids]), kind="stable")
+        self.element_ids = np.concatenate([self.shell_ids, self.bar_ids])[order]
+        self.element_pids = np.concatenate([self.shell_pids, self.bar_pids])[order]
+        self._element_order = order
+        # Distinct property IDs and the row of every element in them: per-property values
+        # reach the elements as values[element_property_rows]
+        self.property_ids, self.element_property_rows = np.unique(self.element_pids, return_inverse=True)
+
+        self._compute_shells()
+        self._compute_bars()
+        self._incidence = None  # scipy CSR (n_node, n_element), see get_incidence()
+        self._element_incidence = None  # its transpose as CSR, rows are elements
+        print(f"Element geometry: {len(self.shell_ids)} shells, {len(self.bar_ids)} bars")
+
+    def node_rows(self, node_ids):
+        """Rows of node IDs in xyz"""
+        return np.searchsorted(self.node_ids, node_ids)
+
+    def _compute_shells(self):
+        p1, p2, p3, p4 = (self.xyz[self.node_rows(self.shell_nodes[:, i])] for i in range(4))
+
+        # Diagonal cross product: twice the (projected) area and the normal direction,
+        # triangles (p4 == p3) reduce to (p2 - p1) x (p3 - p1)
+        cross = np.cross(p3 - p1, p4 - p2)
+        norm = np.linalg.norm(cross, axis=1)
+        self.shell_areas = 0.5 * norm
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.shell_normals = cross / norm[:, None]
+
+        # Area weighted centroid of the two triangles (p1, p2, p3) and (p1, p3, p4)
+        area_a = 0.5 * np.linalg.norm(np.cross(p2 - p1, p3 - p1), axis=1)
+        area_b = 0.5 * np.linalg.norm(np.cross(p3 - p1, p4 - p1), axis=1)
+        centroid_a = (p1 + p2 + p3) / 3.0
+        centroid_b = (p1 + p3 + p4) / 3.0
+        total = area_a + area_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weighted = (centroid_a * area_a[:, None] + centroid_b * area_b[:, None]) / total[:, None]
+        self.shell_centroids = np.where(total[:, None] > 0, weighted, (p1 + p2 + p3 + p4) / 4.0)
+
+        # Edge lengths 1-2 / 2-3 for panel dimensions (element x along 1-2)
+        self.shell_edge_lengths = np.column_stack([np.linalg.norm(p2 - p1, axis=1), np.linalg.norm(p3 - p2, axis=1)])
+
+    def _compute_bars(self):
+        a = self.xyz[self.node_rows(self.bar_nodes[:, 0])]
+        b = self.xyz[self.node_rows(self.bar_nodes[:, 1])]
+        axis = b - a
+        self.bar_lengths = np.linalg.norm(axis, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.bar_directions = axis / self.bar_lengths[:, None]
+        self.bar_centroids = 0.5 * (a + b)
+
+    #########################################
+    # I N C I D E N C E
+    #########################################
+    def get_incidence(self):
+        """
+        Sparse node x element incidence (1 where the element uses the node)
+
+        Returns:
+            scipy.sparse.csr_matrix: (n_node, n_element), rows as node_ids, columns as
+                                     incidence_element_ids
+        """
+        if self._incidence is None:
+            self.incidence_element_ids = self.element_ids
+            self.incidence_element_pids = self.element_pids
+            column = np.empty(len(self.element_ids), dtype=int)
+            column[self._element_order] = np.arange(len(self.element_ids))
+
+            nodes = np.concatenate([self.shell_nodes.ravel(), self.bar_nodes.ravel()])
+            columns = np.concatenate([np.repeat(column[:len(self.shell_ids)], 4),
+                                      np.repeat(column[len(self.shell_ids):], 2)])
+            incidence = coo_matrix((np.ones(len(nodes)), (self.node_rows(nodes), columns)),
+                                   shape=(len(self.node_ids), len(self.element_ids))).tocsr()
+            incidence.data[:] = 1.0  # the repeated corner of CTRIA3 counts once
+            self._incidence = incidence
+        return self._incidence
+
+    def element_columns(self, element_ids):
+        """Columns of element IDs (shells or bars) in the incidence matrix"""
+        self.get_incidence()
+        return self._rows(self.incidence_element_ids, element_ids)
+
+    def elements_at_nodes(self, node_ids):
+        """Sorted IDs of the elements attached to any of the nodes"""
+        incidence = self.get_incidence()
+        columns = incidence[self.node_rows(np.atleast_1d(node_ids))].indices
+        return self.incidence_element_ids[np.unique(columns)]
+
+    def nodes_of_elements(self, element_ids):
+        """Sorted IDs of the nodes used by any of the elements (shells or bars)"""
+        if self._element_incidence is None:
+            self._element_incidence = self.get_incidence().T.tocsr()
+        rows = self._element_incidence[self.element_columns(np.atleast_1d(element_ids))].indices
+        return self.node_ids[np.unique(rows)]
+
+    def nodal_average(self, element_ids, values):
+        """
+        Average of element values at every node over the attached elements with a value
+
+        Returns:
+            tuple: (node IDs, averages) of the nodes touched by the given elements
+        """
+        incidence = self.get_incidence()
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        vector = np.zeros(incidence.shape[1])
+        weight = np.zeros(incidence.shape[1])
+        columns = self.element_columns(np.asarray(element_ids)[valid])
+        vector[columns] = values[valid]
+        weight[columns] = 1.0
+        counts = incidence @ weight
+        touched = counts > 0
+        return self.node_ids[touched], (incidence @ vector)[touched] / counts[touched]
+
+    def property_nodal_average(self, element_ids, values):
+        """
+        Nodal averages that do not cross property boundaries
+
+        Every element corner gets the average over the elements of its own property at
+        that node, one sparse product over the (node, property) pairs.
+
+        Returns:
+            tuple: (element IDs, corner node IDs (n, 4), corner values (n, 4)), bars use
+                   the first two columns, unused corners are -1 / NaN
+        """
+        incidence = self.get_incidence().tocoo()
+        values = np.asarray(values, dtype=float)
+        element_ids = np.asarray(element_ids, dtype=int)
+        valid = ~np.isnan(values)
+        vector = np.zeros(incidence.shape[1])
+        weight = np.zeros(incidence.shape[1])
+        columns = self.element_columns(element_ids[valid])
+        vector[columns] = values[valid]
+        weight[columns] = 1.0
+
+        # (node, property) pair of every incidence entry as one integer key
+        base = int(self.incidence_element_pids.max()) + 1 if len(self.incidence_element_pids) else 1
+        pairs, pair_index = np.unique(incidence.row.astype(np.int64) * base + self.incidence_element_pids[incidence.col],
+                                      return_inverse=True)
+        grouped = coo_matrix((np.ones(len(pair_index)), (pair_index.ravel(), incidence.col)),
+                             shape=(len(pairs), incidence.shape[1])).tocsr()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = (grouped @ vector) / (grouped @ weight)
+
+        corner_nodes = np.full((len(element_ids), 4), -1)
+        is_shell = np.isin(element_ids, self.shell_ids)
+        corner_nodes[is_shell] = self.shell_nodes[self.shell_rows(element_ids[is_shell])]
+        corner_nodes[~is_shell, :2] = self.bar_nodes[self.bar_rows(element_ids[~is_shell])]
+        element_pids = self.incidence_element_pids[self.element_columns(element_ids)]
+
+        corner_values = np.full(corner_nodes.shape, np.nan)
+        used = corner_nodes >= 0
+        keys = self.node_rows(corner_nodes[used]) * base + np.broadcast_to(element_pids[:, None], used.shape)[used]
+        corner_values[used] = averages[np.searchsorted(pairs, keys)]
+        return element_ids, corner_nodes, corner_values
+
+    #########################################
+    # L O O K U P S
+    #########################################
+    @staticmethod
+    def _rows(sorted_ids, element_ids):
+        element_ids = np.asarray(element_ids, dtype=int)
+        rows = np.searchsorted(sorted_ids, element_ids)
+        if len(sorted_ids) == 0 or np.any(rows >= len(sorted_ids)) or np.any(sorted_ids[np.minimum(rows, len(sorted_ids) - 1)] != element_ids):
+            raise KeyError("Element IDs not found in the element geometry")
+        return rows
+
+    def shell_rows(self, element_ids):
+        """Rows of shell element IDs in the shell arrays"""
+        return self._rows(self.shell_ids, element_ids)
+
+    def bar_rows(self, element_ids):
+        """Rows of bar element IDs in the bar arrays"""
+        return self._rows(self.bar_ids, element_ids)
+
+    def get_shell_areas(self, element_ids):
+        return self.shell_areas[self.shell_rows(element_ids)]
+
+    def get_bar_lengths(self, element_ids):
+        return self.bar_lengths[self.bar_rows(element_ids)]
+
+    def get_centroids(self, element_ids):
+        """Centroids of any mix of shell and bar element IDs"""
+        element_ids = np.asarray(element_ids, dtype=int)
+        centroids = np.full((len(element_ids), 3), np.nan)
+        is_shell = np.isin(element_ids, self.shell_ids)
+        is_bar = np.isin(element_ids, self.bar_ids)
+        centroids[is_shell] = self.shell_centroids[self.shell_rows(element_ids[is_shell])]
+        centroids[is_bar] = self.bar_centroids[self.bar_rows(element_ids[is_bar])]
+        return centroids
+
+    def get_shell_axes(self, element_ids):
+        """
+        Element x / y axes and normals of shells, the Nastran element coordinate systems the
+        stresses, strains and forces are output in: CQUAD4 x bisects the diagonals G1-G3 and
+        G2-G4 (edge 1-2 of a rectangle), CTRIA3 x along edge 1-2, projected on the element plane
+
+        Returns:
+            tuple: (x_axes, y_axes, normals) arrays of shape (n, 3)
+        """
+        rows = self.shell_rows(element_ids)
+        normals = self.shell_normals[rows]
+        p1, p2, p3, p4 = (self.xyz[self.node_rows(self.shell_nodes[rows, i])] for i in range(4))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diagonal_13 = (p3 - p1) / np.linalg.norm(p3 - p1, axis=1)[:, None]
+            diagonal_24 = (p4 - p2) / np.linalg.norm(p4 - p2, axis=1)[:, None]
+        x_axes = np.where((self.shell_types[rows] == "CQUAD4")[:, None], diagonal_13 - diagonal_24, p2 - p1)
+        x_axes = x_axes - np.sum(x_axes * normals, axis=1)[:, None] * normals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_axes /= np.linalg.norm(x_axes, axis=1)[:, None]
+        return x_axes, np.cross(normals, x_axes), normals
@@ -3,6 +3,9 @@ import os
 import numpy as np
 import pyvista as pv
 from tinysizer.file import file_loader  # Import the file loader module
+from tinysizer.file.grouped import reduce_by_groups
+from tinysizer.file.reduction import REDUCTION_MODES
+from tinysizer.geometry.element_geometry import AVERAGING_MODES
 from tinysizer.visualization.plotter_vista import PyVistaMeshPlotter
 from tinysizer.sizing.sizing_tab import SizingTab
 from tinysizer.gui.assembly import AssemblyDialog  
@@ -152,8 +155,20 @@ class MainWindow(QMainWindow):
         op2_layout.addWidget(self.op2_input, 1)  # Add stretch factor 1
         op2_layout.addWidget(op2_button)
         
+        # Full results, or envelopes streamed from the OP2 for files too large to load
+        load_mode_layout = QHBoxLayout()
+        load_mode_label = QLabel("OP2 Load:")
+        load_mode_label.setMinimumWidth(60)
+        self.load_mode_combo = QComboBox()
+        self.load_mode_combo.addItems(file_loader.OP2_LOAD_MODES)
+        self.load_mode_combo.setToolTip("Envelopes only: result tables are not read, envelopes are streamed "
+                                        "from the OP2 and cached (no per subcase results, no sizing)")
+        load_mode_layout.addWidget(load_mode_label)
+        load_mode_layout.addWidget(self.load_mode_combo, 1)
+        
         file_group.addLayout(bdf_layout)
         file_group.addLayout(op2_layout)
+        file_group.addLayout(load_mode_layout)
         
         # Add spacing after file inputs
         file_group.addSpacing(10)
@@ -245,6 +260,10 @@ class MainWindow(QMainWindow):
         #open_action.triggered.connect(self.load_bdf_file)
         file_menu.addAction(open_action)
 
+        combinations_action = QAction("Load Combinations...", self)
+        combinations_action.triggered.connect(self.load_combinations)
+        file_menu.addAction(combinations_action)
+
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -280,6 +299,12 @@ class MainWindow(QMainWindow):
         self.result_type_combo = QComboBox()
         self.subcase_combo = QComboBox()
         self.component_combo = QComboBox()
+        self.reduction_combo = QComboBox()
+        self.reduction_combo.addItems(REDUCTION_MODES)
+        self.reduction_combo.setToolTip("Value shown for elements with several result rows (corners, fibres, plies)")
+        self.averaging_combo = QComboBox()
+        self.averaging_combo.addItems(AVERAGING_MODES)
+        self.averaging_combo.setToolTip("Contour element results per element or averaged at the nodes")
         self.display_result_button = QPushButton("Display Result")
         self.display_result_button.clicked.connect(self.display_result)
         self.display_result_button.setObjectName("displayResultButton")  # for styling
@@ -365,6 +390,10 @@ class MainWindow(QMainWindow):
         left_controls.addWidget(self.subcase_combo)
         left_controls.addWidget(QLabel("Component:"))
         left_controls.addWidget(self.component_combo)
+        left_controls.addWidget(QLabel("Element Value:"))
+        left_controls.addWidget(self.reduction_combo)
+        left_controls.addWidget(QLabel("Averaging:"))
+        left_controls.addWidget(self.averaging_combo)
 
         controls.addLayout(left_controls)
         controls.addStretch(1)  # Center spacing
@@ -400,16 +429,87 @@ class MainWindow(QMainWindow):
         sizing_tab.setContentsMargins(0, 0, 0, 0)  # Remove margins around main layout
     '''
     def create_utils_tab(self):
-        """Creates the results visualization tab"""
+        """Creates the utils tab: summary of a result per property / assembly"""
         utils_tab = QWidget()
         layout = QVBoxLayout(utils_tab)
 
-        placeholder_label = QLabel("TBD")
-        placeholder_label.setAlignment(Qt.AlignCenter)
-        placeholder_label.setStyleSheet("font-size: 14pt; color: gray;")
-        layout.addWidget(placeholder_label)
+        controls = QHBoxLayout()
+        self.summary_source_combo = QComboBox()
+        self.summary_source_combo.addItems(["Displayed Result", "Sizing RF"])
+        self.summary_source_combo.setToolTip("Result selected in the Geometry tab, or the minimum RF of the sized properties")
+        self.summary_group_combo = QComboBox()
+        self.summary_group_combo.addItems(["Property", "Assembly"])
+        summarize_button = QPushButton("Summarize")
+        summarize_button.clicked.connect(self.update_summary_table)
+        controls.addWidget(QLabel("Source:"))
+        controls.addWidget(self.summary_source_combo)
+        controls.addWidget(QLabel("Group By:"))
+        controls.addWidget(self.summary_group_combo)
+        controls.addWidget(summarize_button)
+        controls.addStretch(1)
+        layout.addLayout(controls)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+        self.summary_table = QTableWidget(0, 0)
+        self.summary_table.setSortingEnabled(True)
+        self.summary_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.summary_table, 1)
         self.tabs.addTab(utils_tab, QIcon("tinysizer/gui/pics/utils.png"), "Utils")
 
+    def update_summary_table(self):
+        """Fill the utils table with the grouped statistics of the selected source"""
+        if not getattr(self, 'model_data', None) or self.model_data.bdf is None:
+            QMessageBox.warning(self, "Warning", "No model data available!", QMessageBox.Ok)
+            return
+        assemblies = self.assemblies if self.summary_group_combo.currentText() == "Assembly" else None
+        if assemblies is not None and not assemblies:
+            QMessageBox.warning(self, "Warning", "No assemblies defined!", QMessageBox.Ok)
+            return
+
+        if self.summary_source_combo.currentText() == "Sizing RF":
+            # minimum RF of every sized property, grouped by property (as is) or assembly
+            sized = {pid: self.sizing_tab.get_optimal_result(results).get('min_rf', np.nan)
+                     for pid, results in self.sizing_tab.sizing_results.items() if results}
+            pids = np.fromiter(sized.keys(), dtype=int, count=len(sized))
+            summary = reduce_by_groups(pids, np.fromiter(sized.values(), dtype=float, count=len(sized)), pids, assemblies)
+            title, id_label = "Sizing min RF", "PID"
+        else:
+            result_type = self.result_type_combo.currentText()
+            subcase_text = self.subcase_combo.currentText()
+            component = self.component_combo.currentText()
+            try: subcase_id = int(subcase_text)
+            except ValueError: subcase_id = subcase_text
+            component = None if component in ("", "Magnitude") else component
+            self.model_data.element_reduction = self.reduction_combo.currentText()
+            summary = self.model_data.get_grouped_summary(result_type, subcase_id, component, assemblies)
+            title, id_label = f"{result_type} / {subcase_text} / {component or 'Magnitude'}", "EID"
+
+        if summary is None or len(summary['group']) == 0:
+            self.summary_table.setRowCount(0)
+            self.summary_label.setText(f"{title}: no values")
+            return
+
+        statistics = [name for name in summary if name != 'group']
+        headers = ["Assembly" if assemblies is not None else "PID"] + [
+            f"{name[:-3].capitalize()} {id_label}" if name.endswith("_id") else
+            name.upper() if name.startswith("p") and name[1:].isdigit() else name.capitalize()
+            for name in statistics]
+        self.summary_table.setSortingEnabled(False)  # rows are filled before sorting again
+        self.summary_table.clear()
+        self.summary_table.setColumnCount(len(headers))
+        self.summary_table.setHorizontalHeaderLabels(headers)
+        self.summary_table.setRowCount(len(summary['group']))
+        for col, name in enumerate(['group'] + statistics):
+            for row, value in enumerate(summary[name].tolist()):
+                item = QTableWidgetItem()
+                # numbers as numbers so columns sort numerically
+                item.setData(Qt.DisplayRole, value if isinstance(value, (str, int)) else float(f"{value:.6g}"))
+                self.summary_table.setItem(row, col, item)
+        self.summary_table.setSortingEnabled(True)
+        self.summary_table.resizeColumnsToContents()
+        self.summary_label.setText(f"{title}: {len(summary['group'])} groups")
+
     def create_export_tab(self):
         export_tab=QWidget()
         layout=QVBoxLayout(export_tab)
@@ -962,9 +1062,13 @@ class MainWindow(QMainWindow):
     # R E A D  &  P L O T
     #########################################
     def validate_and_plot(self):
+        # Running sizing jobs are stopped before the model they read is replaced
+        if hasattr(self, 'sizing_tab'):
+            self.sizing_tab.stop_sizing_jobs()
         model_data, load_status, error_message = file_loader.validate_and_load(
             self.bdf_input.text(), 
-            self.op2_input.text()
+            self.op2_input.text(),
+            self.load_mode_combo.currentText()
         )
         
         # sadece bdf verildiyse
@@ -1113,6 +1217,8 @@ class MainWindow(QMainWindow):
             # Handle "Magnitude" special case
             if component == "Magnitude":
                 component = None
+            self.model_data.element_reduction = self.reduction_combo.currentText()
+            self.model_data.nodal_averaging = self.averaging_combo.currentText()
                 
             # Plot the mesh with the selected result
             self.pyv_plotter.plot_mesh(
@@ -1158,7 +1264,8 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            subcase_id = int(subcase_text)
+            try: subcase_id = int(subcase_text)
+            except ValueError: subcase_id = subcase_text  # ENVELOPE and other pseudo-subcases
             components = model_data.get_available_components(result_type, subcase_id)
             
             # Add "Magnitude" option for displacement
@@ -1483,6 +1590,24 @@ class MainWindow(QMainWindow):
     #########################################
     # H E L P E R S
     #########################################
+    def load_combinations(self):
+        """Read a load combination matrix (CSV / Excel) and offer its combinations as subcases"""
+        if not hasattr(self, 'model_data') or self.model_data.op2 is None:
+            QMessageBox.warning(self, "Warning", "Load BDF & OP2 files first!", QMessageBox.Ok)
+            return
+        filename, _ = QFileDialog.getOpenFileName(self, "Select Load Combination File", "",
+                                                  "Combination files (*.csv *.xlsx *.xls);;All files (*.*)")
+        if not filename:
+            return
+        try:
+            combinations = self.model_data.load_combinations(filename)
+        except (ValueError, KeyError, OSError) as e:
+            QMessageBox.critical(self, "Error", f"Could not load combinations: {e}")
+            return
+        self.update_subcase_combo(self.model_data)
+        self.add_and_update_sizing_tab()
+        QMessageBox.information(self, "Success", f"{len(combinations)} load combinations added as subcases", QMessageBox.Ok)
+
     def browse_file(self, file_type):
         filename = file_loader.browse_file(self, file_type)
         if filename:
@@ -0,0 +1,284 @@
+"""
+Bar (CBAR / PBARL) sizing helpers
+
+Section properties are computed with numpy over whole arrays of dimensions, so all PBARL
+cards of one section type - or one card over a whole thickness x width grid - are handled
+in a single call. Dimensions follow the Nastran PBARL DIMi order, DIM1-like widths lie
+along the element y axis and heights along z; I1 is the inertia about y (bending in plane 1),
+I2 the inertia about z.
+"""
+import numpy as np
+from tinysizer.file.file_loader import get_op2_table
+from tinysizer.sizing.criteria import register_criterion, _field
+
+# Effective length factor K of the Euler / Johnson column checks (1.0 = pinned-pinned)
+EFFECTIVE_LENGTH_FACTOR = 1.0
+
+# cbar_force columns
+BAR_FORCE_COLUMNS = {
+    'bending_moment_a1': 0, 'bending_moment_a2': 1, 'bending_moment_b1': 2, 'bending_moment_b2': 3,
+    'shear1': 4, 'shear2': 5, 'axial': 6, 'torque': 7,
+}
+
+
+#########################################
+# S E C T I O N  P R O P E R T I E S
+#########################################
+def _rectangles(rects, closed_j=None):
+    """
+    Properties of a section built from rectangles (yc, zc, by, bz), all broadcastable arrays
+
+    Returns A, I1, I2, J, c1, c2 about the section centroid. J is the thin walled open
+    section value sum(b t^3 / 3) unless closed_j is given.
+    """
+    A = sum(by * bz for _, _, by, bz in rects)
+    yc = sum(y * by * bz for y, _, by, bz in rects) / A
+    zc = sum(z * by * bz for _, z, by, bz in rects) / A
+    I1 = sum(by * bz**3 / 12.0 + by * bz * (z - zc)**2 for _, z, by, bz in rects)
+    I2 = sum(bz * by**3 / 12.0 + by * bz * (y - yc)**2 for y, _, by, bz in rects)
+    c1 = np.maximum.reduce([np.abs(z - zc) + bz / 2.0 for _, z, _, bz in rects])
+    c2 = np.maximum.reduce([np.abs(y - yc) + by / 2.0 for y, _, by, _ in rects])
+    if closed_j is None:
+        closed_j = sum(np.maximum(by, bz) * np.minimum(by, bz)**3 / 3.0 for _, _, by, bz in rects)
+    return {'A': A, 'I1': I1, 'I2': I2, 'J': closed_j, 'c1': c1, 'c2': c2}
+
+
+def _rod(d):
+    r = d[0]
+    I = np.pi * r**4 / 4.0
+    return {'A': np.pi * r**2, 'I1': I, 'I2': I, 'J': 2.0 * I, 'c1': r, 'c2': r}
+
+
+def _tube(d):
+    ro, ri = d[0], d[1]
+    I = np.pi * (ro**4 - ri**4) / 4.0
+    return {'A': np.pi * (ro**2 - ri**2), 'I1': I, 'I2': I, 'J': 2.0 * I, 'c1': ro, 'c2': ro}
+
+
+def _bar(d):
+    b, h = d[0], d[1]
+    long_side, short_side = np.maximum(b, h), np.minimum(b, h)
+    J = long_side * short_side**3 * (1.0 / 3.0 - 0.21 * short_side / long_side * (1.0 - short_side**4 / (12.0 * long_side**4)))
+    return _rectangles([(0.0, 0.0, b, h)], closed_j=J)
+
+
+def _box(d):
+    w, h, t1, t2 = d[0], d[1], d[2], d[3]
+    # Bredt-Batho torsion constant of the thin walled box
+    J = 2.0 * t1 * t2 * (w - t2)**2 * (h - t1)**2 / (w * t2 + h * t1 - t2**2 - t1**2)
+    return _rectangles([
+        (w / 2.0, t1 / 2.0, w, t1),
+        (w / 2.0, h - t1 / 2.0, w, t1),
+        (t2 / 2.0, h / 2.0, t2, h - 2.0 * t1),
+        (w - t2 / 2.0, h / 2.0, t2, h - 2.0 * t1),
+    ], closed_j=J)
+
+
+def _i_section(d):
+    h, b_bottom, b_top, tw, tf_bottom, tf_top = d[0], d[1], d[2], d[3], d[4], d[5]
+    web = h - tf_bottom - tf_top
+    return _rectangles([
+        (0.0, tf_bottom / 2.0, b_bottom, tf_bottom),
+        (0.0, tf_bottom + web / 2.0, tw, web),
+        (0.0, h - tf_top / 2.0, b_top, tf_top),
+    ])
+
+
+def _t_section(d):
+    b, h, tf, tw = d[0], d[1], d[2], d[3]
+    return _rectangles([
+        (0.0, h - tf / 2.0, b, tf),
+        (0.0, (h - tf) / 2.0, tw, h - tf),
+    ])
+
+
+def _channel(d):
+    b, h, tw, tf = d[0], d[1], d[2], d[3]
+    return _rectangles([
+        (tw / 2.0, h / 2.0, tw, h),
+        ((tw + b) / 2.0, tf / 2.0, b - tw, tf),
+        ((tw + b) / 2.0, h - tf / 2.0, b - tw, tf),
+    ])
+
+
+def _angle(d):
+    b, h, t1, t2 = d[0], d[1], d[2], d[3]
+    return _rectangles([
+        (b / 2.0, t1 / 2.0, b, t1),
+        (t2 / 2.0, t1 + (h - t1) / 2.0, t2, h - t1),
+    ])
+
+
+SECTION_FUNCTIONS = {
+    'ROD': _rod, 'TUBE': _tube, 'BAR': _bar, 'BOX': _box,
+    'I': _i_section, 'T': _t_section, 'CHAN': _channel, 'L': _angle,
+}
+
+# Which DIMi (0 based) the sizing thickness and width drive, None keeps the card value
+SIZING_DIMENSIONS = {
+    'ROD': lambda t, w, d: [w / 2.0],
+    'TUBE': lambda t, w, d: [w / 2.0, w / 2.0 - t],
+    'BAR': lambda t, w, d: [w, t],
+    'BOX': lambda t, w, d: [w, d[1], t, t],
+    'I': lambda t, w, d: [d[0], w, w, t, t, t],
+    'T': lambda t, w, d: [w, d[1], t, t],
+    'CHAN': lambda t, w, d: [w, d[1], t, t],
+    'L': lambda t, w, d: [w, d[1], t, t],
+}
+
+
+def section_properties(section_type, dims):
+    """
+    A, I1, I2, J, c1, c2 of PBARL sections
+
+    Args:
+        section_type: PBARL Type ('BAR', 'BOX', 'I', ...)
+        dims: Sequence of DIMi values, each a scalar or array (broadcast together)
+
+    Returns:
+        dict: {name: array}
+    """
+    if section_type not in SECTION_FUNCTIONS:
+        raise ValueError(f"PBARL section type {section_type} is not supported for bar sizing")
+    dims = [np.asarray(value, dtype=float) for value in dims]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return SECTION_FUNCTIONS[section_type](dims)
+
+
+def sizing_dimensions(section_type, base_dims, thickness, width):
+    """DIMi list of a PBARL section with thickness / width applied (broadcast arrays allowed)"""
+    if section_type not in SIZING_DIMENSIONS:
+        raise ValueError(f"PBARL section type {section_type} is not supported for bar sizing")
+    return SIZING_DIMENSIONS[section_type](np.asarray(thickness, dtype=float),
+                                           np.asarray(width, dtype=float), base_dims)
+
+
+def base_sizing_values(section_type, dims):
+    """(thickness, width) a PBARL card corresponds to, the inverse of sizing_dimensions"""
+    if section_type == 'ROD':
+        return 0.0, 2.0 * dims[0]
+    if section_type == 'TUBE':
+        return dims[0] - dims[1], 2.0 * dims[0]
+    if section_type == 'BAR':
+        return dims[1], dims[0]
+    if section_type == 'I':
+        return dims[3], dims[1]
+    return dims[2], dims[0]
+
+
+def pbarl_section_table(bdf_model):
+    """
+    Section properties of every PBARL in the model, one vectorized call per section type
+
+    Returns:
+        dict: pid -> {'type', 'mid', 'dims', 'A', 'I1', 'I2', 'J', 'c1', 'c2'}
+    """
+    by_type = {}
+    for pid, prop in bdf_model.properties.items():
+        if prop.type == "PBARL" and prop.Type in SECTION_FUNCTIONS:
+            by_type.setdefault(prop.Type, []).append(prop)
+
+    table = {}
+    for section_type, props in by_type.items():
+        dims = np.array([prop.dim for prop in props], dtype=float)  # (n_prop, n_dim)
+        values = section_properties(section_type, dims.T)
+        for i, prop in enumerate(props):
+            table[prop.pid] = {'type': section_type, 'mid': prop.mid, 'dims': list(dims[i])}
+            table[prop.pid].update({name: float(np.broadcast_to(value, (len(props),))[i])
+                                    for name, value in values.items()})
+    return table
+
+
+#########################################
+# L O A D S
+#########################################
+def bar_force_arrays(op2_data, element_ids, subcases):
+    """
+    Stack cbar_force of the given elements over subcases
+
+    Returns:
+        dict: 'axial', 'moment1', 'moment2', 'torque' arrays (n_subcase, n_elem) aligned with
+              element_ids (NaN where an element has no result), 'subcase_ids'
+    """
+    table = get_op2_table(op2_data, 'cbar_force', group="force")
+    element_ids = np.asarray(element_ids)
+    subcase_ids, blocks = [], []
+    for subcase_id in subcases:
+        if subcase_id not in table:
+            continue
+        result = table[subcase_id]
+        rows = np.searchsorted(result.element, element_ids)
+        rows = np.clip(rows, 0, len(result.element) - 1)
+        found = result.element[rows] == element_ids
+        block = np.where(found[:, None], result.data[0][rows], np.nan)
+        subcase_ids.append(subcase_id)
+        blocks.append(block)
+
+    if not blocks:
+        raise ValueError("No CBAR force results found")
+
+    data = np.stack(blocks).astype(float)  # (n_subcase, n_elem, 8)
+    c = BAR_FORCE_COLUMNS
+    return {
+        'axial': data[:, :, c['axial']],
+        'moment1': np.maximum(np.abs(data[:, :, c['bending_moment_a1']]), np.abs(data[:, :, c['bending_moment_b1']])),
+        'moment2': np.maximum(np.abs(data[:, :, c['bending_moment_a2']]), np.abs(data[:, :, c['bending_moment_b2']])),
+        'torque': data[:, :, c['torque']],
+        'subcase_ids': np.array(subcase_ids),
+    }
+
+
+def bar_stress(forces, section):
+    """
+    Stress dict for the criterion registry from bar forces and (possibly gridded) section
+
+    Section arrays carry two leading grid axes (thickness x width) while forces are
+    (subcase x element), so everything broadcasts to (n_t, n_w, n_subcase, n_elem).
+    oxx is the extreme fibre stress of larger magnitude, txy the torsion shear.
+    """
+    A, I1, I2, J = (section[name][..., None, None] for name in ('A', 'I1', 'I2', 'J'))
+    c1, c2 = section['c1'][..., None, None], section['c2'][..., None, None]
+    axial = forces['axial'] / A
+    bending = forces['moment1'] * c1 / I1 + forces['moment2'] * c2 / I2
+    oxx = np.where(axial >= 0, axial + bending, axial - bending)
+    return {
+        'oxx': oxx,
+        'oyy': np.zeros_like(oxx),
+        'txy': forces['torque'] * np.maximum(c1, c2) / J,
+        'axial_force': forces['axial'],
+        'A': A,
+        'I_min': np.minimum(I1, I2),
+        'length': forces['length'],
+    }
+
+
+#########################################
+# S T A B I L I T Y  C R I T E R I A
+#########################################
+def _column_inputs(stress, allowables):
+    E = _field(allowables, "E", "E1")
+    compression = np.maximum(-stress['axial_force'], 0.0)
+    effective_length = EFFECTIVE_LENGTH_FACTOR * stress['length']
+    return E, compression, effective_length
+
+
+@register_criterion("Euler Buckling", element_kind="bar",
+                    description="Pcr = pi^2 E I_min / (K L)^2 against compressive axial load")
+def euler_buckling_rf(stress, allowables):
+    E, compression, effective_length = _column_inputs(stress, allowables)
+    critical_load = np.pi**2 * E * stress['I_min'] / effective_length**2
+    return np.where(compression > 0, critical_load / compression, np.inf)
+
+
+@register_criterion("Johnson Column", element_kind="bar",
+                    description="Johnson parabola below the transition slenderness, Euler above")
+def johnson_column_rf(stress, allowables):
+    E, compression, effective_length = _column_inputs(stress, allowables)
+    Fcy = _field(allowables, "Fcy", "Fty")
+    Fcy = np.where(np.isnan(Fcy), _field(allowables, "Ftu"), Fcy)
+    slenderness = effective_length / np.sqrt(stress['I_min'] / stress['A'])
+    transition = np.sqrt(2.0 * np.pi**2 * E / Fcy)
+    johnson = Fcy - (Fcy * slenderness / (2.0 * np.pi))**2 / E
+    euler = np.pi**2 * E / slenderness**2
+    critical_stress = np.where(slenderness < transition, johnson, euler)
+    return np.where(compression > 0, critical_stress * stress['A'] / compression, np.inf)
@@ -0,0 +1,135 @@
+"""
+Shear / compression buckling of flat web panels
+
+The shells of a property are split into panels: patches of elements connected through
+shared edges, cut along the edges that other properties (stiffener / frame webs, bars)
+also use and at feature edges whose adjacent normals differ by more than FEATURE_ANGLE.
+The panel length a and width b (a >= b) are the extents of the patch nodes along its two
+principal in-plane directions. Critical stresses of a simply supported isotropic plate:
+
+    tau_cr = k_s pi^2 E / (12 (1 - nu^2)) (t / b)^2,   k_s = 5.35 + 4 (b / a)^2
+    sig_cr = k_c pi^2 E / (12 (1 - nu^2)) (t / b)^2,   k_c = 4
+
+combined with the interaction R_c + R_s^2 = 1, i.e. RF = 2 / (R_c + sqrt(R_c^2 + 4 R_s^2)).
+Laminates use the same coefficients on critical force resultants pi^2 D / b^2 with an
+effective bending stiffness D (laminate.laminate_buckling_rf).
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from tinysizer.sizing.criteria import register_criterion, _field
+
+# Plate buckling coefficients (simply supported edges)
+COMPRESSION_BUCKLING_COEFFICIENT = 4.0
+
+# Angle (degrees) between adjacent element normals beyond which an edge bounds a panel
+FEATURE_ANGLE = 30.0
+
+
+def panel_dimensions(geometry, element_ids, feature_angle=FEATURE_ANGLE):
+    """
+    Panel length a and width b of every shell, panels found from edge connectivity
+
+    Args:
+        geometry: ElementGeometry of the model
+        element_ids: Shell element IDs of one property
+        feature_angle: Normal angle (degrees) across an edge that splits panels
+
+    Returns:
+        tuple: (a, b, panel index) arrays aligned with element_ids
+    """
+    element_ids = np.asarray(element_ids, dtype=int)
+    n_elem = len(element_ids)
+    shell_rows = geometry.shell_rows(element_ids)
+    nodes = geometry.node_rows(geometry.shell_nodes[shell_rows])  # (n_elem, 4) rows in xyz
+
+    # Element edges 1-2, 2-3, 3-4, 4-1 as sorted node pairs, the collapsed edge of CTRIA3 dropped
+    edges = np.stack([nodes, np.roll(nodes, -1, axis=1)], axis=-1).reshape(-1, 2)
+    edge_element = np.repeat(np.arange(n_elem), 4)
+    keep = edges[:, 0] != edges[:, 1]
+    edges, edge_element = np.sort(edges[keep], axis=1), edge_element[keep]
+    unique_edges, edge_index, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+    edge_index = edge_index.ravel()
+
+    # Edges also used by other elements of the model (other properties, bars): both edge
+    # nodes in one incidence column outside the property
+    incidence = geometry.get_incidence()
+    on_edge = incidence[unique_edges[:, 0]].multiply(incidence[unique_edges[:, 1]]).tocsr()
+    own = on_edge[:, geometry.element_columns(element_ids)]
+    shared = np.asarray(on_edge.sum(axis=1)).ravel() > np.asarray(own.sum(axis=1)).ravel()
+
+    # Interior edges join exactly two elements of the property at a small kink
+    order = np.argsort(edge_index, kind="stable")
+    first, second = order[:-1], order[1:]
+    pair = (edge_index[first] == edge_index[second]) & (counts[edge_index[first]] == 2)
+    first, second = edge_element[first[pair]], edge_element[second[pair]]
+    normals = geometry.shell_normals[shell_rows]
+    smooth = np.abs(np.sum(normals[first] * normals[second], axis=1)) >= np.cos(np.radians(feature_angle))
+    joined = smooth & ~shared[edge_index[order[:-1][pair]]]
+    adjacency = coo_matrix((np.ones(joined.sum()), (first[joined], second[joined])), shape=(n_elem, n_elem))
+    n_panel, panel = connected_components(adjacency, directed=False)
+
+    # Distinct (panel, node) pairs, all panels at once
+    keys = np.unique(panel[:, None].astype(np.int64) * len(geometry.node_ids) + nodes)
+    node_panel, node_rows = keys // len(geometry.node_ids), keys % len(geometry.node_ids)
+    xyz = geometry.xyz[node_rows]
+    node_count = np.bincount(node_panel, minlength=n_panel)
+    mean = np.stack([np.bincount(node_panel, xyz[:, k], minlength=n_panel) for k in range(3)], axis=1)
+    centred = xyz - (mean / np.maximum(node_count, 1)[:, None])[node_panel]
+
+    # Principal directions of every patch (eigenvectors of the node scatter matrix), the
+    # two largest span the panel plane
+    scatter = np.zeros((n_panel, 3, 3))
+    np.add.at(scatter, node_panel, centred[:, :, None] * centred[:, None, :])
+    _, directions = np.linalg.eigh(scatter)
+    in_plane = np.einsum("ni,nik->nk", centred, directions[node_panel][:, :, 1:])  # (n_node, 2)
+
+    starts = np.concatenate([[0], np.cumsum(node_count)[:-1]])
+    extent = np.maximum.reduceat(in_plane, starts, axis=0) - np.minimum.reduceat(in_plane, starts, axis=0)
+    extent[node_count <= 2] = 0.0
+    a, b = extent.max(axis=1), extent.min(axis=1)
+    return a[panel], b[panel], panel
+
+
+def panel_buckling_stresses(E, nu, thickness, a, b):
+    """Critical shear and compression buckling stresses (broadcast arrays)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plate = np.pi**2 * E / (12.0 * (1.0 - nu**2)) * (thickness / b)**2
+        k_shear = 5.35 + 4.0 * (b / a)**2
+    return k_shear * plate, COMPRESSION_BUCKLING_COEFFICIENT * plate
+
+
+def panel_buckling_resultants(D, a, b):
+    """Critical shear and compression force per length of a plate of bending stiffness D"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plate = np.pi**2 * D / b**2
+        k_shear = 5.35 + 4.0 * (b / a)**2
+    return k_shear * plate, COMPRESSION_BUCKLING_COEFFICIENT * plate
+
+
+def interaction_rf(R_c, R_s):
+    """RF of the compression / shear interaction R_c + R_s^2 = 1"""
+    denominator = R_c + np.sqrt(R_c**2 + 4.0 * R_s**2)
+    with np.errstate(divide="ignore"):
+        return np.where(denominator > 0, 2.0 / denominator, np.inf)
+
+
+@register_criterion("Panel Buckling", element_kind="shell",
+                    description="Shear / compression buckling of the web panel, Rc + Rs^2 = 1 interaction",
+                    thickness_exponent=3.0)
+def panel_buckling_rf(stress, allowables):
+    if 'panel_b' not in stress:
+        return np.full(np.shape(stress['oxx']), np.nan)  # no panel geometry for these stresses
+    E = _field(allowables, "E", "E1")
+    nu = _field(allowables, "nu", "nu12")
+    nu = np.where(np.isnan(nu), 0.3, nu)
+    tau_cr, sigma_cr = panel_buckling_stresses(E, nu, stress['thickness'], stress['panel_a'], stress['panel_b'])
+
+    # Membrane (mid-plane) stresses drive buckling, compression positive
+    oxx = stress.get('membrane_oxx', stress['oxx'])
+    oyy = stress.get('membrane_oyy', stress['oyy'])
+    txy = stress.get('membrane_txy', stress['txy'])
+    R_c = np.maximum(-np.minimum(oxx, oyy), 0.0) / sigma_cr
+    R_s = np.abs(txy) / tau_cr
+    rf = interaction_rf(R_c, R_s)
+    return np.broadcast_to(rf, np.broadcast_shapes(rf.shape, np.shape(stress['oxx'])))
@@ -1,20 +1,117 @@
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
 import numpy as np
+from tinysizer.file.file_loader import get_op2_table
+from tinysizer.sizing.materials import MaterialDatabase
+from tinysizer.sizing.criteria import CRITERION_FIELDS, FAILURE_CRITERIA, von_mises
+from tinysizer.file.principal import principal_values
+from tinysizer.sizing.buckling import panel_dimensions
+from tinysizer.sizing.compression import COMPRESS_BLOCK_SUBCASES, COMPRESS_MIN_SUBCASES, compress_stress_blocks
+from tinysizer.sizing.bars import (bar_force_arrays, bar_stress, base_sizing_values,
+                                   section_properties, sizing_dimensions)
+from tinysizer.sizing.laminate import ORIENTATIONS, candidate_stacks, evaluate_stacks, stacking_sequence
+from tinysizer.sizing.mass import MASS_SCALE, rank_materials
+from tinysizer.sizing.plies import (PLY_MATERIALS, critical_ply, ply_failure_indices, ply_layup_table,
+                                    ply_row_allowables)
+from tinysizer.sizing.pruning import PRUNE_MIN_SUBCASES, envelope_subcases, governing_subcases
+from tinysizer.sizing.resultants import fibre_stresses, thickness_batches
+
+# OP2 stress tables read for shell sizing with the columns holding in-plane oxx, oyy, txy
+# (composite tables give ply stresses o11, o22, t12 in material axes)
+SHELL_STRESS_TABLES = {
+    "composite": (("cquad4_composite_stress", "ctria3_composite_stress"), "element_layer", (0, 1, 2)),
+    "plate": (("cquad4_stress", "ctria3_stress"), "element_node", (1, 2, 3)),
+}
+
+
+class SizingCancelled(Exception):
+    """Raised inside a sizing sweep when the running job has been cancelled"""
+
 
 class Calculator:
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, verbose=True, material_db=None):
         self.parent = parent
         self.failures = None
         self.materials = None
+        self.verbose = verbose  # background jobs turn the per-step console report off
         
-        # Material database with ultimate strengths (example values in MPa)
-        self.material_properties = {
-            "Aluminum 6061-T6": {"ultimate_strength": 310, "yield_strength": 276, "density": 2700},
-            "Steel AISI 4130": {"ultimate_strength": 670, "yield_strength": 435, "density": 7850},
-            "Titanium Ti-6Al-4V": {"ultimate_strength": 950, "yield_strength": 880, "density": 4430},
-            "Composite Carbon/Epoxy": {"ultimate_strength": 1500, "yield_strength": 1200, "density": 1600},
-            "Aluminum 7075-T6": {"ultimate_strength": 572, "yield_strength": 503, "density": 2810},
-            "Steel 4340": {"ultimate_strength": 745, "yield_strength": 470, "density": 7850}
-        }
+        # Material allowables (MPa) and densities (kg/m^3) come from the material database
+        self.material_db = material_db if material_db is not None else MaterialDatabase()
+        self._property_elements = None  # pid -> element id array, built on first use
+        
+        # Memoized RF results, so a different target RF is answered without evaluating criteria:
+        # stress sweep (model key, pid, material, criterion, subcases, scale factor, rank) -> combination
+        # result per thickness; resultant, bar and laminate sizing (model key, path, pid, material,
+        # criterion, subcases, grid) -> RF curve over the whole thickness / section / stack grid
+        self.result_memo = {}
+        self._input_cache = {}  # stress / bar force arrays per (kind, pid, subcases)
+        self._memo_state = None  # (model key, material database version) the caches belong to
+        # Held by a running sizing job (job_snapshot), the caches are only touched under it
+        self.lock = threading.RLock()
+        self._pinned = False  # caches kept for the running job even if the state changes
+        
+        # Relative error allowed for low rank (SVD) subcase compression, None = exact stresses.
+        # Only the stress sweep (size_for_target_rf_multi: PSHELL without FORCE_SHELL output,
+        # PCOMP plies) of COMPRESS_MIN_SUBCASES or more subcases is compressed; resultant,
+        # laminate ply count and bar sizing read their (much smaller) force arrays as they are
+        self.compression_tolerance = None
+    
+    def check_memo(self):
+        """Drop memoized results once another model (OP2) or a changed material database is in use"""
+        with self.lock:
+            if self._pinned:
+                return self._memo_state[0]
+            model_data = self.parent.model_data
+            model_key = getattr(model_data, 'cache_key', None) or f"model-{id(model_data)}"
+            state = (model_key, self.material_db.version)
+            if state != self._memo_state:
+                if self._memo_state is not None:
+                    print(f"Model or material database changed, {len(self.result_memo)} memoized results dropped")
+                self.result_memo.clear()
+                self._input_cache.clear()
+                self._property_elements = None
+                self._memo_state = state
+            return model_key
+
+    @contextmanager
+    def job_snapshot(self, model_data):
+        """
+        Run one sizing job on a fixed snapshot of the model
+
+        The calculator sees model_data for the whole job and its caches are checked once
+        against (model key, material database version) and then kept, all under the lock:
+        a reload or a material edit on the GUI thread can not swap the model or clear the
+        memo / input caches while the job iterates them. The next job checks them again.
+        """
+        with self.lock:
+            parent = self.parent
+            self.parent = SimpleNamespace(model_data=model_data)
+            try:
+                self.check_memo()
+                self._pinned = True
+                yield self
+            finally:
+                self.parent, self._pinned = parent, False
+    
+    def memoized_curve(self, key, compute):
+        """
+        RF curve of a vectorized sizing path from result_memo, compute() fills it once
+
+        Args:
+            key: (path, pid, material, criterion, subcases, grid) without the model key
+        """
+        with self.lock:
+            memo_key = (self.check_memo(),) + tuple(key)
+            if memo_key not in self.result_memo:
+                self.result_memo[memo_key] = compute()
+            return self.result_memo[memo_key]
+
+    @staticmethod
+    def grid_key(values):
+        """Hashable key of a thickness / width grid"""
+        return tuple(np.round(np.asarray(values, dtype=float), 12).tolist())
     
     def get_available_subcases(self):
         """Get all available subcase IDs from OP2 results"""
@@ -23,36 +120,398 @@ class Calculator:
             
             # Check different result types for available subcases
             available_subcases = set()
+            available_subcases.update(get_op2_table(op2_data, 'displacements', group=None).keys())
+            for tables, _, _ in SHELL_STRESS_TABLES.values():
+                for table_name in tables:
+                    available_subcases.update(get_op2_table(op2_data, table_name).keys())
+            available_subcases.update(get_op2_table(op2_data, 'cquad4_force', group="force").keys())
             
-            if hasattr(op2_data, 'displacements'):
-                available_subcases.update(op2_data.displacements.keys())
-            
-            if hasattr(op2_data, 'cquad4_stress'):
-                available_subcases.update(op2_data.cquad4_stress.keys())
-                
-            if hasattr(op2_data, 'cquad4_force'):
-                available_subcases.update(op2_data.cquad4_force.keys())
-            
-            return sorted(list(available_subcases))
+            return sorted(list(available_subcases)) or [1]
             
         except Exception as e:
             print(f"Error getting available subcases: {e}")
             return [1]  # Default fallback
+
+    def get_property_element_ids(self, property_id):
+        """Element IDs of a property as an array (pid map built once per model)"""
+        if self._property_elements is None:
+            grouped = {}
+            for elem_id, element in self.parent.model_data.bdf.elements.items():
+                pid = getattr(element, 'pid', None)
+                if pid is not None:
+                    grouped.setdefault(pid, []).append(elem_id)
+            self._property_elements = {pid: np.array(sorted(eids)) for pid, eids in grouped.items()}
+        return self._property_elements.get(property_id, np.array([], dtype=int))
+
+    def get_base_thickness(self, property_id):
+        """Thickness the OP2 stresses were computed with"""
+        prop = self.parent.model_data.bdf.properties[property_id]
+        return (
+            prop.t if prop.type == "PSHELL" else 
+            prop.thicknesses[0] if prop.type == "PCOMP" else 1.0
+        )
+
+    def get_laminate_factor(self, property_id):
+        """Total laminate thickness over the sized (first ply) thickness, 1.0 for other properties"""
+        prop = self.parent.model_data.bdf.properties[property_id]
+        return float(np.sum(prop.thicknesses)) / self.get_base_thickness(property_id) if prop.type == "PCOMP" else 1.0
+
+    def get_stress_arrays(self, property_id, subcases=None):
+        """
+        Stack the shell stresses of a property over all subcases into (subcase x row) arrays
+        
+        Args:
+            property_id: Property ID to filter elements
+            subcases: Subcase IDs to read (default all available)
+        
+        Returns:
+            dict: 'oxx', 'oyy', 'txy' arrays (n_subcase, n_rows), 'element_ids' and 'layers'
+                  per row, 'subcase_ids', 'kind' ("shell") and 'source' table family
+        """
+        self.check_memo()
+        if subcases is None:
+            subcases = self.get_available_subcases()
+        cache_key = ("stress", property_id, tuple(subcases))
+        if cache_key in self._input_cache:
+            return self._input_cache[cache_key]
+
+        layout = self._locate_stresses(property_id, subcases)
+        data = self._read_stresses(layout, slice(None))  # (n_subcase, n_rows, 3)
+        self._input_cache[cache_key] = {
+            'oxx': data[:, :, 0],
+            'oyy': data[:, :, 1],
+            'txy': data[:, :, 2],
+            **{key: layout[key] for key in ('element_ids', 'layers', 'subcase_ids', 'kind', 'source')},
+        }
+        return self._input_cache[cache_key]
+
+    def _locate_stresses(self, property_id, subcases):
+        """
+        Find the stress table family holding the shells of a property, without stacking them
+
+        Returns:
+            dict: get_stress_arrays keys except the stresses, with the 'tables', 'id_attr',
+                  'columns' and 'target_elements' read by _read_stresses
+        """
+        op2_data = self.parent.model_data.op2
+        prop = self.parent.model_data.bdf.properties[property_id]
+        target_elements = self.get_property_element_ids(property_id)
+        if target_elements.size == 0:
+            raise ValueError(f"No elements found with property ID {property_id}")
+
+        # Laminates are read from the ply tables first, plain shells from the plate tables
+        order = ("composite", "plate") if prop.type == "PCOMP" else ("plate", "composite")
+        for source in order:
+            table_names, id_attr, columns = SHELL_STRESS_TABLES[source]
+            tables = [get_op2_table(op2_data, name) for name in table_names]
+            tables = [table for table in tables if table]
+            if not tables:
+                continue
+
+            subcase_ids, element_ids, layers = [], None, None
+            for subcase_id in subcases:
+                ids, lays = [], []
+                for table in tables:
+                    if subcase_id not in table:
+                        continue
+                    rows = getattr(table[subcase_id], id_attr)
+                    mask = np.isin(rows[:, 0], target_elements)
+                    ids.append(rows[mask, 0])
+                    lays.append(rows[mask, 1])
+                if not any(len(part) for part in ids):
+                    continue
+                subcase_ids.append(subcase_id)
+                if element_ids is None:
+                    element_ids, layers = np.concatenate(ids), np.concatenate(lays)
+
+            if not subcase_ids:
+                continue
+            if self.verbose:
+                print(f"Found {source} shell stresses for property {property_id} in subcases {subcase_ids}")
+            return {
+                'element_ids': element_ids,
+                'layers': layers,
+                'subcase_ids': np.array(subcase_ids),
+                'kind': "shell",
+                'source': source,
+                'tables': tables,
+                'id_attr': id_attr,
+                'columns': columns,
+                'target_elements': target_elements,
+            }
+
+        raise ValueError(f"No stress data found for elements with property ID {property_id}")
+
+    @staticmethod
+    def _read_stresses(layout, subcase_rows):
+        """Stresses (n, n_rows, 3) of the subcases at the positions subcase_rows of a _locate_stresses layout"""
+        blocks, masks = [], layout.setdefault('masks', {})
+        for subcase_id in layout['subcase_ids'][subcase_rows]:
+            parts = []
+            for k, table in enumerate(layout['tables']):
+                if subcase_id not in table:
+                    continue
+                result = table[subcase_id]
+                # Subcases of a table share their row layout, the mask is only rebuilt when it differs
+                row_ids = getattr(result, layout['id_attr'])[:, 0]
+                if k not in masks or not np.array_equal(masks[k][0], row_ids):
+                    masks[k] = (row_ids, np.isin(row_ids, layout['target_elements']))
+                mask = masks[k][1]
+                # first time step of static results, columns oxx/oyy/txy
+                parts.append(result.data[0][mask][:, layout['columns']])
+            blocks.append(np.concatenate(parts))
+        return np.stack(blocks).astype(float)
+    
+    def get_compressed_stress(self, property_id, subcases=None, tolerance=1e-3):
+        """
+        Stress arrays of a property with the subcases held as a truncated SVD (compression module)
+
+        The factorisation reads the OP2 stresses a block of subcases at a time
+        (compress_stress_blocks), the full stress arrays are never stacked.
+        
+        Returns:
+            dict: get_stress_arrays keys with 'compressed' (CompressedStress) in place of
+                  'oxx', 'oyy', 'txy'
+        """
+        self.check_memo()
+        if subcases is None:
+            subcases = self.get_available_subcases()
+        cache_key = ("compressed", property_id, tuple(subcases), tolerance)
+        if cache_key in self._input_cache:
+            return self._input_cache[cache_key]
+        
+        layout = self._locate_stresses(property_id, subcases)
+        n_subcase, n_rows = len(layout['subcase_ids']), len(layout['element_ids'])
+        start = time.perf_counter()
+        compressed = compress_stress_blocks(
+            n_subcase, lambda rows: self._read_stresses(layout, rows).transpose(0, 2, 1).reshape(-1, 3 * n_rows),
+            tolerance)
+        elapsed = time.perf_counter() - start
+        full_bytes = n_subcase * n_rows * 3 * 8
+        # two blocks of stresses and the smaller Gram matrix
+        block_bytes = (2 * min(n_subcase, COMPRESS_BLOCK_SUBCASES) * n_rows * 3 + min(n_subcase, 3 * n_rows)**2) * 8
+        print(f"Stresses of property {property_id} compressed to rank {compressed.rank} of {compressed.full_rank} "
+              f"({n_subcase} subcases) in {elapsed:.2f} s, relative error {compressed.relative_error:.2e}, "
+              f"max subcase error {compressed.max_subcase_error:.3g} MPa; memory {compressed.nbytes / 1e6:.2f} MB "
+              f"held, {block_bytes / 1e6:.2f} MB working, against {full_bytes / 1e6:.2f} MB of full stress arrays "
+              f"({full_bytes / max(compressed.nbytes, 1):.0f}x smaller)")
+        
+        self._input_cache[cache_key] = {key: layout[key] for key in ('element_ids', 'layers', 'subcase_ids', 'kind', 'source')}
+        self._input_cache[cache_key]['compressed'] = compressed
+        return self._input_cache[cache_key]
     
     def get_material_allowable(self, material_name, failure_mode="ultimate"):
         """Get material allowable stress based on failure mode"""
-        if material_name not in self.material_properties:
+        record = self.material_db.get(material_name)
+        if record is None:
             raise ValueError(f"Material {material_name} not found in database")
         
-        props = self.material_properties[material_name]
-        if failure_mode == "ultimate":
-            return props["ultimate_strength"]
-        elif failure_mode == "yield":
-            return props["yield_strength"]
-        else:
-            return props["ultimate_strength"]
+        field = "Fty" if failure_mode == "yield" else "Ftu"
+        allowable = record[field]
+        if np.isnan(allowable):
+            raise ValueError(f"Material {material_name} has no {field} allowable")
+        return allowable
+
+    def get_material_allowables(self, materials, fields=("Ftu", "Fty", "Fcy", "Fsu", "density"), thicknesses=None,
+                                property_id=None):
+        """
+        Get allowables of several materials (or one per property) as arrays in one database query
+        
+        Args:
+            materials: List of material names
+            fields: Allowable fields to fetch
+            thicknesses: Optional thickness per entry, picks the matching thickness band
+            property_id: PCOMP the PLY_MATERIALS entry stands for (its density is the
+                         thickness weighted ply density, strengths come per ply row)
+        
+        Returns:
+            dict: {field: np.ndarray aligned with materials}
+        """
+        allowables = self.material_db.get_allowables(materials, fields, thicknesses)
+        if PLY_MATERIALS in materials and property_id is not None:
+            i = list(materials).index(PLY_MATERIALS)
+            layup = self.get_ply_layup()
+            k = np.searchsorted(layup['pids'], property_id)
+            if k < len(layup['pids']) and layup['pids'][k] == property_id:
+                plies = slice(layup['offsets'][k], layup['offsets'][k] + layup['counts'][k])
+                density = ply_row_allowables(self.parent.model_data.bdf, layup, np.full(layup['counts'][k], property_id),
+                                             np.arange(1, layup['counts'][k] + 1))['density']
+                allowables['found'][i] = 1.0
+                if 'density' in allowables:
+                    allowables['density'][i] = float(np.average(density, weights=layup['thicknesses'][plies]))
+        return allowables
+
+    def get_ply_layup(self):
+        """Flat ply table of all PCOMPs (plies.ply_layup_table), built once per model"""
+        self.check_memo()
+        if ("layup",) not in self._input_cache:
+            self._input_cache[("layup",)] = ply_layup_table(self.parent.model_data.bdf)
+        return self._input_cache[("layup",)]
+
+    def get_ply_allowables(self, property_id, stress_arrays):
+        """Deck ply material allowables of every (element, ply) row of composite stress arrays"""
+        if stress_arrays.get('source') != "composite":
+            raise ValueError(f"Property {property_id} has no composite (ply) stresses")
+        cache_key = ("ply_allowables", property_id, len(stress_arrays['element_ids']))
+        if cache_key not in self._input_cache:
+            pids = np.full(len(stress_arrays['element_ids']), property_id)
+            self._input_cache[cache_key] = ply_row_allowables(self.parent.model_data.bdf, self.get_ply_layup(),
+                                                              pids, stress_arrays['layers'])
+        return self._input_cache[cache_key]
+
+    def get_ply_failure(self, property_id, subcases=None, criteria=("Tsai-Wu",), scale_factor=1.0):
+        """
+        Critical ply failure index of every element with the deck ply materials
+
+        Returns:
+            dict: 'element_ids', and per criterion {'failure_index', 'critical_layer'}
+                  arrays (n_subcase, n_elem), 'subcase_ids'
+        """
+        stress_arrays = self.get_stress_arrays(property_id, subcases)
+        allowables = self.get_ply_allowables(property_id, stress_arrays)
+        stress = {key: stress_arrays[key] * scale_factor for key in ('oxx', 'oyy', 'txy')}
+        result = {'subcase_ids': stress_arrays['subcase_ids']}
+        for name, indices in ply_failure_indices(stress, allowables, criteria).items():
+            element_ids, worst, layer = critical_ply(indices, stress_arrays['element_ids'], stress_arrays['layers'])
+            result['element_ids'] = element_ids
+            result[name] = {'failure_index': worst, 'critical_layer': layer}
+        return result
     
-    def extract_stress_data(self, property_id, subcase_id=1, scale_factor=1.0):
+    def get_bar_arrays(self, property_id, subcases=None):
+        """
+        Axial load / moments of the CBARs of a PBARL property over all subcases
+        
+        Returns:
+            dict: bar_force_arrays output plus 'element_ids', 'length' per element,
+                  'section_type', 'dims' of the card and 'kind' ("bar")
+        """
+        prop = self.parent.model_data.bdf.properties[property_id]
+        if prop.type != "PBARL":
+            raise ValueError(f"Property {property_id} is {prop.type}, bar sizing needs PBARL")
+        element_ids = self.get_property_element_ids(property_id)
+        if element_ids.size == 0:
+            raise ValueError(f"No elements found with property ID {property_id}")
+        if subcases is None:
+            subcases = self.get_available_subcases()
+        self.check_memo()
+        cache_key = ("bar", property_id, tuple(subcases))
+        if cache_key in self._input_cache:
+            return self._input_cache[cache_key]
+        
+        forces = bar_force_arrays(self.parent.model_data.op2, element_ids, subcases)
+        forces.update({
+            'element_ids': element_ids,
+            'length': self.parent.model_data.get_geometry().get_bar_lengths(element_ids),
+            'section_type': prop.Type,
+            'dims': list(prop.dim),
+            'kind': "bar",
+        })
+        self._input_cache[cache_key] = forces
+        return forces
+
+    def get_panel_fields(self, property_id, element_ids):
+        """
+        Panel length / width (buckling.panel_dimensions) for rows of the given element IDs
+
+        Returns:
+            dict: 'panel_a', 'panel_b' arrays aligned with element_ids
+        """
+        self.check_memo()
+        cache_key = ("panel", property_id)
+        if cache_key not in self._input_cache:
+            geometry = self.parent.model_data.get_geometry()
+            shell_ids = self.get_property_element_ids(property_id)
+            shell_ids = shell_ids[np.isin(shell_ids, geometry.shell_ids)]
+            a, b, panel = panel_dimensions(geometry, shell_ids)
+            if self.verbose:
+                print(f"Property {property_id}: {panel.max() + 1 if len(panel) else 0} panels, "
+                      f"b = {b.min() if len(b) else 0:.1f} - {b.max() if len(b) else 0:.1f} mm")
+            self._input_cache[cache_key] = (shell_ids, a, b)
+        shell_ids, a, b = self._input_cache[cache_key]
+        rows = np.searchsorted(shell_ids, element_ids)
+        return {'panel_a': a[rows], 'panel_b': b[rows]}
+
+    def get_row_resultants(self, property_id, stress_arrays):
+        """
+        Membrane resultants Nx, Ny, Nxy (FORCE_SHELL) on the rows of stress arrays
+
+        Returns:
+            np.ndarray: (n_subcase, n_rows, 3) force per length, NaN for elements without
+                        force output, None without forces for all subcases
+        """
+        try:
+            forces = self.get_shell_force_arrays(property_id, list(stress_arrays['subcase_ids']))
+        except ValueError:
+            return None
+        if len(forces['subcase_ids']) != len(stress_arrays['subcase_ids']):
+            return None
+        order = np.argsort(forces['element_ids'])
+        sorted_ids = forces['element_ids'][order]
+        rows = np.searchsorted(sorted_ids, stress_arrays['element_ids']).clip(max=len(sorted_ids) - 1)
+        membrane = forces['membrane'][:, order[rows]]
+        membrane[:, sorted_ids[rows] != stress_arrays['element_ids']] = np.nan
+        return membrane
+
+    def get_shell_force_arrays(self, property_id, subcases=None):
+        """
+        Shell force resultants (FORCE_SHELL) of a property over all subcases
+
+        Returns:
+            dict: 'membrane' (Nx, Ny, Nxy) and 'bending' (Mx, My, Mxy) arrays
+                  (n_subcase, n_elem, 3) per unit length at the element centre,
+                  'element_ids', 'subcase_ids' and 'kind' ("shell_force")
+        """
+        element_ids = self.get_property_element_ids(property_id)
+        if element_ids.size == 0:
+            raise ValueError(f"No elements found with property ID {property_id}")
+        if subcases is None:
+            subcases = self.get_available_subcases()
+        self.check_memo()
+        cache_key = ("shell_force", property_id, tuple(subcases))
+        if cache_key in self._input_cache:
+            return self._input_cache[cache_key]
+
+        op2_data = self.parent.model_data.op2
+        tables = [get_op2_table(op2_data, name, group="force") for name in ("cquad4_force", "ctria3_force")]
+        tables = [table for table in tables if table]
+        subcase_ids, blocks, ids = [], [], None
+        for subcase_id in subcases:
+            parts, part_ids = [], []
+            for table in tables:
+                if subcase_id not in table:
+                    continue
+                result = table[subcase_id]
+                if hasattr(result, 'element_node'):
+                    # bilinear CQUAD4 output, the centre row has node ID 0
+                    rows = result.element_node[:, 1] == 0
+                    table_ids = result.element_node[rows, 0]
+                else:
+                    rows = slice(None)
+                    table_ids = result.element
+                data = result.data[0][rows]
+                mask = np.isin(table_ids, element_ids)
+                parts.append(data[mask][:, :6])  # mx, my, mxy, bmx, bmy, bmxy
+                part_ids.append(table_ids[mask])
+            if not parts or not sum(len(p) for p in parts):
+                continue
+            subcase_ids.append(subcase_id)
+            blocks.append(np.concatenate(parts))
+            if ids is None:
+                ids = np.concatenate(part_ids)
+
+        if not blocks:
+            raise ValueError(f"No shell force results found for elements with property ID {property_id}")
+        data = np.stack(blocks).astype(float)  # (n_subcase, n_elem, 6)
+        self._input_cache[cache_key] = {
+            'membrane': data[:, :, :3],
+            'bending': data[:, :, 3:6],
+            'element_ids': ids,
+            'subcase_ids': np.array(subcase_ids),
+            'kind': "shell_force",
+        }
+        return self._input_cache[cache_key]
+
+    def extract_stress_data(self, property_id, subcase_id=1, scale_factor=1.0, thickness=None):
         """
         Extract stress data from pyNastran OP2 results for elements with specific property ID
         
@@ -60,74 +519,52 @@ class Calculator:
             property_id: Property ID to filter elements
             subcase_id: Subcase ID (default 1)
             scale_factor: Factor to scale stresses (for parametric studies)
+            thickness: Optional shell thickness, stresses are then recovered from the force
+                       resultants (worse fibre per element) instead of being scaled
         
         Returns:
-            dict: Stress data with von_mises, principal stresses, and element IDs
+            dict: Stress data with von_mises, principal stresses / angle, max shear and element IDs
         """
 
         try:
-            # Get OP2 stress results
-            op2_data = self.parent.model_data.op2
+            recovered = False
+            if thickness is not None:
+                try:
+                    forces = self.get_shell_force_arrays(property_id, [subcase_id])
+                    fibres = fibre_stresses(forces['membrane'], forces['bending'], thickness)
+                    worse = von_mises(fibres['oxx'], fibres['oyy'], fibres['txy'])[0, :, 0].argmax(axis=0)
+                    columns = np.arange(len(worse))
+                    oxx, oyy, txy = (fibres[key][0, worse, 0, columns] * scale_factor for key in ('oxx', 'oyy', 'txy'))
+                    element_ids = forces['element_ids']
+                    recovered = True
+                except ValueError as e:
+                    print(f"No force resultants ({e}), scaling the OP2 stresses")
+                    scale_factor *= self.get_base_thickness(property_id) / thickness
+            ply_failure = None
+            if not recovered:
+                stress = self.get_stress_arrays(property_id, [subcase_id])
+                oxx, oyy, txy = (stress[key][0] * scale_factor for key in ('oxx', 'oyy', 'txy'))
+                element_ids = stress['element_ids']
+                if stress['source'] == "composite":
+                    # ply rows: one value per element from its critical ply (Tsai-Wu, deck MAT8)
+                    allowables = self.get_ply_allowables(property_id, stress)
+                    indices = ply_failure_indices({'oxx': oxx, 'oyy': oyy, 'txy': txy}, allowables, ("Tsai-Wu",))["Tsai-Wu"]
+                    element_ids, worst, rows = critical_ply(indices, stress['element_ids'], np.arange(len(indices)))
+                    oxx, oyy, txy = oxx[rows], oyy[rows], txy[rows]
+                    ply_failure = {'failure_index': worst, 'critical_layer': stress['layers'][rows]}
+            principal_1, principal_2, angle, max_shear = principal_values(oxx, oyy, txy)
             
-            #düzenlendi -ymn
-            if not hasattr(op2_data, 'cquad4_stress'):
-                #raise ValueError(f"No CQUAD4 stress results found for subcase {subcase_id}")
-                stress_df = op2_data.cquad4_stress[subcase_id].dataframe.reset_index()
-                print(f"Found shell stresses for subcase {subcase_id}")
-            else:
-                """
-                columns for composite stress:
-                Index(['o11', 'o22', 't12', 't1z', 't2z', 'angle', 'major', 'minor',      
-                'max_shear'],
-                """
-                stress_df = op2_data.cquad4_composite_stress[subcase_id].dataframe.reset_index()
-                print(f"Found shell stresses for subcase {subcase_id}")
-
-            # Get BDF model for property filtering
-            bdf_model = self.parent.model_data.bdf
-            
-            # Find elements with the specified property ID
-            target_elements = []
-            for elem_id, element in bdf_model.elements.items():
-                if hasattr(element, 'pid') and element.pid == property_id:
-                    target_elements.append(elem_id)
-            
-            if not target_elements:
-                raise ValueError(f"No elements found with property ID {property_id}")
-            
-            # Extract stress data for target elements
-            stress_data = {
-                'von_mises': [],
-                'principal_stress_1': [],
-                'principal_stress_2': [],
-                'element_ids': [],
-                'max_shear': []
+            data = {
+                'von_mises': von_mises(oxx, oyy, txy),
+                'principal_stress_1': principal_1,
+                'principal_stress_2': principal_2,
+                'principal_angle': angle,
+                'element_ids': list(element_ids),
+                'max_shear': max_shear
             }
-            
-            # Get stress data from OP2
-            element_ids = list(stress_df["ElementID"])
-            von_mises = stress_df['o11'] #daha sonra mises hesaplariz şimdilik p1 gibi
-            max_principal = abs(stress_df['o11'])
-            min_principal = abs(stress_df['o22'])
-            max_shear = abs(stress_df['t12'])
-            
-            # Filter for target elements and apply scaling
-            for i, elem_id in enumerate(element_ids):
-                if elem_id in target_elements:
-                    stress_data['element_ids'].append(elem_id)
-                    stress_data['von_mises'].append(von_mises[i] * scale_factor)
-                    stress_data['principal_stress_1'].append(max_principal[i] * scale_factor)
-                    stress_data['principal_stress_2'].append(min_principal[i] * scale_factor)
-                    stress_data['max_shear'].append(max_shear[i] * scale_factor)
-            
-            if not stress_data['element_ids']:
-                raise ValueError(f"No stress data found for elements with property ID {property_id}")
-            
-            # Convert to numpy arrays for easier processing
-            for key in ['von_mises', 'principal_stress_1', 'principal_stress_2', 'max_shear']:
-                stress_data[key] = np.array(stress_data[key])
-            
-            return stress_data
+            if ply_failure is not None:
+                data.update(ply_failure)
+            return data
             
         except Exception as e:
             print(f"Error extracting stress data for subcase {subcase_id}: {e}")
@@ -153,44 +590,29 @@ class Calculator:
             
             disp_obj = op2_data.displacements[subcase_id]
             
-            # Get nodes connected to elements with target property ID
-            bdf_model = self.parent.model_data.bdf
-            target_nodes = set()
+            # Nodes of the property elements, one slice of the incidence matrix
+            geometry = self.parent.model_data.get_geometry()
+            element_ids = self.get_property_element_ids(property_id)
+            element_ids = element_ids[np.isin(element_ids, geometry.element_ids)]
+            target_nodes = geometry.nodes_of_elements(element_ids)
             
-            for elem_id, element in bdf_model.elements.items():
-                if hasattr(element, 'pid') and element.pid == property_id:
-                    target_nodes.update(element.nodes)
+            node_ids = disp_obj.node_gridtype[:, 0]
+            mask = np.isin(node_ids, target_nodes)
+            translations = disp_obj.data[0, mask, :3] * scale_factor  # [T1, T2, T3]
+            rotations = disp_obj.data[0, mask, 3:6] * scale_factor    # [R1, R2, R3]
             
             # Extract displacement data
             disp_data = {
-                'node_ids': [],
-                'translation_x': [],
-                'translation_y': [],
-                'translation_z': [],
-                'rotation_x': [],
-                'rotation_y': [],
-                'rotation_z': [],
-                'magnitude': []
+                'node_ids': node_ids[mask].astype(int).tolist(),
+                'translation_x': translations[:, 0].tolist(),
+                'translation_y': translations[:, 1].tolist(),
+                'translation_z': translations[:, 2].tolist(),
+                'rotation_x': rotations[:, 0].tolist(),
+                'rotation_y': rotations[:, 1].tolist(),
+                'rotation_z': rotations[:, 2].tolist(),
+                'magnitude': np.linalg.norm(translations, axis=1).tolist(),
             }
             
-            node_ids = disp_obj.node_gridtype[:, 0]
-            translations = disp_obj.data[0, :, :3]  # [T1, T2, T3]
-            rotations = disp_obj.data[0, :, 3:6]    # [R1, R2, R3]
-            
-            for i, node_id in enumerate(node_ids):
-                if node_id in target_nodes:
-                    disp_data['node_ids'].append(int(node_id))
-                    disp_data['translation_x'].append(translations[i, 0] * scale_factor)
-                    disp_data['translation_y'].append(translations[i, 1] * scale_factor)
-                    disp_data['translation_z'].append(translations[i, 2] * scale_factor)
-                    disp_data['rotation_x'].append(rotations[i, 0] * scale_factor)
-                    disp_data['rotation_y'].append(rotations[i, 1] * scale_factor)
-                    disp_data['rotation_z'].append(rotations[i, 2] * scale_factor)
-                    
-                    # Calculate magnitude
-                    mag = np.sqrt(translations[i, 0]**2 + translations[i, 1]**2 + translations[i, 2]**2)
-                    disp_data['magnitude'].append(mag * scale_factor)
-            
             return disp_data
             
         except Exception as e:
@@ -222,9 +644,7 @@ class Calculator:
                 raise ValueError(f"No force results found for subcase {subcase_id}")
             
             # Filter and extract force data similar to stress extraction
-            bdf_model = self.parent.model_data.bdf
-            target_elements = [elem_id for elem_id, element in bdf_model.elements.items() 
-                             if hasattr(element, 'pid') and element.pid == property_id]
+            target_elements = self.get_property_element_ids(property_id)
             
             force_data = {
                 'element_ids': [],
@@ -234,12 +654,10 @@ class Calculator:
             
             # Extract based on result type
             if hasattr(force_results, 'element'):
-                element_ids = force_results.element
-                for i, elem_id in enumerate(element_ids):
-                    if elem_id in target_elements:
-                        force_data['element_ids'].append(elem_id)
-                        # Scale forces
-                        force_data['forces'].append(force_results.data[0, i, :] * scale_factor)
+                rows = np.flatnonzero(np.isin(force_results.element, target_elements))
+                force_data['element_ids'] = force_results.element[rows].tolist()
+                # Scale forces
+                force_data['forces'] = list(force_results.data[0, rows, :] * scale_factor)
             
             return force_data
             
@@ -296,85 +714,52 @@ class Calculator:
         Returns:
             dict: Critical subcase information
         """
-        available_subcases = self.get_available_subcases()
-        allowable_stress = self.get_material_allowable(material)
+        combination = self.find_critical_combination(property_id, [material], [failure_type], thickness)
+        combo_data = combination['all_combinations'].get(f"{material}_{failure_type}", {})
         
-        # Get base thickness for scaling
-        prop = self.parent.model_data.bdf.properties[property_id]
-        base_thickness = (
-            prop.t if prop.type == "PSHELL" else 
-            prop.thicknesses[0] if prop.type == "PCOMP" else 1.0
-        )
-        stress_scale_factor = base_thickness / thickness
+        for subcase_id, subcase_data in combo_data.get('subcase_results', {}).items():
+            print(f"Subcase {subcase_id}: Min RF = {subcase_data['min_rf']:.3f}")
         
-        critical_results = {
-            'critical_subcase_id': None,
-            'min_rf_overall': float('inf'),
-            'subcase_results': {}
+        return {
+            'critical_subcase_id': combination['critical_subcase_id'],
+            'min_rf_overall': combination['min_rf_overall'],
+            'subcase_results': combo_data.get('subcase_results', {})
         }
-        
-        print(f"Analyzing {len(available_subcases)} subcases: {available_subcases}")
-        
-        for subcase_id in available_subcases:
-            try:
-                # Extract stress data for this subcase
-                stress_data = self.extract_stress_data(property_id, subcase_id, stress_scale_factor)
-                
-                if stress_data is None:
-                    continue
-                
-                # Calculate RF based on failure type
-                if failure_type == "Von Mises":
-                    rf_results = self.calculate_von_mises_rf(stress_data, allowable_stress)
-                elif failure_type == "Maximum Principal Stress":
-                    rf_results = self.calculate_principal_stress_rf(stress_data, allowable_stress)
-                else:
-                    rf_results = self.calculate_von_mises_rf(stress_data, allowable_stress)
-                
-                # Store results for this subcase
-                critical_results['subcase_results'][subcase_id] = {
-                    'min_rf': rf_results['min_rf'],
-                    'avg_rf': rf_results['avg_rf'],
-                    'max_rf': rf_results['max_rf'],
-                    'critical_element': rf_results['critical_element'],
-                    'max_stress': rf_results['max_stress']
-                }
-                
-                # Check if this is the new critical subcase
-                if rf_results['min_rf'] < critical_results['min_rf_overall']:
-                    critical_results['min_rf_overall'] = rf_results['min_rf']
-                    critical_results['critical_subcase_id'] = subcase_id
-                
-                print(f"Subcase {subcase_id}: Min RF = {rf_results['min_rf']:.3f}")
-                
-            except Exception as e:
-                print(f"Error analyzing subcase {subcase_id}: {e}")
-                continue
-        
-        return critical_results
     
-    def find_critical_combination(self, property_id, materials, failure_types, thickness):
+    def find_critical_combination(self, property_id, materials, failure_types, thickness,
+                                  stress_arrays=None, allowables=None):
         """
         Find the critical combination of material, failure type, and subcase for a given thickness
         
+        Each material x criterion pair is one call of the registered kernel over the whole
+        (subcase x element) stress block of the property, or a lookup in result_memo when the
+        same pair was already evaluated at this thickness. Compressed stress arrays are
+        reconstructed and evaluated block by block of subcases.
+        
         Args:
             property_id: Property ID to analyze
             materials: List of material names
-            failure_types: List of failure criteria
+            failure_types: List of failure criteria (names registered in criteria.FAILURE_CRITERIA)
             thickness: Thickness for analysis
+            stress_arrays: Optional output of get_stress_arrays (extracted once per sweep)
+            allowables: Optional output of get_material_allowables for materials
             
         Returns:
             dict: Critical combination information
         """
-        available_subcases = self.get_available_subcases()
+        model_key = self.check_memo()
+        if stress_arrays is None:
+            stress_arrays = self.get_stress_arrays(property_id)
+        if allowables is None:
+            allowables = self.get_material_allowables(materials, CRITERION_FIELDS, property_id=property_id)
         
-        # Get base thickness for scaling
-        prop = self.parent.model_data.bdf.properties[property_id]
-        base_thickness = (
-            prop.t if prop.type == "PSHELL" else 
-            prop.thicknesses[0] if prop.type == "PCOMP" else 1.0
-        )
-        stress_scale_factor = base_thickness / thickness
+        # Stresses scale with base thickness / thickness
+        stress_scale_factor = self.get_base_thickness(property_id) / thickness
+        subcase_ids = stress_arrays['subcase_ids']
+        element_ids = stress_arrays['element_ids']
+        subcase_key = tuple(int(sc) for sc in subcase_ids)
+        compressed = stress_arrays.get('compressed')
+        stress_version = compressed.rank if compressed is not None else None
         
         critical_results = {
             'critical_material': None,
@@ -386,66 +771,146 @@ class Calculator:
             'all_combinations': {}
         }
         
-        # Iterate through all combinations
-        for material in materials:
-            allowable_stress = self.get_material_allowable(material)
+        # Material x criterion pairs not memoized at this thickness yet
+        pending = []
+        for i, material in enumerate(materials):
+            if np.isnan(allowables['found'][i]):
+                print(f"Material {material} not found in database, skipped")
+                continue
+            if material == PLY_MATERIALS:
+                # every (element, ply) row against its own ply material of the deck
+                try:
+                    material_allowables = self.get_ply_allowables(property_id, stress_arrays)
+                except ValueError as e:
+                    print(f"{material} skipped: {e}")
+                    continue
+            else:
+                material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
             
             for failure_type in failure_types:
+                criterion = FAILURE_CRITERIA.get(failure_type)
+                if criterion is None or not criterion.applies_to(stress_arrays['kind']):
+                    print(f"Failure type {failure_type} does not apply to {stress_arrays['kind']} elements, skipped")
+                    continue
+                
                 combination_key = f"{material}_{failure_type}"
-                critical_results['all_combinations'][combination_key] = {
-                    'subcase_results': {},
-                    'min_rf_for_combination': float('inf'),
-                    'critical_subcase': None
+                memo_key = (model_key, property_id, material, failure_type, subcase_key, round(stress_scale_factor, 12),
+                            stress_version)
+                if memo_key in self.result_memo:
+                    combination = self.result_memo[memo_key]
+                    critical_results['all_combinations'][combination_key] = combination
+                    self._update_critical(critical_results, combination, material, failure_type)
+                    continue
+                pending.append((material, failure_type, criterion, material_allowables, memo_key))
+        
+        if not pending:
+            return critical_results
+        
+        # Per subcase statistics of every pending pair, filled block by block of subcases
+        n_subcase = len(subcase_ids)
+        statistics = [{'min': np.full(n_subcase, np.inf), 'arg': np.zeros(n_subcase, dtype=int),
+                       'max': np.full(n_subcase, -np.inf), 'avg': np.full(n_subcase, np.inf), 'evaluated': False}
+                      for _ in pending]
+        equivalent_max = np.zeros(n_subcase)
+        for rows, stress in self._scaled_stress_blocks(property_id, stress_arrays, stress_scale_factor,
+                                                       thickness, failure_types):
+            equivalent_max[rows] = von_mises(stress['oxx'], stress['oyy'], stress['txy']).max(axis=1)
+            for (material, failure_type, criterion, material_allowables, _), stats in zip(pending, statistics):
+                rfs = criterion(stress, material_allowables)  # (n_block, n_rows)
+                stats['evaluated'] |= not np.all(np.isnan(rfs))
+                rfs = np.where(np.isnan(rfs), np.inf, rfs)
+                finite = np.isfinite(rfs)
+                stats['min'][rows] = rfs.min(axis=1)
+                stats['arg'][rows] = rfs.argmin(axis=1)
+                stats['max'][rows] = rfs.max(axis=1)
+                with np.errstate(invalid="ignore"):
+                    average = np.where(finite, rfs, 0.0).sum(axis=1) / finite.sum(axis=1)
+                stats['avg'][rows] = np.where(finite.any(axis=1), average, np.inf)
+        
+        layers = stress_arrays['layers'] if stress_arrays.get('source') == "composite" else None
+        for (material, failure_type, criterion, material_allowables, memo_key), stats in zip(pending, statistics):
+            if not stats['evaluated']:
+                print(f"Material {material} has no allowables for {failure_type}, skipped")
+                continue
+            subcase_min, subcase_arg = stats['min'], stats['arg']
+            critical_idx = int(np.argmin(subcase_min))
+            reference = np.ravel(material_allowables['Xt'] if material == PLY_MATERIALS else material_allowables['Ftu'])
+            allowable_stress = float(np.nanmin(reference)) if np.isfinite(reference).any() else float('nan')
+            
+            subcase_results = {}
+            for k, subcase_id in enumerate(subcase_ids):
+                subcase_results[int(subcase_id)] = {
+                    'min_rf': float(subcase_min[k]),
+                    'avg_rf': float(stats['avg'][k]),
+                    'max_rf': float(stats['max'][k]),
+                    'critical_element': int(element_ids[subcase_arg[k]]),
+                    'critical_layer': int(layers[subcase_arg[k]]) if layers is not None else None,
+                    'max_stress': float(equivalent_max[k]),
+                    'allowable_stress': allowable_stress
                 }
-                
-                for subcase_id in available_subcases:
-                    try:
-                        # Extract stress data for this subcase
-                        stress_data = self.extract_stress_data(property_id, subcase_id, stress_scale_factor)
-                        
-                        if stress_data is None:
-                            continue
-                        
-                        # Calculate RF based on failure type
-                        if failure_type == "Von Mises":
-                            rf_results = self.calculate_von_mises_rf(stress_data, allowable_stress)
-                        elif failure_type == "Maximum Principal Stress":
-                            rf_results = self.calculate_principal_stress_rf(stress_data, allowable_stress)
-                        else:
-                            rf_results = self.calculate_von_mises_rf(stress_data, allowable_stress)
-                        
-                        # Store results for this combination and subcase
-                        critical_results['all_combinations'][combination_key]['subcase_results'][subcase_id] = {
-                            'min_rf': rf_results['min_rf'],
-                            'avg_rf': rf_results['avg_rf'],
-                            'max_rf': rf_results['max_rf'],
-                            'critical_element': rf_results['critical_element'],
-                            'max_stress': rf_results['max_stress'],
-                            'allowable_stress': allowable_stress
-                        }
-                        
-                        # Check if this is critical for this combination
-                        if rf_results['min_rf'] < critical_results['all_combinations'][combination_key]['min_rf_for_combination']:
-                            critical_results['all_combinations'][combination_key]['min_rf_for_combination'] = rf_results['min_rf']
-                            critical_results['all_combinations'][combination_key]['critical_subcase'] = subcase_id
-                        
-                        # Check if this is the overall critical condition
-                        if rf_results['min_rf'] < critical_results['min_rf_overall']:
-                            critical_results['min_rf_overall'] = rf_results['min_rf']
-                            critical_results['critical_material'] = material
-                            critical_results['critical_failure_type'] = failure_type
-                            critical_results['critical_subcase_id'] = subcase_id
-                            critical_results['critical_element'] = rf_results['critical_element']
-                            critical_results['max_stress'] = rf_results['max_stress']
-                        
-                    except Exception as e:
-                        print(f"Error analyzing {material}/{failure_type}/subcase {subcase_id}: {e}")
-                        continue
+            
+            combination = {
+                'subcase_results': subcase_results,
+                'min_rf_for_combination': float(subcase_min[critical_idx]),
+                'critical_subcase': int(subcase_ids[critical_idx]),
+                'thickness': float(thickness)
+            }
+            self.result_memo[memo_key] = combination
+            critical_results['all_combinations'][f"{material}_{failure_type}"] = combination
+            self._update_critical(critical_results, combination, material, failure_type)
         
         return critical_results
+    
+    def _scaled_stress_blocks(self, property_id, stress_arrays, scale_factor, thickness, failure_types):
+        """
+        Yield (subcase slice, stress dict) of the scaled stresses at one thickness
+
+        Plain stress arrays are a single block, compressed ones (get_compressed_stress) are
+        reconstructed COMPRESS_BLOCK_SUBCASES subcases at a time.
+        """
+        extra, membrane = {}, None
+        if "Panel Buckling" in failure_types:
+            extra = dict(self.get_panel_fields(property_id, stress_arrays['element_ids']))
+            extra['thickness'] = thickness * self.get_laminate_factor(property_id)
+            if stress_arrays.get('source') == "composite":
+                # ply stresses are in material axes, buckling takes the laminate membrane
+                # stresses N / t of the force resultants
+                membrane = self.get_row_resultants(property_id, stress_arrays)
+                if membrane is None:
+                    print(f"No shell forces for all subcases of property {property_id}, Panel Buckling skipped")
+                    extra = {}
+                else:
+                    membrane = membrane / extra['thickness']
+        
+        compressed = stress_arrays.get('compressed')
+        if compressed is None:
+            blocks = [(slice(None), stress_arrays)]
+        else:
+            blocks = compressed.blocks()
+        for rows, block in blocks:
+            stress = {key: block[key] * scale_factor for key in ('oxx', 'oyy', 'txy')}
+            stress.update(extra)
+            if membrane is not None:
+                stress.update({key: membrane[rows, :, k]
+                               for k, key in enumerate(('membrane_oxx', 'membrane_oyy', 'membrane_txy'))})
+            yield rows, stress
+    
+    @staticmethod
+    def _update_critical(critical_results, combination, material, failure_type):
+        """Make a material / criterion combination the overall critical one if its RF is lower"""
+        if combination['min_rf_for_combination'] < critical_results['min_rf_overall']:
+            critical_data = combination['subcase_results'][combination['critical_subcase']]
+            critical_results['min_rf_overall'] = critical_data['min_rf']
+            critical_results['critical_material'] = material
+            critical_results['critical_failure_type'] = failure_type
+            critical_results['critical_subcase_id'] = combination['critical_subcase']
+            critical_results['critical_element'] = critical_data['critical_element']
+            critical_results['critical_layer'] = critical_data.get('critical_layer')
+            critical_results['max_stress'] = critical_data['max_stress']
 
     def size_for_target_rf_multi(self, property_id, materials, failure_types, 
-                                thickness_range, target_rf=1.1, assembly_type="web"):
+                                thickness_range, target_rf=1.1, assembly_type="web",
+                                progress_callback=None, cancel_event=None, subcases=None):
         """
         Size the structure considering all materials, failure types, and subcases
         
@@ -456,10 +921,13 @@ class Calculator:
             thickness_range: (min, max, step) for thickness
             target_rf: Target reserve factor (default 1.1 for 10% margin)
             assembly_type: "web" or "cap"
+            progress_callback: Optional callable(step, step_count) called after each thickness
+            cancel_event: Optional threading.Event, SizingCancelled is raised once it is set
+            subcases: Subcase IDs to evaluate (default all available)
         """
         
         min_t, max_t, step_t = thickness_range
-        available_subcases = self.get_available_subcases()
+        available_subcases = subcases if subcases is not None else self.get_available_subcases()
         
         print(f"Multi-condition sizing for {assembly_type} assembly")
         print(f"Materials: {materials}")
@@ -469,17 +937,46 @@ class Calculator:
         print(f"Thickness range: {min_t} to {max_t} mm, step: {step_t} mm")
         print(f"Total combinations to analyze: {len(materials)} × {len(failure_types)} × {len(available_subcases)}")
         
+        # Stresses and allowables are read once, every thickness step only rescales them
+        if self.compression_tolerance is not None and len(available_subcases) >= COMPRESS_MIN_SUBCASES:
+            stress_arrays = self.get_compressed_stress(property_id, available_subcases, self.compression_tolerance)
+        else:
+            stress_arrays = self.get_stress_arrays(property_id, available_subcases)
+        allowables = self.get_material_allowables(materials, CRITERION_FIELDS, property_id=property_id)
+        
+        # Criteria that do not apply to these elements are reported once, not per thickness
+        skipped = [f for f in failure_types
+                   if f not in FAILURE_CRITERIA or not FAILURE_CRITERIA[f].applies_to(stress_arrays['kind'])]
+        if skipped:
+            print(f"Skipping failure types not applicable to {stress_arrays['kind']} elements: {skipped}")
+            failure_types = [f for f in failure_types if f not in skipped]
+        
+        # Mass per unit sizing thickness: element area sum x laminate / sized thickness ratio
+        densities = dict(zip(materials, allowables['density']))
+        prop = self.parent.model_data.bdf.properties[property_id]
+        laminate_factor = self.get_laminate_factor(property_id)
+        shell_ids = np.unique(stress_arrays['element_ids'])
+        property_area = float(self.parent.model_data.get_geometry().get_shell_areas(shell_ids).sum()) * laminate_factor
+        
         # Sizing iteration
         results = []
         thickness_values = np.arange(min_t, max_t + step_t, step_t)
         
-        for thickness in thickness_values:
-            print(f"\n{'='*50}")
-            print(f"Analyzing thickness: {thickness} mm")
-            print(f"{'='*50}")
+        for step, thickness in enumerate(thickness_values):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SizingCancelled(f"Sizing of property {property_id} cancelled at {thickness} mm")
+
+            if self.verbose:
+                print(f"\n{'='*50}")
+                print(f"Analyzing thickness: {thickness} mm")
+                print(f"{'='*50}")
             
             # Find critical combination for this thickness
-            critical_info = self.find_critical_combination(property_id, materials, failure_types, thickness)
+            critical_info = self.find_critical_combination(property_id, materials, failure_types, thickness,
+                                                           stress_arrays=stress_arrays, allowables=allowables)
+
+            if progress_callback is not None:
+                progress_callback(step + 1, len(thickness_values))
             
             if critical_info['critical_material'] is None:
                 print(f"No valid results for thickness {thickness}")
@@ -501,33 +998,46 @@ class Calculator:
                 'avg_rf': critical_combo_data['avg_rf'],
                 'max_rf': critical_combo_data['max_rf'],
                 'critical_element': critical_info['critical_element'],
+                'critical_layer': critical_info.get('critical_layer'),
                 'max_stress': critical_info['max_stress'],
                 'critical_material': critical_material,
                 'critical_failure_type': critical_failure,
                 'critical_subcase_id': critical_subcase,
                 'critical_allowable_stress': critical_combo_data['allowable_stress'],
-                'all_combinations': critical_info['all_combinations']
+                'all_combinations': critical_info['all_combinations'],
+                'mass': property_area * thickness * densities[critical_material] * MASS_SCALE,
+                'material_masses': {m: property_area * thickness * densities[m] * MASS_SCALE for m in materials},
+                'is_optimal': min_rf_overall >= target_rf,
             })
+            if 'compressed' in stress_arrays:
+                # Approximation of the compressed stresses, scaled like them
+                results[-1]['compression_rank'] = stress_arrays['compressed'].rank
+                results[-1]['compression_error'] = stress_arrays['compressed'].relative_error
+                results[-1]['compression_max_error'] = (stress_arrays['compressed'].max_subcase_error
+                                                        * self.get_base_thickness(property_id) / thickness)
             
-            print(f"CRITICAL CONDITION:")
-            print(f"  Material: {critical_material}")
-            print(f"  Failure Type: {critical_failure}")
-            print(f"  Subcase: {critical_subcase}")
-            print(f"  Min RF: {min_rf_overall:.3f}")
-            print(f"  Critical Element: {critical_info['critical_element']}")
-            print(f"  Max Stress: {critical_info['max_stress']:.1f} MPa")
-            print(f"  Allowable: {critical_combo_data['allowable_stress']} MPa")
-            
-            # Show summary of all combinations
-            print(f"\nSUMMARY OF ALL COMBINATIONS:")
-            for combo_key, combo_data in critical_info['all_combinations'].items():
-                material_name, failure_name = combo_key.split('_', 1)
-                min_rf_combo = combo_data['min_rf_for_combination']
-                critical_sc = combo_data['critical_subcase']
-                print(f"  {material_name} / {failure_name}: Min RF = {min_rf_combo:.3f} (Subcase {critical_sc})")
+            if self.verbose:
+                print(f"CRITICAL CONDITION:")
+                print(f"  Material: {critical_material}")
+                print(f"  Failure Type: {critical_failure}")
+                print(f"  Subcase: {critical_subcase}")
+                print(f"  Min RF: {min_rf_overall:.3f}")
+                print(f"  Critical Element: {critical_info['critical_element']}")
+                print(f"  Max Stress: {critical_info['max_stress']:.1f} MPa")
+                print(f"  Allowable: {critical_combo_data['allowable_stress']} MPa")
+                
+                # Show summary of all combinations
+                print(f"\nSUMMARY OF ALL COMBINATIONS:")
+                for combo_key, combo_data in critical_info['all_combinations'].items():
+                    material_name, failure_name = combo_key.split('_', 1)
+                    min_rf_combo = combo_data['min_rf_for_combination']
+                    critical_sc = combo_data['critical_subcase']
+                    print(f"  {material_name} / {failure_name}: Min RF = {min_rf_combo:.3f} (Subcase {critical_sc})")
             
             # Check if we've reached target RF
             if min_rf_overall >= target_rf:
+                if progress_callback is not None:
+                    progress_callback(len(thickness_values), len(thickness_values))
                 print(f"\n{'='*50}")
                 print(f"TARGET RF ACHIEVED!")
                 print(f"Optimum thickness: {thickness} mm")
@@ -536,12 +1046,552 @@ class Calculator:
                 print(f"{'='*50}")
                 break
         
+        # Required thickness of each material on its own, from the RFs already computed
+        required = {}
+        for material in materials:
+            required[material] = np.nan
+            for record in results:
+                material_rfs = [combo['min_rf_for_combination'] for key, combo in record['all_combinations'].items()
+                                if key.startswith(f"{material}_")]
+                if material_rfs and min(material_rfs) >= target_rf:
+                    required[material] = record['thickness']
+                    break
+        if results:
+            results[-1]['material_ranking'] = rank_materials(required, property_area, densities)
+            self.print_material_ranking(results[-1]['material_ranking'], "mm")
+        
         return results
     
+    @staticmethod
+    def print_material_ranking(ranking, unit):
+        print("MATERIALS BY MASS AT REQUIRED SIZE:")
+        for entry in ranking:
+            if np.isfinite(entry['mass']):
+                print(f"  {entry['material']}: {entry['required']:.3f} {unit} -> {entry['mass']:.4f} kg")
+            else:
+                print(f"  {entry['material']}: target RF not reached")
+
+    def size_shell_from_resultants(self, property_id, materials, failure_types, thickness_range,
+                                   target_rf=1.1, progress_callback=None, cancel_event=None, subcases=None):
+        """
+        Size a shell from its force resultants, fibre stresses N/t +- 6M/t^2 per thickness
+
+        All thicknesses of the range are evaluated together (in batches), one criterion
+        call per material over (thickness, fibre, subcase, element).
+
+        Args:
+            property_id: Shell property ID
+            materials: List of material names, every one has to pass
+            failure_types: List of failure criteria
+            thickness_range: (min, max, step) for thickness
+            target_rf: Target reserve factor
+            progress_callback: Optional callable(step, step_count), one step per material
+            cancel_event: Optional threading.Event, SizingCancelled is raised once it is set
+            subcases: Subcase IDs to evaluate (default all available)
+
+        Returns:
+            list: Records like size_for_target_rf_multi, up to the first thickness meeting
+                  target_rf (flagged with 'is_optimal')
+        """
+        min_t, max_t, step_t = thickness_range
+        forces = self.get_shell_force_arrays(property_id, subcases)
+        thickness_values = np.arange(min_t, max_t + step_t, step_t)
+        failure_types = [f for f in failure_types if f in FAILURE_CRITERIA and FAILURE_CRITERIA[f].applies_to("shell")]
+        allowables = self.get_material_allowables(materials, CRITERION_FIELDS)
+        n_subcase, n_elem = forces['membrane'].shape[:2]
+        print(f"Resultant stress recovery for property {property_id}: {len(thickness_values)} thicknesses x "
+              f"{n_subcase} subcases x {n_elem} elements x 2 fibres")
+
+        best_rf = np.full(len(thickness_values), np.inf)
+        best_material = np.full(len(thickness_values), -1)
+        best_failure = np.zeros(len(thickness_values), dtype=int)
+        best_location = np.zeros(len(thickness_values), dtype=int)  # flat (fibre, subcase, element)
+        material_rf = np.full((len(materials), len(thickness_values)), np.inf)
+
+        batches = thickness_batches(thickness_values, n_subcase, n_elem)
+        panel_fields = self.get_panel_fields(property_id, forces['element_ids']) if "Panel Buckling" in failure_types else {}
+        grid = (tuple(int(sc) for sc in forces['subcase_ids']), self.grid_key(thickness_values))
+
+        def fibre_batches():
+            for batch in batches:
+                stress = fibre_stresses(forces['membrane'], forces['bending'], thickness_values[batch])
+                stress.update(panel_fields)
+                stress['thickness'] = thickness_values[batch][:, None, None, None]
+                yield batch, stress
+
+        def equivalent_curve():
+            values = np.zeros(len(thickness_values))
+            for batch, stress in fibre_batches():
+                equivalent = von_mises(stress['oxx'], stress['oyy'], stress['txy'])
+                values[batch] = equivalent.reshape(len(equivalent), -1).max(axis=1)
+            return values
+
+        def rf_curve(failure_type, material_allowables):
+            # (RF, flat (fibre, subcase, element) location) per thickness
+            rf, arg = np.full(len(thickness_values), np.inf), np.zeros(len(thickness_values), dtype=int)
+            for batch, stress in fibre_batches():
+                rfs = FAILURE_CRITERIA[failure_type](stress, material_allowables)
+                flat = np.where(np.isnan(rfs), np.inf, rfs).reshape(rfs.shape[0], -1)
+                arg[batch] = flat.argmin(axis=1)
+                rf[batch] = flat[np.arange(len(flat)), arg[batch]]
+            return rf, arg
+
+        max_stress = self.memoized_curve(("resultants", property_id, "von Mises") + grid, equivalent_curve)
+        for i, material in enumerate(materials):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SizingCancelled(f"Sizing of property {property_id} cancelled")
+            if np.isnan(allowables['found'][i]):
+                print(f"Material {material} not found in database, skipped")
+                continue
+            material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
+            for j, failure_type in enumerate(failure_types):
+                rf, arg = self.memoized_curve(("resultants", property_id, material, failure_type) + grid,
+                                              lambda: rf_curve(failure_type, material_allowables))
+                material_rf[i] = np.minimum(material_rf[i], rf)
+                lower = rf < best_rf
+                best_rf = np.where(lower, rf, best_rf)
+                best_material = np.where(lower, i, best_material)
+                best_failure = np.where(lower, j, best_failure)
+                best_location = np.where(lower, arg, best_location)
+            if progress_callback is not None:
+                progress_callback(i + 1, len(materials))
+
+        shell_ids = np.unique(forces['element_ids'])
+        property_area = float(self.parent.model_data.get_geometry().get_shell_areas(shell_ids).sum())
+        densities = dict(zip(materials, allowables['density']))
+
+        # Records up to the first passing thickness, like the thickness sweep
+        passing = np.flatnonzero(best_rf >= target_rf)
+        last = passing[0] if len(passing) else len(thickness_values) - 1
+        results = []
+        for k in range(last + 1):
+            if best_material[k] < 0:
+                continue
+            _, subcase, element = np.unravel_index(best_location[k], (2, n_subcase, n_elem))
+            critical_material = materials[best_material[k]]
+            results.append({
+                'thickness': float(thickness_values[k]),
+                'min_rf': float(best_rf[k]),
+                'critical_element': int(forces['element_ids'][element]),
+                'max_stress': float(max_stress[k]),
+                'critical_material': critical_material,
+                'critical_failure_type': failure_types[best_failure[k]],
+                'critical_subcase_id': int(forces['subcase_ids'][subcase]),
+                'material_rf': {m: float(material_rf[j, k]) for j, m in enumerate(materials)},
+                'mass': property_area * thickness_values[k] * densities[critical_material] * MASS_SCALE,
+                'material_masses': {m: property_area * thickness_values[k] * densities[m] * MASS_SCALE for m in materials},
+                'stress_recovery': "resultants",
+                'is_optimal': bool(len(passing)) and k == last,
+            })
+
+        # Required thickness of each material on its own
+        required = {m: float(thickness_values[material_rf[j] >= target_rf][0]) if np.any(material_rf[j] >= target_rf) else np.nan
+                    for j, m in enumerate(materials)}
+        if results:
+            results[-1]['material_ranking'] = rank_materials(required, property_area, densities)
+            self.print_material_ranking(results[-1]['material_ranking'], "mm")
+        return results
+
+    def _subcase_rf_blocks(self, property_id, materials, failure_types, thickness, source, subcases=None):
+        """
+        RF arrays of every material x shell criterion at one thickness, subcases first
+
+        Args:
+            source: "stress" (OP2 stresses scaled with thickness) or "resultants" (fibre stresses)
+
+        Returns:
+            tuple: (subcase_ids, stress dict, subcase axis of the stress arrays,
+                    list of RF arrays (n_subcase, n_points))
+        """
+        stress_arrays = None
+        if source == "resultants":
+            forces = self.get_shell_force_arrays(property_id, subcases)
+            stress = fibre_stresses(forces['membrane'], forces['bending'], thickness)
+            element_ids, subcase_ids, axis = forces['element_ids'], forces['subcase_ids'], 2
+            panel_thickness = thickness
+        else:
+            stress_arrays = self.get_stress_arrays(property_id, subcases)
+            scale = self.get_base_thickness(property_id) / thickness
+            stress = {key: stress_arrays[key] * scale for key in ('oxx', 'oyy', 'txy')}
+            element_ids, subcase_ids, axis = stress_arrays['element_ids'], stress_arrays['subcase_ids'], 0
+            panel_thickness = thickness * self.get_laminate_factor(property_id)
+        if "Panel Buckling" in failure_types:
+            stress.update(self.get_panel_fields(property_id, element_ids))
+            stress['thickness'] = panel_thickness
+
+        allowables = self.get_material_allowables(materials, CRITERION_FIELDS, property_id=property_id)
+        blocks = []
+        for i, material in enumerate(materials):
+            if np.isnan(allowables['found'][i]):
+                continue
+            if material == PLY_MATERIALS:
+                if stress_arrays is None or stress_arrays['source'] != "composite":
+                    continue
+                material_allowables = self.get_ply_allowables(property_id, stress_arrays)
+            else:
+                material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
+            for failure_type in failure_types:
+                criterion = FAILURE_CRITERIA.get(failure_type)
+                if criterion is None or not criterion.applies_to("shell"):
+                    continue
+                rfs = np.broadcast_to(criterion(stress, material_allowables), np.shape(stress['oxx']))
+                blocks.append(np.moveaxis(rfs, axis, 0).reshape(len(subcase_ids), -1))
+        return subcase_ids, stress, axis, blocks
+
+    def get_dominant_subcases(self, property_id, materials, failure_types, thickness_range, source="stress"):
+        """
+        Subcases of a property not dominated by others (pruning module), checked at both
+        ends of the thickness range
+
+        Returns:
+            list: Kept subcase IDs
+        """
+        mask = None
+        for thickness in (thickness_range[0], thickness_range[1]):
+            subcase_ids, stress, axis, blocks = self._subcase_rf_blocks(property_id, materials, failure_types,
+                                                                        thickness, source)
+            if mask is None:
+                mask = envelope_subcases(stress, axis)
+            for rfs in blocks:
+                mask |= governing_subcases(rfs)
+        return [int(subcase_id) for subcase_id in subcase_ids[mask]]
+
+    def subcase_min_rf(self, property_id, materials, failure_types, thickness, source="stress", subcases=None):
+        """
+        Minimum RF of every subcase over all rows, materials and criteria at one thickness
+
+        Returns:
+            tuple: (subcase_ids, min RF per subcase)
+        """
+        subcase_ids, _, _, blocks = self._subcase_rf_blocks(property_id, materials, failure_types,
+                                                            thickness, source, subcases)
+        rf = np.full(len(subcase_ids), np.inf)
+        for rfs in blocks:
+            rf = np.minimum(rf, np.where(np.isnan(rfs), np.inf, rfs).min(axis=1))
+        return subcase_ids, rf
+
+    def size_with_pruning(self, size_function, source, property_id, materials, failure_types,
+                          thickness_range, target_rf=1.1, **kwargs):
+        """
+        Run a shell sizing function on the non-dominated subcases only
+
+        The result is verified over all subcases at the final thickness; pruned subcases
+        that turn out more critical are added back and the sizing is repeated.
+
+        Args:
+            size_function: size_for_target_rf_multi or size_shell_from_resultants
+            source: Stress source of size_function ("stress" or "resultants")
+            kwargs: Passed on to size_function
+        """
+        subcases = self.get_available_subcases()
+        arguments = dict(property_id=property_id, materials=materials, failure_types=failure_types,
+                         thickness_range=thickness_range, target_rf=target_rf, **kwargs)
+        if len(subcases) < PRUNE_MIN_SUBCASES:
+            return size_function(subcases=subcases, **arguments)
+        if (source == "stress" and self.compression_tolerance is not None
+                and len(subcases) >= COMPRESS_MIN_SUBCASES):
+            # Pruning would expand the full stresses of all subcases, compression avoids exactly that
+            return size_function(subcases=subcases, **arguments)
+
+        active = self.get_dominant_subcases(property_id, materials, failure_types, thickness_range, source)
+        print(f"Subcase pruning of property {property_id}: {len(active)} of {len(subcases)} subcases not dominated")
+        while True:
+            results = size_function(subcases=active, **arguments)
+            if not results:
+                return results
+            final = results[-1]
+            subcase_ids, rf = self.subcase_min_rf(property_id, materials, failure_types, final['thickness'], source, subcases)
+            missed = [int(subcase_id) for subcase_id in subcase_ids[rf < final['min_rf'] * (1.0 - 1e-9)]
+                      if int(subcase_id) not in active]
+            if not missed:
+                print(f"Verified at {final['thickness']} mm over all {len(subcases)} subcases")
+                final['pruned_subcases'] = len(subcases) - len(active)
+                return results
+            print(f"Verification: pruned subcases {missed[:10]} govern at {final['thickness']} mm, sizing again")
+            active = sorted(set(active) | set(missed))
+
+    def size_bar_for_target_rf(self, property_id, materials, failure_types, thickness_range,
+                               width_range=None, target_rf=1.1, progress_callback=None, cancel_event=None):
+        """
+        Size a PBARL cap over a thickness x width grid
+        
+        Every material x criterion pair is one broadcast over (thickness, width, subcase, element);
+        the lightest grid point (area x density) meeting target_rf is the optimum.
+        
+        Args:
+            property_id: PBARL property ID
+            materials: List of material names
+            failure_types: Criteria, bar ones (Euler Buckling, Johnson Column) and stress ones
+            thickness_range: (min, max, step) of the section thickness
+            width_range: (min, max, step) of the section width, None keeps the card width
+            target_rf: Target reserve factor
+            progress_callback: Optional callable(step, step_count), one step per material
+            cancel_event: Optional threading.Event, SizingCancelled is raised once it is set
+        
+        Returns:
+            list: One record per thickness (best width at that thickness), the optimum
+                  flagged with 'is_optimal'
+        """
+        bars = self.get_bar_arrays(property_id)
+        section_type, dims = bars['section_type'], bars['dims']
+        
+        thickness_values = np.arange(thickness_range[0], thickness_range[1] + thickness_range[2], thickness_range[2])
+        if width_range is None:
+            width_values = np.array([base_sizing_values(section_type, dims)[1]])
+        else:
+            width_values = np.arange(width_range[0], width_range[1] + width_range[2], width_range[2])
+        
+        print(f"Bar sizing of property {property_id} ({section_type}): "
+              f"{len(thickness_values)} thicknesses x {len(width_values)} widths x "
+              f"{len(bars['subcase_ids'])} subcases x {len(bars['element_ids'])} bars")
+        
+        # Section of every grid point at once, arrays shaped (n_t, n_w)
+        t_grid, w_grid = np.meshgrid(thickness_values, width_values, indexing="ij")
+        section = section_properties(section_type, sizing_dimensions(section_type, dims, t_grid, w_grid))
+        section = {name: np.broadcast_to(value, t_grid.shape) for name, value in section.items()}
+        stress = bar_stress(bars, section)
+        
+        failure_types = [f for f in failure_types if f in FAILURE_CRITERIA and FAILURE_CRITERIA[f].applies_to("bar")]
+        allowables = self.get_material_allowables(materials, CRITERION_FIELDS)
+        
+        best_rf = np.full(t_grid.shape, np.inf)
+        best_material = np.full(t_grid.shape, -1)
+        best_failure = np.full(t_grid.shape, -1)
+        best_subcase = np.zeros(t_grid.shape, dtype=int)
+        best_element = np.zeros(t_grid.shape, dtype=int)
+        material_rf = np.full((len(materials),) + t_grid.shape, np.inf)
+        grid = (tuple(int(sc) for sc in bars['subcase_ids']), self.grid_key(thickness_values), self.grid_key(width_values))
+        
+        def bar_rf_grid(failure_type, material_allowables):
+            # (RF, flat (subcase, element) location) per grid point
+            rfs = FAILURE_CRITERIA[failure_type](stress, material_allowables)
+            rfs = np.where(np.isnan(rfs), np.inf, rfs)
+            flat = rfs.reshape(t_grid.shape + (-1,))  # (n_t, n_w, n_subcase * n_elem)
+            arg = flat.argmin(axis=-1)
+            return np.take_along_axis(flat, arg[..., None], axis=-1)[..., 0], arg
+        
+        for i, material in enumerate(materials):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SizingCancelled(f"Sizing of property {property_id} cancelled")
+            if np.isnan(allowables['found'][i]):
+                print(f"Material {material} not found in database, skipped")
+                continue
+            material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
+            
+            for j, failure_type in enumerate(failure_types):
+                rf, arg = self.memoized_curve(("bar", property_id, material, failure_type) + grid,
+                                              lambda: bar_rf_grid(failure_type, material_allowables))
+                
+                material_rf[i] = np.minimum(material_rf[i], rf)
+                # the first checked criterion is recorded even at RF inf (bars only in
+                # tension have no Euler / Johnson failure), such sections pass
+                worse = (rf < best_rf) | (best_material < 0)
+                best_rf = np.where(worse, rf, best_rf)
+                best_material = np.where(worse, i, best_material)
+                best_failure = np.where(worse, j, best_failure)
+                subcase_idx, element_idx = np.unravel_index(arg, (len(bars['subcase_ids']), len(bars['element_ids'])))
+                best_subcase = np.where(worse, bars['subcase_ids'][subcase_idx], best_subcase)
+                best_element = np.where(worse, bars['element_ids'][element_idx], best_element)
+            
+            if progress_callback is not None:
+                progress_callback(i + 1, len(materials))
+        
+        # Every material must pass on its own, the governing one is the lowest RF
+        density = np.where(np.isnan(allowables['density']), 1.0, allowables['density'])
+        feasible = best_rf >= target_rf
+        area = section['A']
+        total_length = float(bars['length'].sum())
+        
+        results = []
+        for ti, thickness in enumerate(thickness_values):
+            row_feasible = feasible[ti]
+            wi = int(np.argmin(np.where(row_feasible, area[ti], np.inf))) if row_feasible.any() else int(np.argmax(best_rf[ti]))
+            if best_material[ti, wi] < 0:
+                continue
+            results.append({
+                'thickness': float(thickness),
+                'width': float(width_values[wi]),
+                'area': float(area[ti, wi]),
+                'min_rf': float(best_rf[ti, wi]),
+                'critical_element': int(best_element[ti, wi]),
+                'critical_material': materials[best_material[ti, wi]],
+                'critical_failure_type': failure_types[best_failure[ti, wi]],
+                'critical_subcase_id': int(best_subcase[ti, wi]),
+                'material_rf': {m: float(material_rf[k, ti, wi]) for k, m in enumerate(materials)},
+                'mass': area[ti, wi] * total_length * allowables['density'][best_material[ti, wi]] * MASS_SCALE,
+                'is_optimal': False,
+            })
+        
+        if feasible.any():
+            mass_index = np.where(feasible, area * density[best_material.clip(0)], np.inf)
+            ti, wi = np.unravel_index(np.argmin(mass_index), mass_index.shape)
+            for record in results:
+                if record['thickness'] == float(thickness_values[ti]):
+                    record.update({'width': float(width_values[wi]), 'area': float(area[ti, wi]),
+                                   'min_rf': float(best_rf[ti, wi]), 'is_optimal': True,
+                                   'critical_element': int(best_element[ti, wi]),
+                                   'critical_material': materials[best_material[ti, wi]],
+                                   'critical_failure_type': failure_types[best_failure[ti, wi]],
+                                   'critical_subcase_id': int(best_subcase[ti, wi]),
+                                   'material_rf': {m: float(material_rf[k, ti, wi]) for k, m in enumerate(materials)},
+                                   'mass': area[ti, wi] * total_length * allowables['density'][best_material[ti, wi]] * MASS_SCALE})
+            print(f"Optimum section: thickness {thickness_values[ti]} mm, width {width_values[wi]} mm, "
+                  f"RF {best_rf[ti, wi]:.3f}")
+        else:
+            print(f"TARGET RF NOT ACHIEVED IN GIVEN RANGE for property {property_id}")
+        
+        # Lightest passing section of each material on its own
+        required = {m: float(np.min(area[material_rf[k] >= target_rf])) if np.any(material_rf[k] >= target_rf) else np.nan
+                    for k, m in enumerate(materials)}
+        if results:
+            optimal = next((record for record in results if record['is_optimal']), results[-1])
+            optimal['material_ranking'] = rank_materials(required, total_length, dict(zip(materials, allowables['density'])))
+            self.print_material_ranking(optimal['material_ranking'], "mm^2")
+        
+        return results
+
+    def get_ply_thickness(self, property_id):
+        """Cured ply thickness of a PCOMP, the most common ply thickness of its deck layup"""
+        layup = self.get_ply_layup()
+        k = np.searchsorted(layup['pids'], property_id)
+        if k == len(layup['pids']) or layup['pids'][k] != property_id:
+            raise ValueError(f"Property {property_id} is not a PCOMP")
+        thicknesses = layup['thicknesses'][layup['offsets'][k]:layup['offsets'][k] + layup['counts'][k]]
+        values, counts = np.unique(thicknesses, return_counts=True)
+        return float(values[np.argmax(counts)])
+
+    def size_laminate_for_target_rf(self, property_id, materials, failure_types, thickness_range,
+                                    target_rf=1.1, progress_callback=None, cancel_event=None, ply_thickness=None):
+        """
+        Size a PCOMP by ply counts per orientation (0 / +45 / -45 / 90)
+
+        All symmetric balanced stacks meeting the ply percentage rules are checked in
+        numpy batches against the shell force resultants, ply stresses in material axes.
+        Only orthotropic (MAT8 like, E1 and E2 given) materials are stacked as plies,
+        isotropic ones are rejected; rf_materialStrength sweeps the laminate thickness
+        when no orthotropic material is selected.
+
+        Args:
+            property_id: PCOMP property ID
+            materials: List of ply material names, every one has to pass
+            failure_types: Criteria checked per ply (Tsai-Wu, Tsai-Hill, Hoffman, Maximum Stress, ...)
+            thickness_range: (min, max, step) laminate thickness, the step is not used
+            target_rf: Target reserve factor
+            progress_callback: Optional callable(step, step_count), one step per material
+            cancel_event: Optional threading.Event, SizingCancelled is raised once it is set
+            ply_thickness: Cured ply thickness, None = the ply thickness of the deck PCOMP
+
+        Returns:
+            list: One record per total ply count (best stack of that count), the lightest
+                  stack meeting target_rf flagged with 'is_optimal'
+
+        Raises:
+            ValueError: no orthotropic material, no shell forces or no stack in the range
+        """
+        min_t, max_t = thickness_range[:2]
+        if ply_thickness is None:
+            ply_thickness = self.get_ply_thickness(property_id)
+        elastic = self.get_material_allowables(materials, ("E1", "E2"))
+        orthotropic = np.isfinite(elastic['E1']) & np.isfinite(elastic['E2'])
+        if not orthotropic.all():
+            print(f"Isotropic materials rejected for ply sizing: {[m for m, o in zip(materials, orthotropic) if not o]}")
+        materials = [m for m, o in zip(materials, orthotropic) if o]
+        if not materials:
+            raise ValueError("no orthotropic ply material selected")
+        forces = self.get_shell_force_arrays(property_id)
+        ply_range = (int(np.ceil(min_t / ply_thickness - 1e-9)), int(np.floor(max_t / ply_thickness + 1e-9)))
+        counts = candidate_stacks(*ply_range)
+        if len(counts) == 0:
+            raise ValueError(f"No symmetric balanced stack with {ply_thickness} mm plies fits {min_t} - {max_t} mm")
+
+        failure_types = [f for f in failure_types if f in FAILURE_CRITERIA and FAILURE_CRITERIA[f].applies_to("shell")]
+        # Panel Buckling is checked on the smeared bending stiffness of every stack
+        panel = self.get_panel_fields(property_id, forces['element_ids']) if "Panel Buckling" in failure_types else None
+        criteria = [FAILURE_CRITERIA[f] for f in failure_types]
+        allowables = self.get_material_allowables(materials, CRITERION_FIELDS)
+        subcase_key = tuple(int(sc) for sc in forces['subcase_ids'])
+        print(f"Laminate sizing of property {property_id}: {len(counts)} stacks of {ply_thickness} mm plies x "
+              f"{len(forces['subcase_ids'])} subcases x {len(forces['element_ids'])} elements")
+
+        best_rf = np.full(len(counts), np.inf)
+        best_material = np.full(len(counts), -1)
+        best_failure = np.zeros(len(counts), dtype=int)
+        best_location = np.zeros((len(counts), 4), dtype=int)
+        material_rf = np.full((len(materials), len(counts)), np.inf)
+        for i, material in enumerate(materials):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SizingCancelled(f"Sizing of property {property_id} cancelled")
+            if np.isnan(allowables['found'][i]):
+                print(f"Material {material} not found in database, skipped")
+                continue
+            material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
+            rf, governing, location = self.memoized_curve(
+                ("laminate", property_id, material, tuple(failure_types), subcase_key, ply_range, float(ply_thickness)),
+                lambda: evaluate_stacks(counts, ply_thickness, forces['membrane'], forces['bending'],
+                                        material_allowables, criteria, panel))
+            material_rf[i] = rf
+            lower = rf < best_rf
+            best_rf = np.where(lower, rf, best_rf)
+            best_material = np.where(lower, i, best_material)
+            best_failure = np.where(lower, governing, best_failure)
+            best_location = np.where(lower[:, None], location, best_location)
+            if progress_callback is not None:
+                progress_callback(i + 1, len(materials))
+
+        if np.all(best_material < 0):
+            return []
+
+        shell_ids = np.unique(forces['element_ids'])
+        property_area = float(self.parent.model_data.get_geometry().get_shell_areas(shell_ids).sum())
+        total_plies = counts.sum(axis=1)
+
+        def record(k):
+            _, subcase, element, orientation = best_location[k]
+            material = best_material[k]
+            return {
+                'thickness': float(total_plies[k] * ply_thickness),
+                'ply_thickness': float(ply_thickness),
+                'ply_counts': dict(zip(ORIENTATIONS, (int(n) for n in counts[k]))),
+                'stacking_sequence': stacking_sequence(counts[k]),
+                'min_rf': float(best_rf[k]),
+                'critical_element': int(forces['element_ids'][element]),
+                'critical_material': materials[material],
+                'critical_failure_type': failure_types[best_failure[k]],
+                'critical_subcase_id': int(forces['subcase_ids'][subcase]),
+                'critical_ply_angle': (None if failure_types[best_failure[k]] == "Panel Buckling"
+                                       else ORIENTATIONS[orientation]),
+                'material_rf': {m: float(material_rf[j, k]) for j, m in enumerate(materials)},
+                'mass': property_area * total_plies[k] * ply_thickness * allowables['density'][material] * MASS_SCALE,
+                'is_optimal': False,
+            }
+
+        # Best stack of every ply count; the first count with a passing stack is the optimum
+        results = []
+        for n in np.unique(total_plies):
+            candidates = np.flatnonzero(total_plies == n)
+            results.append(record(candidates[np.argmax(best_rf[candidates])]))
+        optimal = next((r for r in results if r['min_rf'] >= target_rf), None)
+        if optimal is not None:
+            optimal['is_optimal'] = True
+            counts_text = ", ".join(f"{angle:g}: {n}" for angle, n in optimal['ply_counts'].items())
+            print(f"Optimum laminate: {sum(optimal['ply_counts'].values())} plies ({counts_text}), "
+                  f"{optimal['thickness']} mm, RF {optimal['min_rf']:.3f}")
+        else:
+            print(f"TARGET RF NOT ACHIEVED IN GIVEN RANGE for property {property_id}")
+
+        # Lightest passing laminate thickness of each material on its own
+        required = {m: float(total_plies[material_rf[j] >= target_rf].min() * ply_thickness)
+                    if np.any(material_rf[j] >= target_rf) else np.nan for j, m in enumerate(materials)}
+        ranked = optimal if optimal is not None else results[-1]
+        ranked['material_ranking'] = rank_materials(required, property_area, dict(zip(materials, allowables['density'])))
+        self.print_material_ranking(ranked['material_ranking'], "mm")
+        return results
+
     def rf_materialStrength(self, materials, failure_types, property_id=None, 
-                           thickness_range=None, assembly_type="web", target_rf=1.1):
+                           thickness_range=None, assembly_type="web", target_rf=1.1,
+                           progress_callback=None, cancel_event=None, width_range=None):
         """
-        Main sizing function called from UI
+        Main sizing function called from UI (through SizingJob on a worker thread)
         Analyzes all materials, failure types, and subcases to find optimum sizing
         
         Args:
@@ -551,6 +1601,9 @@ class Calculator:
             thickness_range: (min, max, step) for thickness
             assembly_type: "web" or "cap"
             target_rf: Target reserve factor (default 1.1)
+            progress_callback: Optional callable(step, step_count) for progress reporting
+            cancel_event: Optional threading.Event used to cancel the sweep
+            width_range: (min, max, step) for width, used by PBARL (cap) properties
         """
         if not materials or not failure_types:
             print("No materials or failure types selected")
@@ -569,15 +1622,72 @@ class Calculator:
         available_subcases = self.get_available_subcases()
         print(f"Available subcases: {available_subcases}")
         
+        # Bars are sized over thickness x width in one grid
+        if self.parent.model_data.bdf.properties[property_id].type == "PBARL":
+            return self.size_bar_for_target_rf(
+                property_id=property_id,
+                materials=materials,
+                failure_types=failure_types,
+                thickness_range=thickness_range,
+                width_range=width_range,
+                target_rf=target_rf,
+                progress_callback=progress_callback,
+                cancel_event=cancel_event
+            )
+        
+        # Laminates are sized by ply counts when shell force resultants are available; the
+        # deck ply materials (MAT8) are checked per ply on the OP2 ply stresses instead
+        results = None
+        if self.parent.model_data.bdf.properties[property_id].type == "PCOMP":
+            if PLY_MATERIALS in materials:
+                print(f"{PLY_MATERIALS} selected, sizing the laminate thickness on the OP2 ply stresses")
+            else:
+                try:
+                    results = self.size_laminate_for_target_rf(
+                        property_id=property_id,
+                        materials=materials,
+                        failure_types=failure_types,
+                        thickness_range=thickness_range,
+                        target_rf=target_rf,
+                        progress_callback=progress_callback,
+                        cancel_event=cancel_event
+                    )
+                    if results:
+                        return results
+                    print("No ply count sizing result, sizing the laminate thickness instead")
+                    results = None
+                except ValueError as e:
+                    print(f"Ply count sizing not possible ({e}), sizing the laminate thickness instead")
+        
+        # Homogeneous shells recover stresses from the force resultants (bending ~ 1/t^2)
+        if self.parent.model_data.bdf.properties[property_id].type == "PSHELL":
+            try:
+                results = self.size_with_pruning(
+                    self.size_shell_from_resultants, "resultants",
+                    property_id=property_id,
+                    materials=materials,
+                    failure_types=failure_types,
+                    thickness_range=thickness_range,
+                    target_rf=target_rf,
+                    progress_callback=progress_callback,
+                    cancel_event=cancel_event
+                )
+            except ValueError as e:
+                print(f"No force resultants ({e}), scaling the OP2 stresses with thickness instead")
+        
         # Perform comprehensive multi-condition sizing
-        results = self.size_for_target_rf_multi(
-            property_id=property_id,
-            materials=materials,
-            failure_types=failure_types,
-            thickness_range=thickness_range,
-            target_rf=target_rf,
-            assembly_type=assembly_type
-        )
+        if results is None:
+            results = self.size_with_pruning(
+                self.size_for_target_rf_multi, "stress",
+                property_id=property_id,
+                materials=materials,
+                failure_types=failure_types,
+                thickness_range=thickness_range,
+                target_rf=target_rf,
+                assembly_type=assembly_type,
+                progress_callback=progress_callback,
+                cancel_event=cancel_event
+            )
         
         # Summary of results
         if results:
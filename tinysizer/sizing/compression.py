@@ -0,0 +1,162 @@
+"""
+Low rank compression of large subcase sets
+
+The stresses of a property form a (subcase x row.component) matrix A. Subcases that are
+close to linear combinations of a few unit loads make A nearly low rank, so a truncated
+SVD A ~ C B with C = U_r S_r (n_subcase x r) and B = V_r^T (r x 3 n_rows) holds them in
+(n_subcase + 3 n_rows) r values. The rank is the smallest one whose discarded singular
+values keep the relative Frobenius error below the tolerance; sigma_(r+1) bounds the
+error of every single reconstructed subcase.
+
+A itself is never formed, the SVD comes from the smaller Gram matrix read block by block:
+with fewer stress columns than subcases A^T A = sum A_i^T A_i over the subcase blocks A_i
+gives V and S^2, and C = A V_r is read in a second pass; otherwise A A^T is accumulated
+from pairs of subcase blocks, giving U and S^2, and B = S_r^-1 U_r^T A is accumulated in a
+second pass. Criteria are evaluated on reconstructed blocks of subcases, so at most two
+blocks of full stresses exist at a time.
+"""
+import numpy as np
+
+# Subcase sets smaller than this are not worth compressing
+COMPRESS_MIN_SUBCASES = 200
+
+# Subcases reconstructed per block
+COMPRESS_BLOCK_SUBCASES = 256
+
+# Relative error tolerances offered in the sizing tab (None = exact stresses)
+COMPRESSION_TOLERANCES = (None, 1e-2, 1e-3, 1e-4)
+
+STRESS_KEYS = ('oxx', 'oyy', 'txy')
+
+
+class CompressedStress:
+    """
+    Truncated SVD of the stresses of one property
+
+    coefficients (n_subcase, rank) x basis (rank, 3 * n_rows), the columns of the basis
+    are oxx of all rows, then oyy, then txy.
+    """
+    def __init__(self, coefficients, basis, n_rows, relative_error, max_subcase_error, full_rank):
+        self.coefficients = coefficients
+        self.basis = basis
+        self.n_rows = n_rows
+        self.relative_error = relative_error  # ||A - C B||_F / ||A||_F
+        self.max_subcase_error = max_subcase_error  # sigma_(r+1), bound of the 2-norm error of each subcase
+        self.full_rank = full_rank
+
+    @property
+    def rank(self):
+        return self.basis.shape[0]
+
+    @property
+    def n_subcase(self):
+        return self.coefficients.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.coefficients.nbytes + self.basis.nbytes
+
+    def reconstruct(self, subcases=slice(None)):
+        """Stress dict of the selected subcases (index / slice), arrays (n, n_rows)"""
+        values = self.coefficients[subcases] @ self.basis
+        return {key: values[:, k * self.n_rows:(k + 1) * self.n_rows] for k, key in enumerate(STRESS_KEYS)}
+
+    def blocks(self, block_size=COMPRESS_BLOCK_SUBCASES):
+        """Yield (subcase slice, reconstructed stress dict) block by block"""
+        for start in range(0, self.n_subcase, block_size):
+            rows = slice(start, min(start + block_size, self.n_subcase))
+            yield rows, self.reconstruct(rows)
+
+
+def compress_stress(stress, tolerance=1e-3):
+    """
+    Truncated SVD of stress arrays held in memory
+
+    Args:
+        stress: 'oxx', 'oyy', 'txy' arrays (n_subcase, n_rows)
+        tolerance: Allowed relative Frobenius error of the reconstruction
+
+    Returns:
+        CompressedStress
+    """
+    n_subcase = len(stress[STRESS_KEYS[0]])
+    return compress_stress_blocks(
+        n_subcase, lambda rows: np.concatenate([np.asarray(stress[key][rows], dtype=float) for key in STRESS_KEYS], axis=1),
+        tolerance)
+
+
+def compress_stress_blocks(n_subcase, read_block, tolerance=1e-3, block_size=COMPRESS_BLOCK_SUBCASES):
+    """
+    Truncated SVD of stresses read a block of subcases at a time
+
+    Args:
+        n_subcase: Number of subcases
+        read_block: callable(subcase slice) -> (n, 3 * n_rows) array, columns oxx of all
+                    rows, then oyy, then txy
+        tolerance: Allowed relative Frobenius error of the reconstruction
+        block_size: Subcases per block
+
+    Returns:
+        CompressedStress
+    """
+    blocks = [slice(start, min(start + block_size, n_subcase)) for start in range(0, n_subcase, block_size)]
+    first = read_block(blocks[0])
+    n_columns = first.shape[1]
+
+    if n_columns < n_subcase:
+        gram = first.T @ first
+        for rows in blocks[1:]:
+            block = read_block(rows)
+            gram += block.T @ block
+        del block
+        S, V = _gram_factors(gram)
+        relative, rank = _truncation(S, tolerance)
+        coefficients = np.concatenate([(first if rows is blocks[0] else read_block(rows)) @ V[:, :rank]
+                                       for rows in blocks])
+        basis = V[:, :rank].T.copy()
+    else:
+        gram = np.zeros((n_subcase, n_subcase))
+        for i, rows_i in enumerate(blocks):
+            block_i = first if i == 0 else read_block(rows_i)
+            for rows_j in blocks[:i]:
+                product = block_i @ read_block(rows_j).T
+                gram[rows_i, rows_j] = product
+                gram[rows_j, rows_i] = product.T
+            gram[rows_i, rows_i] = block_i @ block_i.T
+        del block_i
+        S, U = _gram_factors(gram)
+        relative, rank = _truncation(S, tolerance)
+        # B = S_r^-1 U_r^T A, one block of A at a time
+        inverse = np.divide(1.0, S[:rank], out=np.zeros(rank), where=S[:rank] > 0)
+        basis = np.zeros((rank, n_columns))
+        for rows in blocks:
+            basis += (U[rows, :rank] * inverse).T @ (first if rows is blocks[0] else read_block(rows))
+        coefficients = U[:, :rank] * S[:rank]
+    del first
+
+    return CompressedStress(
+        coefficients=coefficients,
+        basis=basis,
+        n_rows=n_columns // len(STRESS_KEYS),
+        relative_error=float(relative[rank]),
+        max_subcase_error=float(S[rank]) if rank < len(S) else 0.0,
+        # eigenvalues of a Gram matrix resolve singular values down to about sqrt(eps) sigma_1
+        full_rank=int(np.sum(S > S[0] * 1e-7)) if len(S) else 0,
+    )
+
+
+def _gram_factors(gram):
+    """Singular values (descending) and singular vectors of A from its Gram matrix"""
+    energy, vectors = np.linalg.eigh(gram)
+    return np.sqrt(np.clip(energy[::-1], 0.0, None)), vectors[:, ::-1]
+
+
+def _truncation(S, tolerance):
+    """Relative Frobenius error per kept rank and the smallest rank within the tolerance"""
+    energy = S**2
+    total = energy.sum()
+    # tail[r] = energy discarded when keeping r singular values
+    tail = np.concatenate([np.cumsum(energy[::-1])[::-1], [0.0]])
+    relative = np.sqrt(tail / total) if total > 0 else np.zeros_like(tail)
+    rank = int(np.argmax(relative <= tolerance))
+    return relative, max(rank, 1)
@@ -0,0 +1,197 @@
+"""
+Failure criterion registry
+
+Every criterion is a vectorized kernel
+    kernel(stress, allowables) -> rf array
+where stress is a dict of in-plane stress arrays shaped (subcase x element) -
+'oxx', 'oyy', 'txy' (material/ply axes for composites) - and allowables is a dict of
+scalars or arrays broadcastable over the element axis (one value per element lets a
+single call cover properties with different materials). A criterion costs one numpy
+pass over the whole (subcase x element) block, there is no Python loop per element.
+"""
+import numpy as np
+
+# Allowable fields any registered criterion may ask for (fetched in one database query)
+CRITERION_FIELDS = ("Ftu", "Fty", "Fcy", "Fsu", "E", "G", "nu",
+                    "E1", "E2", "G12", "nu12", "Xt", "Xc", "Yt", "Yc", "S", "density")
+
+FAILURE_CRITERIA = {}
+
+
+class Criterion:
+    """Registered failure criterion, element_kind tells which properties it applies to"""
+    def __init__(self, name, kernel, element_kind="shell", description="", thickness_exponent=1.0):
+        self.name = name
+        self.kernel = kernel
+        self.element_kind = element_kind  # "shell", "bar" or "any"
+        self.description = description
+        self.thickness_exponent = thickness_exponent  # RF ~ t^n at constant loads (strength 1, buckling 3)
+
+    def applies_to(self, element_kind):
+        return self.element_kind in ("any", element_kind)
+
+    def __call__(self, stress, allowables):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.kernel(stress, allowables)
+
+
+def register_criterion(name, element_kind="shell", description="", thickness_exponent=1.0):
+    """Decorator adding a kernel to FAILURE_CRITERIA under name"""
+    def decorator(kernel):
+        FAILURE_CRITERIA[name] = Criterion(name, kernel, element_kind, description, thickness_exponent)
+        return kernel
+    return decorator
+
+
+def get_criterion(name):
+    if name not in FAILURE_CRITERIA:
+        raise ValueError(f"Failure criterion '{name}' is not registered")
+    return FAILURE_CRITERIA[name]
+
+
+def available_criteria(element_kind=None):
+    """Names of registered criteria, optionally only those applicable to an element kind"""
+    return [name for name, criterion in FAILURE_CRITERIA.items()
+            if element_kind is None or criterion.applies_to(element_kind)]
+
+
+def evaluate_criterion(name, stress, allowables):
+    """RF array (subcase x element) of criterion name"""
+    return get_criterion(name)(stress, allowables)
+
+
+#########################################
+# H E L P E R S
+#########################################
+def _field(allowables, name, fallback=None):
+    """Allowable as float array, NaN entries replaced by a fallback field"""
+    value = np.asarray(allowables.get(name, np.nan), dtype=float)
+    if fallback is not None:
+        value = np.where(np.isnan(value), _field(allowables, fallback), value)
+    return value
+
+
+def _strengths(allowables):
+    """Xt, Xc, Yt, Yc, S - isotropic materials fall back to Ftu / Fcy / Fsu"""
+    Xt = _field(allowables, "Xt", "Ftu")
+    Xc = _field(allowables, "Xc", "Fcy")
+    Xc = np.where(np.isnan(Xc), Xt, Xc)
+    Yt = _field(allowables, "Yt", "Ftu")
+    Yc = _field(allowables, "Yc", "Fcy")
+    Yc = np.where(np.isnan(Yc), Yt, Yc)
+    S = _field(allowables, "S", "Fsu")
+    S = np.where(np.isnan(S), Xt / np.sqrt(3.0), S)  # von Mises shear estimate
+    return Xt, Xc, Yt, Yc, S
+
+
+def _elastic(allowables):
+    """E1, E2, G12, nu12 - isotropic materials fall back to E / G / nu"""
+    E1 = _field(allowables, "E1", "E")
+    E2 = _field(allowables, "E2", "E")
+    nu12 = _field(allowables, "nu12", "nu")
+    G12 = _field(allowables, "G12", "G")
+    G12 = np.where(np.isnan(G12), E1 / (2.0 * (1.0 + nu12)), G12)
+    return E1, E2, G12, nu12
+
+
+def von_mises(oxx, oyy, txy):
+    """Plane stress von Mises"""
+    return np.sqrt(oxx**2 - oxx * oyy + oyy**2 + 3.0 * txy**2)
+
+
+def principal_stresses(oxx, oyy, txy):
+    """In-plane principal stresses (max, min)"""
+    center = 0.5 * (oxx + oyy)
+    radius = np.sqrt((0.5 * (oxx - oyy))**2 + txy**2)
+    return center + radius, center - radius
+
+
+def _quadratic_rf(a, b):
+    """Positive root of a*RF^2 + b*RF - 1 = 0 (interaction criteria with linear terms)"""
+    disc = np.sqrt(b**2 + 4.0 * a)
+    rf = np.where(a > 0, (-b + disc) / (2.0 * a), 1.0 / b)
+    return np.where(rf > 0, rf, np.inf)
+
+
+def _ratio_rf(allowable, applied):
+    """allowable / applied, unloaded (applied <= 0) components give inf"""
+    return np.where(applied > 0, allowable / applied, np.inf)
+
+
+#########################################
+# C R I T E R I A
+#########################################
+@register_criterion("Von Mises", element_kind="any", description="Ftu / von Mises stress")
+def von_mises_rf(stress, allowables):
+    return _field(allowables, "Ftu") / von_mises(stress["oxx"], stress["oyy"], stress["txy"])
+
+
+@register_criterion("Maximum Principal Stress", element_kind="any",
+                    description="Ftu / tensile principal, Fcy / compressive principal")
+def max_principal_rf(stress, allowables):
+    p1, p2 = principal_stresses(stress["oxx"], stress["oyy"], stress["txy"])
+    Ftu = _field(allowables, "Ftu")
+    Fcy = _field(allowables, "Fcy", "Ftu")
+    tension = _ratio_rf(Ftu, np.maximum(p1, 0.0))
+    compression = _ratio_rf(Fcy, np.maximum(-p2, 0.0))
+    return np.minimum(tension, compression)
+
+
+@register_criterion("Maximum Stress", element_kind="any",
+                    description="Each stress component against its own allowable")
+def max_stress_rf(stress, allowables):
+    o1, o2, t12 = stress["oxx"], stress["oyy"], stress["txy"]
+    Xt, Xc, Yt, Yc, S = _strengths(allowables)
+    rf = np.minimum(_ratio_rf(Xt, o1), _ratio_rf(Xc, -o1))
+    rf = np.minimum(rf, np.minimum(_ratio_rf(Yt, o2), _ratio_rf(Yc, -o2)))
+    return np.minimum(rf, _ratio_rf(S, np.abs(t12)))
+
+
+@register_criterion("Maximum Strain", element_kind="any",
+                    description="Plane stress strains against strength / modulus")
+def max_strain_rf(stress, allowables):
+    o1, o2, t12 = stress["oxx"], stress["oyy"], stress["txy"]
+    Xt, Xc, Yt, Yc, S = _strengths(allowables)
+    E1, E2, G12, nu12 = _elastic(allowables)
+    nu21 = nu12 * E2 / E1
+    e1 = o1 / E1 - nu21 * o2 / E2
+    e2 = o2 / E2 - nu12 * o1 / E1
+    g12 = np.abs(t12) / G12
+    rf = np.minimum(_ratio_rf(Xt / E1, e1), _ratio_rf(Xc / E1, -e1))
+    rf = np.minimum(rf, np.minimum(_ratio_rf(Yt / E2, e2), _ratio_rf(Yc / E2, -e2)))
+    return np.minimum(rf, _ratio_rf(S / G12, g12))
+
+
+@register_criterion("Tsai-Hill", element_kind="any",
+                    description="Quadratic interaction, tension/compression strengths by sign")
+def tsai_hill_rf(stress, allowables):
+    o1, o2, t12 = stress["oxx"], stress["oyy"], stress["txy"]
+    Xt, Xc, Yt, Yc, S = _strengths(allowables)
+    X = np.where(o1 >= 0, Xt, Xc)
+    Y = np.where(o2 >= 0, Yt, Yc)
+    index = (o1 / X)**2 - o1 * o2 / X**2 + (o2 / Y)**2 + (t12 / S)**2
+    return np.where(index > 0, 1.0 / np.sqrt(index), np.inf)
+
+
+@register_criterion("Tsai-Wu", element_kind="any",
+                    description="Tensor polynomial, F12 = -0.5 sqrt(F11 F22)")
+def tsai_wu_rf(stress, allowables):
+    o1, o2, t12 = stress["oxx"], stress["oyy"], stress["txy"]
+    Xt, Xc, Yt, Yc, S = _strengths(allowables)
+    F1, F2 = 1.0 / Xt - 1.0 / Xc, 1.0 / Yt - 1.0 / Yc
+    F11, F22, F66 = 1.0 / (Xt * Xc), 1.0 / (Yt * Yc), 1.0 / S**2
+    F12 = -0.5 * np.sqrt(F11 * F22)
+    a = F11 * o1**2 + F22 * o2**2 + F66 * t12**2 + 2.0 * F12 * o1 * o2
+    b = F1 * o1 + F2 * o2
+    return _quadratic_rf(a, b)
+
+
+@register_criterion("Hoffman", element_kind="any",
+                    description="Tsai-Wu form with F12 = -1 / (2 Xt Xc)")
+def hoffman_rf(stress, allowables):
+    o1, o2, t12 = stress["oxx"], stress["oyy"], stress["txy"]
+    Xt, Xc, Yt, Yc, S = _strengths(allowables)
+    F1, F2 = 1.0 / Xt - 1.0 / Xc, 1.0 / Yt - 1.0 / Yc
+    a = o1**2 / (Xt * Xc) - o1 * o2 / (Xt * Xc) + o2**2 / (Yt * Yc) + t12**2 / S**2
+    b = F1 * o1 + F2 * o2
+    return _quadratic_rf(a, b)
@@ -0,0 +1,236 @@
+"""
+Fully stressed design (FSD)
+
+All shell properties are resized together. Stresses follow the thickness the way the
+sweep sizing recovers them: PSHELLs with shell force resultants (FORCE_SHELL) as the fibre
+stresses N/t +- 6M/t^2 of size_shell_from_resultants, the others by scaling the OP2
+stresses (stress = stress_op2 * t_base / t, no load redistribution). Every row is held as
+the coefficients of 1/t and 1/t^2, so every iteration is one pass of the registered
+criteria over the stacked (subcase x row) stresses of all properties, reduced per property
+with np.minimum.reduceat. The resize rule t_new = t * (target_rf / RF)^(1/n), n the
+thickness exponent of the governing criterion (1 strength, 3 panel buckling), is exact for
+linear criteria on membrane stresses and converges in a few passes for bending and the
+interaction ones; move limits and min/max gauges bound every step.
+"""
+import numpy as np
+from tinysizer.sizing.calculations import SizingCancelled
+from tinysizer.sizing.criteria import CRITERION_FIELDS, FAILURE_CRITERIA
+from tinysizer.sizing.mass import MASS_SCALE
+from tinysizer.sizing.resultants import FIBRES
+
+STRESS_KEYS = ('oxx', 'oyy', 'txy')
+
+
+def _property_rows(calculator, pid, subcases):
+    """
+    Stress coefficients of one property per (subcase, row)
+
+    Returns:
+        dict: per key of STRESS_KEYS the coefficient of 1/t, 'bending_<key>' of 1/t^2 and
+              'membrane_<key>' the 1/t coefficient of the mid-plane stress, arrays
+              (n_subcase of the property, n_rows); 'element_ids' per row and 'subcase_ids'
+    """
+    if calculator.parent.model_data.bdf.properties[pid].type == "PSHELL":
+        try:
+            forces = calculator.get_shell_force_arrays(pid, subcases)
+        except (ValueError, KeyError):
+            forces = None
+        if forces is not None:
+            # rows are the bottom (Z1) and top (Z2) fibre of every element, 12 M z / t^3 = 6 M (2 z/t) / t^2
+            rows = {}
+            for k, key in enumerate(STRESS_KEYS):
+                membrane = forces['membrane'][:, :, k]
+                rows[key] = np.concatenate([membrane, membrane], axis=1)
+                rows[f'membrane_{key}'] = rows[key]
+                rows[f'bending_{key}'] = np.concatenate([12.0 * z * forces['bending'][:, :, k] for z in FIBRES], axis=1)
+            rows['element_ids'] = np.concatenate([forces['element_ids'], forces['element_ids']])
+            rows['subcase_ids'] = forces['subcase_ids']
+            return rows
+        print(f"FSD: no force resultants for property {pid}, scaling its OP2 stresses with thickness")
+
+    stress = calculator.get_stress_arrays(pid, subcases)
+    base = calculator.get_base_thickness(pid)
+    rows = {}
+    for key in STRESS_KEYS:
+        rows[key] = stress[key] * base
+        rows[f'membrane_{key}'] = rows[key]
+        rows[f'bending_{key}'] = np.zeros_like(rows[key])
+    rows['element_ids'] = stress['element_ids']
+    rows['subcase_ids'] = stress['subcase_ids']
+    return rows
+
+
+def _stack_properties(calculator, property_ids, subcases):
+    """Stress rows of all properties side by side, subcases aligned (NaN where missing)"""
+    keys = [prefix + key for prefix in ('', 'membrane_', 'bending_') for key in STRESS_KEYS]
+    blocks, row_counts, used = [], [], []
+    for pid in property_ids:
+        try:
+            stress = _property_rows(calculator, pid, subcases)
+        except (ValueError, KeyError) as e:
+            print(f"FSD: property {pid} skipped ({e})")
+            continue
+        rows = np.searchsorted(subcases, stress['subcase_ids'])
+        block = {}
+        for key in keys:
+            aligned = np.full((len(subcases), stress[key].shape[1]), np.nan)
+            aligned[rows] = stress[key]
+            block[key] = aligned
+        block['element_ids'] = stress['element_ids']
+        blocks.append(block)
+        row_counts.append(len(stress['element_ids']))
+        used.append(pid)
+
+    if not blocks:
+        raise ValueError("No shell stresses found for the FSD properties")
+
+    stacked = {key: np.concatenate([block[key] for block in blocks], axis=1) for key in keys}
+    stacked['element_ids'] = np.concatenate([block['element_ids'] for block in blocks])
+    return used, np.array(row_counts), stacked
+
+
+def run_fully_stressed_design(calculator, property_ids, materials, failure_types, target_rf=1.1,
+                              gauge_limits=(0.5, 20.0), move_limit=0.5, max_iterations=20,
+                              tolerance=0.01, progress_callback=None, cancel_event=None):
+    """
+    Resize all shell properties toward target_rf
+
+    Args:
+        calculator: Calculator of the loaded model
+        property_ids: Properties to resize (PSHELL / PCOMP, others are skipped)
+        materials: Material names, every one has to pass (like the sweep sizing)
+        failure_types: Registered criterion names
+        target_rf: Target reserve factor
+        gauge_limits: (min, max) thickness
+        move_limit: Largest relative thickness change per iteration (0.5 = +-50 %)
+        max_iterations: Iteration cap
+        tolerance: Converged when every RF is within target_rf * (1 +- tolerance) or at a gauge
+        progress_callback: Optional callable(iteration, max_iterations)
+        cancel_event: Optional threading.Event, SizingCancelled is raised once it is set
+
+    Returns:
+        dict: 'properties' {pid: result record like the sweep records}, 'history'
+              [{'iteration', 'mass', 'worst_rf', 'worst_property', 'max_change'}], 'converged'
+    """
+    bdf = calculator.parent.model_data.bdf
+    shell_pids = [pid for pid in property_ids if bdf.properties[pid].type in ("PSHELL", "PCOMP")]
+    skipped = sorted(set(property_ids) - set(shell_pids))
+    if skipped:
+        print(f"FSD resizes shell properties only, skipped: {skipped}")
+
+    subcases = np.array(calculator.get_available_subcases())
+    pids, row_counts, stress = _stack_properties(calculator, shell_pids, subcases)
+    starts = np.concatenate([[0], np.cumsum(row_counts)[:-1]])
+    row_property = np.repeat(np.arange(len(pids)), row_counts)
+
+    # Per property constants
+    base = np.array([calculator.get_base_thickness(pid) for pid in pids], dtype=float)
+    laminate_factor = np.array([float(np.sum(bdf.properties[pid].thicknesses)) / b if bdf.properties[pid].type == "PCOMP" else 1.0
+                                for pid, b in zip(pids, base)])
+    geometry = calculator.parent.model_data.get_geometry()
+    areas = np.zeros(len(pids))
+    for k, pid in enumerate(pids):
+        element_ids = calculator.get_property_element_ids(pid)
+        areas[k] = geometry.get_shell_areas(element_ids[np.isin(element_ids, geometry.shell_ids)]).sum()
+
+    allowables = calculator.get_material_allowables(materials, CRITERION_FIELDS)
+    criteria = [FAILURE_CRITERIA[f] for f in failure_types if f in FAILURE_CRITERIA and FAILURE_CRITERIA[f].applies_to("shell")]
+    if not criteria:
+        raise ValueError("No shell failure criteria selected for FSD")
+    usable = [i for i in range(len(materials)) if not np.isnan(allowables['found'][i])]
+    if not usable:
+        raise ValueError("None of the selected materials is in the material database")
+
+    # Panel buckling needs the panel size of every row and the current thickness
+    panel_fields = {}
+    if any(criterion.name == "Panel Buckling" for criterion in criteria):
+        fields = [calculator.get_panel_fields(pid, stress['element_ids'][start:start + count])
+                  for pid, start, count in zip(pids, starts, row_counts)]
+        panel_fields = {key: np.concatenate([f[key] for f in fields]) for key in ('panel_a', 'panel_b')}
+
+    t_min, t_max = gauge_limits
+    thickness = np.clip(base, t_min, t_max)
+
+    def evaluate(thickness):
+        """Per property minimum RF and the governing material / criterion / subcase / element"""
+        inverse = (1.0 / thickness)[row_property]
+        scaled = {key: stress[key] * inverse + stress[f'bending_{key}'] * inverse**2 for key in STRESS_KEYS}
+        scaled.update({f'membrane_{key}': stress[f'membrane_{key}'] * inverse for key in STRESS_KEYS})
+        if panel_fields:
+            scaled.update(panel_fields, thickness=(thickness * laminate_factor)[row_property])
+        row_rf = np.full(len(row_property), np.inf)
+        row_material = np.zeros(len(row_property), dtype=int)
+        row_criterion = np.zeros(len(row_property), dtype=int)
+        row_subcase = np.zeros(len(row_property), dtype=int)
+        for i in usable:
+            material_allowables = {field: allowables[field][i] for field in CRITERION_FIELDS}
+            for j, criterion in enumerate(criteria):
+                rfs = criterion(scaled, material_allowables)
+                rfs = np.where(np.isnan(rfs), np.inf, rfs)
+                sub = rfs.argmin(axis=0)
+                rf = rfs[sub, np.arange(rfs.shape[1])]
+                lower = rf < row_rf
+                row_rf = np.where(lower, rf, row_rf)
+                row_material = np.where(lower, i, row_material)
+                row_criterion = np.where(lower, j, row_criterion)
+                row_subcase = np.where(lower, sub, row_subcase)
+
+        property_rf = np.minimum.reduceat(row_rf, starts)
+        critical_rows = np.flatnonzero(row_rf == property_rf[row_property])
+        first = critical_rows[np.unique(row_property[critical_rows], return_index=True)[1]]
+        critical_row = np.zeros(len(pids), dtype=int)
+        critical_row[row_property[first]] = first
+        return property_rf, critical_row, row_material, row_criterion, row_subcase
+
+    history, converged = [], False
+    for iteration in range(max_iterations + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SizingCancelled("FSD cancelled")
+
+        property_rf, critical_row, row_material, row_criterion, row_subcase = evaluate(thickness)
+        density = allowables['density'][row_material[critical_row]]
+        mass = float(np.nansum(areas * laminate_factor * thickness * density) * MASS_SCALE)
+        worst = int(np.argmin(property_rf))
+
+        # Resize: RF ~ t^n of the governing criterion (n = 1 strength, 3 buckling);
+        # unloaded properties go to min gauge
+        exponent = np.array([criterion.thickness_exponent for criterion in criteria])[row_criterion[critical_row]]
+        ratio = np.where(np.isfinite(property_rf), (target_rf / property_rf) ** (1.0 / exponent), 0.0)
+        new_thickness = np.clip(thickness * ratio, thickness * (1.0 - move_limit), thickness * (1.0 + move_limit))
+        new_thickness = np.clip(new_thickness, t_min, t_max)
+        max_change = float(np.max(np.abs(new_thickness - thickness) / thickness))
+
+        history.append({'iteration': iteration, 'mass': mass, 'worst_rf': float(property_rf[worst]),
+                        'worst_property': int(pids[worst]), 'max_change': max_change})
+        print(f"FSD iteration {iteration}: mass {mass:.4f} kg, worst RF {property_rf[worst]:.3f} "
+              f"(PID {pids[worst]}), max thickness change {100 * max_change:.1f} %")
+
+        at_gauge = ((property_rf > target_rf) & (thickness <= t_min)) | ((property_rf < target_rf) & (thickness >= t_max))
+        on_target = np.abs(property_rf / target_rf - 1.0) <= tolerance
+        if np.all(on_target | at_gauge) or max_change < 1e-6:
+            converged = True
+            break
+        if progress_callback is not None:
+            progress_callback(iteration + 1, max_iterations)
+        if iteration < max_iterations:
+            thickness = new_thickness
+
+    if progress_callback is not None:
+        progress_callback(max_iterations, max_iterations)
+    print(f"FSD {'converged' if converged else 'stopped'} after {len(history)} evaluations")
+
+    properties = {}
+    for k, pid in enumerate(pids):
+        row = critical_row[k]
+        properties[int(pid)] = {
+            'thickness': float(thickness[k]),
+            'min_rf': float(property_rf[k]),
+            'critical_element': int(stress['element_ids'][row]),
+            'critical_material': materials[row_material[row]],
+            'critical_failure_type': criteria[row_criterion[row]].name,
+            'critical_subcase_id': int(subcases[row_subcase[row]]),
+            'mass': float(areas[k] * laminate_factor[k] * thickness[k] * allowables['density'][row_material[row]] * MASS_SCALE),
+            'is_optimal': bool(property_rf[k] >= target_rf * (1.0 - tolerance)),
+            'fsd_history': history,
+        }
+    return {'properties': properties, 'history': history, 'converged': converged}
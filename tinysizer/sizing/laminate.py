@@ -0,0 +1,165 @@
+"""
+Discrete ply-count sizing of PCOMP laminates
+
+Candidate laminates are symmetric and balanced stacks of 0 / +45 / -45 / 90 plies. Their
+membrane stiffness A = t_ply * sum(n_o * Qbar_o) is built for all candidates at once,
+laminate strains come from the shell force resultants (FORCE_SHELL) and the ply stresses
+of every orientation are checked with the registered criteria in material axes. Bending
+resultants use the smeared stiffness D = A h^2 / 12, so the outer fibre strain is
+A^-1 (N +- 6 M / h) and every orientation is checked as if it were the surface ply.
+Panel buckling is a laminate level check on the same smeared D (laminate_buckling_rf).
+"""
+import numpy as np
+from tinysizer.sizing.criteria import _elastic
+from tinysizer.sizing.buckling import panel_buckling_resultants, interaction_rf
+
+ORIENTATIONS = (0.0, 45.0, -45.0, 90.0)
+
+# Ply percentage rules: each of 0, +-45 (together) and 90 within these bounds
+PLY_RULES = {'min_percent': 10.0, 'max_percent': 100.0}
+
+# Candidate laminates evaluated per numpy batch (bounds the temporary arrays)
+CANDIDATE_BATCH = 256
+
+
+def ply_stiffness(E1, E2, G12, nu12):
+    """Reduced stiffness matrix Q of a ply (plane stress, material axes)"""
+    nu21 = nu12 * E2 / E1
+    denominator = 1.0 - nu12 * nu21
+    return np.array([
+        [E1 / denominator, nu12 * E2 / denominator, 0.0],
+        [nu12 * E2 / denominator, E2 / denominator, 0.0],
+        [0.0, 0.0, G12],
+    ])
+
+
+def strain_transformation(theta):
+    """Engineering strain from laminate axes to ply axes at angle theta (degrees)"""
+    c, s = np.cos(np.radians(theta)), np.sin(np.radians(theta))
+    return np.array([
+        [c * c, s * s, c * s],
+        [s * s, c * c, -c * s],
+        [-2.0 * c * s, 2.0 * c * s, c * c - s * s],
+    ])
+
+
+def candidate_stacks(min_plies, max_plies, rules=None):
+    """
+    All symmetric balanced stacks with min_plies <= total <= max_plies
+
+    Returns:
+        np.ndarray: (n_candidate, 4) ply counts per ORIENTATIONS, sorted by total count
+    """
+    rules = rules or PLY_RULES
+    half = max_plies // 2
+    h0, h45, h90 = np.meshgrid(np.arange(half + 1), np.arange(half // 2 + 1), np.arange(half + 1), indexing="ij")
+    counts = np.stack([2 * h0.ravel(), 2 * h45.ravel(), 2 * h45.ravel(), 2 * h90.ravel()], axis=1)
+    total = counts.sum(axis=1)
+    keep = (total >= max(min_plies, 1)) & (total <= max_plies)
+    counts, total = counts[keep], total[keep]
+
+    groups = np.column_stack([counts[:, 0], counts[:, 1] + counts[:, 2], counts[:, 3]]) * 100.0 / total[:, None]
+    keep = np.all((groups >= rules['min_percent']) & (groups <= rules['max_percent']), axis=1)
+    counts = counts[keep]
+    return counts[np.argsort(counts.sum(axis=1), kind="stable")]
+
+
+def stacking_sequence(counts):
+    """Full symmetric sequence (angles) of a stack, orientations interleaved in the half"""
+    remaining = [int(n) // 2 for n in counts]
+    half = []
+    while any(remaining):
+        for i, angle in enumerate(ORIENTATIONS):
+            if remaining[i]:
+                half.append(angle)
+                remaining[i] -= 1
+    return half + half[::-1]
+
+
+def laminate_buckling_rf(A, h, membrane, panel_a, panel_b):
+    """
+    Panel buckling RF of candidate stacks from their smeared bending stiffness
+
+    D = A h^2 / 12 enters as the effective plate stiffness 0.5 (sqrt(D11 D22) + D12 + 2 D66):
+    with k_c = 4 this is the orthotropic long plate compression load
+    2 pi^2 / b^2 (sqrt(D11 D22) + D12 + 2 D66), and D itself for an isotropic plate.
+
+    Args:
+        A: (n_candidate, 3, 3) membrane stiffness
+        h: (n_candidate,) laminate thickness
+        membrane: (n_subcase, n_elem, 3) Nx, Ny, Nxy force per length
+        panel_a: (n_elem,) panel length
+        panel_b: (n_elem,) panel width
+
+    Returns:
+        np.ndarray: (n_candidate, n_subcase, n_elem) RF
+    """
+    D = A * (h**2 / 12.0)[:, None, None]
+    D_eff = 0.5 * (np.sqrt(D[:, 0, 0] * D[:, 1, 1]) + D[:, 0, 1] + 2.0 * D[:, 2, 2])
+    N_shear, N_compression = panel_buckling_resultants(D_eff[:, None, None], panel_a, panel_b)
+    R_c = np.maximum(-np.minimum(membrane[..., 0], membrane[..., 1]), 0.0)[None] / N_compression
+    R_s = np.abs(membrane[..., 2])[None] / N_shear
+    return interaction_rf(R_c, R_s)
+
+
+def evaluate_stacks(counts, ply_thickness, membrane, bending, allowables, criteria, panel=None):
+    """
+    Minimum RF of every candidate stack
+
+    Args:
+        counts: (n_candidate, 4) ply counts per ORIENTATIONS
+        ply_thickness: Cured ply thickness
+        membrane: (n_subcase, n_elem, 3) Nx, Ny, Nxy force per length
+        bending: (n_subcase, n_elem, 3) Mx, My, Mxy moment per length
+        allowables: Material allowables dict (E1, E2, G12, nu12, Xt, ...)
+        criteria: Registered Criterion objects
+        panel: Optional dict of 'panel_a', 'panel_b' (n_elem,) for Panel Buckling, which is
+               skipped without it
+
+    Returns:
+        tuple: (rf, governing criterion index, governing (surface, subcase, element,
+               orientation) index) per candidate
+    """
+    E1, E2, G12, nu12 = (float(value) for value in _elastic(allowables))
+    Q = ply_stiffness(E1, E2, G12, nu12)
+    T = np.stack([strain_transformation(theta) for theta in ORIENTATIONS])  # (4, 3, 3)
+    Qbar = np.einsum("oki,kl,olj->oij", T, Q, T)  # Tt Q T per orientation
+    QT = np.einsum("ik,okj->oij", Q, T)           # laminate strain -> ply stress
+
+    rf_all = np.full(len(counts), np.inf)
+    governing = np.zeros(len(counts), dtype=int)
+    location = np.zeros((len(counts), 4), dtype=int)
+    for start in range(0, len(counts), CANDIDATE_BATCH):
+        batch = counts[start:start + CANDIDATE_BATCH].astype(float)
+        h = batch.sum(axis=1) * ply_thickness
+        A = ply_thickness * np.einsum("co,oij->cij", batch, Qbar)
+        a = np.linalg.inv(A)
+
+        # outer fibre loads N +- 6M/h, (n_c, 2, n_subcase, n_elem, 3)
+        moment = 6.0 * bending[None] / h[:, None, None, None]
+        loads = np.stack([membrane[None] + moment, membrane[None] - moment], axis=1)
+        strain = np.einsum("cij,csnej->csnei", a, loads)
+        ply_stress = np.einsum("oij,csnej->csneoi", QT, strain)  # (..., orientation, component)
+        stress = {'oxx': ply_stress[..., 0], 'oyy': ply_stress[..., 1], 'txy': ply_stress[..., 2]}
+
+        present = batch[:, None, None, None, :] > 0  # orientations not in the stack are not checked
+        chunk = slice(start, start + len(batch))
+        for j, criterion in enumerate(criteria):
+            if criterion.name == "Panel Buckling":
+                if panel is None:
+                    continue
+                # laminate level, the same RF on both surfaces and for every orientation
+                rfs = laminate_buckling_rf(A, h, membrane, panel['panel_a'], panel['panel_b'])
+                rfs = np.broadcast_to(rfs[:, None, :, :, None], ply_stress.shape[:-1])
+            else:
+                rfs = criterion(stress, allowables)
+            rfs = np.where(present & ~np.isnan(rfs), rfs, np.inf)
+            flat = rfs.reshape(len(batch), -1)
+            arg = flat.argmin(axis=1)
+            rf = flat[np.arange(len(batch)), arg]
+            lower = rf < rf_all[chunk]
+            rf_all[chunk] = np.where(lower, rf, rf_all[chunk])
+            governing[chunk] = np.where(lower, j, governing[chunk])
+            where = np.column_stack(np.unravel_index(arg, rfs.shape[1:]))
+            location[chunk] = np.where(lower[:, None], where, location[chunk])
+    return rf_all, governing, location
@@ -0,0 +1,148 @@
+"""
+Mass engine
+
+Element masses are area x thickness x density for shells and A x L x density for bars,
+computed for the whole model with array operations and summed per property / assembly
+with np.bincount. Lengths are in mm and densities in kg/m^3 (material database units),
+masses come out in kg.
+"""
+import numpy as np
+from tinysizer.sizing.bars import pbarl_section_table
+
+# mm^3 * kg/m^3 -> kg
+MASS_SCALE = 1e-9
+
+
+def shell_mass(area, thickness, density):
+    """Mass of shells (broadcast arrays), area in mm^2, thickness in mm"""
+    return np.asarray(area) * thickness * density * MASS_SCALE
+
+
+def bar_mass(length, section_area, density):
+    """Mass of bars (broadcast arrays), length in mm, section area in mm^2"""
+    return np.asarray(length) * section_area * density * MASS_SCALE
+
+
+def sum_by_key(values, keys):
+    """
+    Sum values per key with one np.bincount
+
+    Returns:
+        tuple: (unique keys, sums)
+    """
+    unique_keys, inverse = np.unique(np.asarray(keys), return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=np.asarray(values, dtype=float), minlength=len(unique_keys))
+
+
+def model_material_name(bdf_model, mid):
+    """Name the material database gives a BDF material ("MAT1 <mid>" / "MAT8 <mid>")"""
+    material = bdf_model.materials.get(mid)
+    return f"{material.type} {mid}" if material is not None else None
+
+
+def model_material_id(bdf_model, name):
+    """MID of a material database name of a BDF material, None for library materials"""
+    material_type, _, mid = str(name).partition(" ")
+    if not mid.isdigit() or int(mid) not in bdf_model.materials:
+        return None
+    return int(mid) if bdf_model.materials[int(mid)].type == material_type else None
+
+
+def property_sizing_values(bdf_model):
+    """
+    Thickness (shells: PSHELL t, PCOMP total laminate), section area (PBARL / PBAR) and
+    material name of every property
+
+    Returns:
+        dict: pid -> {'thickness', 'section_area', 'material'}
+    """
+    sections = pbarl_section_table(bdf_model)
+    values = {}
+    for pid, prop in bdf_model.properties.items():
+        entry = {'thickness': np.nan, 'section_area': np.nan, 'material': None}
+        if prop.type == "PSHELL":
+            entry['thickness'] = prop.t if prop.t is not None else np.nan
+            entry['material'] = model_material_name(bdf_model, prop.mid1)
+        elif prop.type == "PCOMP":
+            entry['thickness'] = float(np.sum(prop.thicknesses))
+            entry['material'] = model_material_name(bdf_model, prop.mids[0])
+        elif prop.type == "PBARL" and pid in sections:
+            entry['section_area'] = sections[pid]['A']
+            entry['material'] = model_material_name(bdf_model, prop.mid)
+        elif prop.type == "PBAR":
+            entry['section_area'] = prop.A
+            entry['material'] = model_material_name(bdf_model, prop.mid)
+        values[pid] = entry
+    return values
+
+
+def property_masses(model_data, material_db, thickness_overrides=None, area_overrides=None,
+                    material_overrides=None):
+    """
+    Mass of every property of the model
+
+    Args:
+        model_data: ModelData (its ElementGeometry gives areas and lengths)
+        material_db: MaterialDatabase for densities
+        thickness_overrides: Optional {pid: shell thickness} (e.g. sized values)
+        area_overrides: Optional {pid: bar section area}
+        material_overrides: Optional {pid: material name}
+
+    Returns:
+        dict: pid -> mass (kg)
+    """
+    geometry = model_data.get_geometry()
+    values = property_sizing_values(model_data.bdf)
+    for pid, thickness in (thickness_overrides or {}).items():
+        values.setdefault(pid, {'section_area': np.nan, 'material': None})['thickness'] = thickness
+    for pid, area in (area_overrides or {}).items():
+        values.setdefault(pid, {'thickness': np.nan, 'material': None})['section_area'] = area
+    for pid, material in (material_overrides or {}).items():
+        values.setdefault(pid, {'thickness': np.nan, 'section_area': np.nan})['material'] = material
+
+    # Per property vectors, one density query for all properties
+    pids = np.array(sorted(values), dtype=int)
+    thickness = np.array([values[pid]['thickness'] for pid in pids], dtype=float)
+    section_area = np.array([values[pid]['section_area'] for pid in pids], dtype=float)
+    density = material_db.get_allowables([values[pid]['material'] for pid in pids], ("density",))["density"]
+
+    shell_rows = np.searchsorted(pids, geometry.shell_pids)
+    bar_rows = np.searchsorted(pids, geometry.bar_pids)
+    masses = np.concatenate([
+        shell_mass(geometry.shell_areas, thickness[shell_rows], density[shell_rows]),
+        bar_mass(geometry.bar_lengths, section_area[bar_rows], density[bar_rows]),
+    ])
+    element_pids = np.concatenate([geometry.shell_pids, geometry.bar_pids])
+
+    valid = np.isfinite(masses)
+    keys, sums = sum_by_key(masses[valid], element_pids[valid])
+    return {int(pid): float(mass) for pid, mass in zip(keys, sums)}
+
+
+def assembly_masses(masses_by_pid, assemblies):
+    """Sum property masses per assembly ({name: [pid, ...]})"""
+    pids = np.array(list(masses_by_pid), dtype=int)
+    masses = np.array(list(masses_by_pid.values()), dtype=float)
+    return {name: float(masses[np.isin(pids, list(property_ids))].sum())
+            for name, property_ids in assemblies.items()}
+
+
+def rank_materials(required, measure, densities):
+    """
+    Rank materials by mass at their required size
+
+    Args:
+        required: {material: required thickness (shells) or section area (bars), NaN if not reached}
+        measure: Element area sum (shells, mm^2) or length sum (bars, mm) of the property
+        densities: {material: density}
+
+    Returns:
+        list: [{'material', 'required', 'mass'}] lightest first, materials that never
+              reach the target RF last with mass inf
+    """
+    ranking = []
+    for material, value in required.items():
+        mass = measure * value * densities.get(material, np.nan) * MASS_SCALE
+        ranking.append({'material': material, 'required': value,
+                        'mass': float(mass) if np.isfinite(mass) else float('inf')})
+    return sorted(ranking, key=lambda entry: entry['mass'])
@@ -0,0 +1,273 @@
+import csv
+import os
+import sqlite3
+import threading
+import numpy as np
+
+# Library shipped with the program, user libraries (.csv or .db/.sqlite) replace it
+DEFAULT_MATERIALS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "materials.csv")
+
+# Descriptive columns
+TEXT_FIELDS = ["name", "spec", "form", "basis", "mat_type", "source"]
+
+# Numeric columns, stresses and moduli in MPa, density in kg/m^3, thickness band in mm
+# isotropic: E, G, nu, Ftu, Fty, Fcy, Fsu  /  orthotropic (MAT8 like): E1, E2, G12, nu12, Xt, Xc, Yt, Yc, S
+NUMERIC_FIELDS = ["t_min", "t_max", "E", "G", "nu", "density",
+                  "Ftu", "Fty", "Fcy", "Fsu",
+                  "E1", "E2", "G12", "nu12", "Xt", "Xc", "Yt", "Yc", "S",
+                  "mid"]
+
+ALL_FIELDS = TEXT_FIELDS + NUMERIC_FIELDS
+
+
+class MaterialDatabase:
+    """
+    Material allowables stored in SQLite, indexed by name / spec / form / thickness band.
+
+    A material name may have several rows, one per thickness band (t_min <= t < t_max,
+    empty bounds mean open ended). Lookups for whole property sets go through
+    get_allowables(), which answers all (name, thickness) pairs with a single query
+    and returns numpy arrays aligned with the request.
+    """
+    def __init__(self, path=None):
+        self.path = None
+        self.version = 0  # bumped on every change so caches keyed on it can invalidate
+        self.lock = threading.RLock()  # sizing jobs query from a worker thread
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self._create_schema(self.connection)
+        self.open(path or DEFAULT_MATERIALS_FILE)
+
+    #########################################
+    # L O A D  &  S A V E
+    #########################################
+    @staticmethod
+    def _create_schema(connection):
+        columns = [f"{field} TEXT" for field in TEXT_FIELDS] + [f"{field} REAL" for field in NUMERIC_FIELDS]
+        connection.execute(f"CREATE TABLE IF NOT EXISTS materials (id INTEGER PRIMARY KEY, {', '.join(columns)})")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_materials_name ON materials (name, t_min, t_max)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_materials_spec ON materials (spec)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_materials_form ON materials (form)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_materials_band ON materials (t_min, t_max)")
+        connection.commit()
+
+    def open(self, path):
+        """Replace the library with the content of a .csv or SQLite (.db/.sqlite) file"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Material library not found: {path}")
+
+        with self.lock:
+            self.connection.execute("DELETE FROM materials")
+        if path.lower().endswith((".db", ".sqlite", ".sqlite3")):
+            source = sqlite3.connect(path)
+            try:
+                self._create_schema(source)
+                rows = source.execute(f"SELECT {', '.join(ALL_FIELDS)} FROM materials").fetchall()
+            finally:
+                source.close()
+            self._insert_rows(rows)
+        else:
+            self._insert_rows(self._read_csv(path), default_source="library")
+
+        self.path = path
+        self.version += 1
+        print(f"Loaded {self.count()} material rows from {path}")
+
+    def load_csv(self, path, replace=False):
+        """Append (or replace with) the rows of a CSV file whose header uses ALL_FIELDS names"""
+        if replace:
+            with self.lock:
+                self.connection.execute("DELETE FROM materials")
+
+        rows = self._read_csv(path)
+        self._insert_rows(rows, default_source="library")
+        self.version += 1
+        return len(rows)
+
+    def _read_csv(self, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            return [tuple(self._parse_value(field, record.get(field)) for field in ALL_FIELDS) for record in reader]
+
+    def save(self, path):
+        """Write the current library to a SQLite file (loadable with open())"""
+        target = sqlite3.connect(path)
+        try:
+            with self.lock:
+                self.connection.backup(target)
+        finally:
+            target.close()
+
+    @staticmethod
+    def _parse_value(field, value):
+        if value is None or str(value).strip() == "":
+            return None
+        if field in TEXT_FIELDS:
+            return str(value).strip()
+        return float(value)
+
+    def _insert_rows(self, rows, default_source=None):
+        if default_source is not None:
+            source_idx = ALL_FIELDS.index("source")
+            rows = [row[:source_idx] + (row[source_idx] or default_source,) + row[source_idx + 1:] for row in rows]
+
+        placeholders = ", ".join("?" for _ in ALL_FIELDS)
+        with self.lock:
+            self.connection.executemany(f"INSERT INTO materials ({', '.join(ALL_FIELDS)}) VALUES ({placeholders})", rows)
+            self.connection.commit()
+
+    def add_material(self, **record):
+        """Add one row, keys are ALL_FIELDS names"""
+        unknown = set(record) - set(ALL_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown material fields: {sorted(unknown)}")
+        self._insert_rows([tuple(record.get(field) for field in ALL_FIELDS)])
+        self.version += 1
+
+    #########################################
+    # B D F  I M P O R T
+    #########################################
+    def import_bdf_materials(self, bdf_model, density_scale=1e9):
+        """
+        Lift MAT1 and MAT8 cards of a pyNastran BDF into the library
+
+        Args:
+            bdf_model: pyNastran BDF object
+            density_scale: Factor from model density units to kg/m^3 (default kg/mm^3 -> kg/m^3)
+
+        Returns:
+            list: Names of the imported materials ("MAT1 <mid>", "MAT8 <mid>")
+        """
+        if bdf_model is None or not getattr(bdf_model, "materials", None):
+            return []
+
+        def strength(value):
+            # Nastran leaves stress limits blank (0.0) when they are not used
+            return float(value) if value else None
+
+        # Re-importing a deck replaces its previous rows instead of duplicating them
+        with self.lock:
+            self.connection.execute("DELETE FROM materials WHERE source = 'bdf'")
+
+        rows, names = [], []
+        for mid, mat in sorted(bdf_model.materials.items()):
+            record = dict.fromkeys(ALL_FIELDS)
+            record.update({"spec": "BDF", "form": "model", "basis": "model", "source": "bdf", "mid": mid})
+            rho = getattr(mat, "rho", None)
+            record["density"] = rho * density_scale if rho else None
+
+            if mat.type == "MAT1":
+                record.update({
+                    "name": f"MAT1 {mid}", "mat_type": "ISO",
+                    "E": mat.e, "G": mat.g, "nu": mat.nu,
+                    "Ftu": strength(mat.St), "Fty": strength(mat.St),
+                    "Fcy": strength(mat.Sc), "Fsu": strength(mat.Ss),
+                })
+            elif mat.type == "MAT8":
+                record.update({
+                    "name": f"MAT8 {mid}", "mat_type": "ORTHO",
+                    "E1": mat.e11, "E2": mat.e22, "G12": mat.g12, "nu12": mat.nu12,
+                    "Xt": strength(mat.Xt), "Xc": strength(mat.Xc),
+                    "Yt": strength(mat.Yt), "Yc": strength(mat.Yc), "S": strength(mat.S),
+                    # fibre direction values stand in for the isotropic fields
+                    "E": mat.e11, "G": mat.g12, "nu": mat.nu12,
+                    "Ftu": strength(mat.Xt), "Fty": strength(mat.Xt),
+                    "Fcy": strength(mat.Xc), "Fsu": strength(mat.S),
+                })
+            else:
+                continue
+
+            rows.append(tuple(record[field] for field in ALL_FIELDS))
+            names.append(record["name"])
+
+        self._insert_rows(rows)
+        self.version += 1
+        print(f"Imported {len(names)} materials from BDF into the material database")
+        return names
+
+    #########################################
+    # Q U E R I E S
+    #########################################
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM materials").fetchone()[0]
+
+    def names(self, spec=None, form=None, source=None):
+        """Distinct material names, optionally filtered by spec, form or source"""
+        query = "SELECT DISTINCT name FROM materials WHERE 1=1"
+        params = []
+        for field, value in (("spec", spec), ("form", form), ("source", source)):
+            if value is not None:
+                query += f" AND {field} = ?"
+                params.append(value)
+        query += " ORDER BY source DESC, id"
+        with self.lock:
+            return [row[0] for row in self.connection.execute(query, params)]
+
+    def __contains__(self, name):
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM materials WHERE name = ? LIMIT 1", (name,)).fetchone() is not None
+
+    def get(self, name, thickness=None):
+        """Row of a material as a dict (band matching thickness if given), None if not found"""
+        values = self.get_allowables([name], ALL_FIELDS, None if thickness is None else [thickness])
+        if np.isnan(values["found"][0]):
+            return None
+        return {field: values[field][0] for field in ALL_FIELDS}
+
+    def get_allowables(self, names, fields=("Ftu", "Fty", "Fcy", "Fsu", "density"), thicknesses=None):
+        """
+        Fetch allowables for many (name, thickness) pairs in one query
+
+        Args:
+            names: Sequence of material names (one per property / element)
+            fields: Fields to return
+            thicknesses: Optional sequence of thicknesses used to pick the thickness band
+
+        Returns:
+            dict: {field: array aligned with names}, numeric fields are float arrays with
+                  NaN where missing; 'found' is 1.0 where a row matched, NaN otherwise
+        """
+        names = [str(n) for n in names]
+        if thicknesses is None:
+            thicknesses = [None] * len(names)
+        thicknesses = [None if t is None else float(t) for t in thicknesses]
+
+        with self.lock:
+            rows = self._query_allowables(names, fields, thicknesses)
+
+        result = {}
+        for field in fields:
+            result[field] = (np.full(len(names), None, dtype=object) if field in TEXT_FIELDS
+                             else np.full(len(names), np.nan))
+        result["found"] = np.full(len(names), np.nan)
+
+        seen = set()
+        for row in rows:
+            idx = row[0]
+            if idx in seen:
+                continue
+            seen.add(idx)
+            result["found"][idx] = 1.0
+            for field, value in zip(fields, row[1:]):
+                if value is not None:
+                    result[field][idx] = value
+        return result
+
+    def _query_allowables(self, names, fields, thicknesses):
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (idx INTEGER PRIMARY KEY, name TEXT, t REAL)")
+        cursor.execute("DELETE FROM lookup")
+        cursor.executemany("INSERT INTO lookup (idx, name, t) VALUES (?, ?, ?)",
+                           list(zip(range(len(names)), names, thicknesses)))
+
+        selected = ", ".join(f"m.{field}" for field in fields)
+        # Closest band wins: rows with bounds are preferred over open ended ones
+        rows = cursor.execute(f"""
+            SELECT l.idx, {selected}
+            FROM lookup l
+            JOIN materials m ON m.name = l.name
+             AND (l.t IS NULL OR ((m.t_min IS NULL OR m.t_min <= l.t) AND (m.t_max IS NULL OR l.t < m.t_max)))
+            ORDER BY l.idx, (m.t_min IS NULL) + (m.t_max IS NULL), m.id
+        """).fetchall()
+        cursor.execute("DELETE FROM lookup")
+        return rows
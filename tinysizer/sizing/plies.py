@@ -0,0 +1,138 @@
+"""
+Ply level failure of composite (PCOMP) stress output
+
+Every (element, ply) row of the OP2 composite stress tables gets the strengths of its own
+ply material (MAT8 Xt, Xc, Yt, Yc, S; MAT1 plies fall back to St / Sc / Ss) through flat
+lookup tables built once per deck: PCOMP -> ply offset, ply -> MID, MID -> strengths.
+The registered criteria broadcast over these per-row allowables, so all plies and
+subcases are one pass per criterion. Failure indices are strength ratios (FI = 1 / RF)
+and the critical ply of each element is a reduceat over the contiguous rows of the element.
+"""
+import numpy as np
+from tinysizer.sizing.criteria import FAILURE_CRITERIA
+
+# Pseudo material name: each ply checked with the MAT8 / MAT1 of the deck
+PLY_MATERIALS = "Model plies (MAT8)"
+
+PLY_CRITERIA = ("Tsai-Wu", "Tsai-Hill", "Hoffman", "Maximum Stress")
+
+# model density (kg/mm^3) -> kg/m^3, as MaterialDatabase.import_bdf_materials
+DENSITY_SCALE = 1e9
+
+
+def ply_layup_table(bdf_model):
+    """
+    Flat ply arrays of all PCOMPs (symmetric laminates expanded like the OP2 layers)
+
+    Returns:
+        dict: 'pids' (sorted), 'offsets' and 'counts' per PCOMP into the flat
+              'mids', 'thetas', 'thicknesses' ply arrays
+    """
+    pids = sorted(pid for pid, prop in bdf_model.properties.items() if prop.type == "PCOMP")
+    mids, thetas, thicknesses, counts = [], [], [], []
+    for pid in pids:
+        prop = bdf_model.properties[pid]
+        mids.append(prop.get_material_ids())
+        thetas.append(prop.get_thetas())
+        thicknesses.append(prop.get_thicknesses())
+        counts.append(len(mids[-1]))
+    counts = np.array(counts, dtype=int)
+    return {
+        'pids': np.array(pids, dtype=int),
+        'counts': counts,
+        'offsets': np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(int),
+        'mids': np.concatenate(mids).astype(int) if mids else np.array([], dtype=int),
+        'thetas': np.concatenate(thetas) if thetas else np.array([]),
+        'thicknesses': np.concatenate(thicknesses) if thicknesses else np.array([]),
+    }
+
+
+def ply_material_table(bdf_model, mids):
+    """Allowable fields (criteria names) of the given material IDs as arrays"""
+    fields = ("Xt", "Xc", "Yt", "Yc", "S", "E1", "E2", "G12", "nu12",
+              "Ftu", "Fcy", "Fsu", "E", "G", "nu", "density")
+    table = {field: np.full(len(mids), np.nan) for field in fields}
+
+    def value(number):
+        # Nastran leaves unused stress limits blank (0.0)
+        return float(number) if number else np.nan
+
+    for k, mid in enumerate(mids):
+        mat = bdf_model.materials.get(int(mid))
+        if mat is None:
+            continue
+        table['density'][k] = value(getattr(mat, 'rho', None)) * DENSITY_SCALE
+        if mat.type == "MAT8":
+            for field, number in (("Xt", mat.Xt), ("Xc", mat.Xc), ("Yt", mat.Yt), ("Yc", mat.Yc), ("S", mat.S),
+                                  ("E1", mat.e11), ("E2", mat.e22), ("G12", mat.g12), ("nu12", mat.nu12)):
+                table[field][k] = value(number)
+        elif mat.type == "MAT1":
+            for field, number in (("Ftu", mat.St), ("Fcy", mat.Sc), ("Fsu", mat.Ss),
+                                  ("E", mat.e), ("G", mat.g), ("nu", mat.nu)):
+                table[field][k] = value(number)
+    return table
+
+
+def ply_row_allowables(bdf_model, layup, element_pids, layers):
+    """
+    Allowables of every (element, ply) row
+
+    Args:
+        bdf_model: pyNastran BDF
+        layup: ply_layup_table output
+        element_pids: PCOMP ID of each row
+        layers: OP2 layer number of each row (1 based)
+
+    Returns:
+        dict: allowable field -> array per row, plus 'mid' and 'theta' per row
+    """
+    prop_rows = np.searchsorted(layup['pids'], element_pids)
+    ply_rows = layup['offsets'][prop_rows] + np.asarray(layers, dtype=int) - 1
+    row_mids = layup['mids'][ply_rows]
+
+    unique_mids, inverse = np.unique(row_mids, return_inverse=True)
+    table = ply_material_table(bdf_model, unique_mids)
+    allowables = {field: values[inverse] for field, values in table.items()}
+    allowables['mid'] = row_mids
+    allowables['theta'] = layup['thetas'][ply_rows]
+    return allowables
+
+
+def ply_failure_indices(stress, allowables, criteria=PLY_CRITERIA):
+    """
+    Failure index (strength ratio, FI = 1 / RF) of every ply row per criterion
+
+    Args:
+        stress: 'oxx', 'oyy', 'txy' ply stresses o11, o22, t12 (n_subcase, n_rows)
+        allowables: ply_row_allowables output
+        criteria: Registered criterion names
+
+    Returns:
+        dict: criterion -> FI array (n_subcase, n_rows)
+    """
+    indices = {}
+    with np.errstate(divide="ignore"):
+        for name in criteria:
+            indices[name] = 1.0 / FAILURE_CRITERIA[name](stress, allowables)
+    return indices
+
+
+def critical_ply(values, element_ids, layers):
+    """
+    Largest value of each element over its plies (last axis holds the ply rows)
+
+    Returns:
+        tuple: (unique element IDs, max value (..., n_elem), its layer (..., n_elem))
+    """
+    element_ids = np.asarray(element_ids)
+    order = np.argsort(element_ids, kind="stable")
+    values = np.nan_to_num(np.asarray(values, dtype=float)[..., order], nan=-np.inf)
+    sorted_ids = element_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    group = np.cumsum(np.r_[False, sorted_ids[1:] != sorted_ids[:-1]])
+
+    worst = np.maximum.reduceat(values, starts, axis=-1)
+    # first row of each element reaching the maximum
+    positions = np.where(values == worst[..., group], np.arange(len(sorted_ids)), len(sorted_ids))
+    first = np.minimum.reduceat(positions, starts, axis=-1)
+    return sorted_ids[starts], worst, np.asarray(layers)[order][first]
@@ -0,0 +1,52 @@
+"""
+Load case dominance pruning
+
+Before a sizing run the subcases of a property are ranked per stress row: a subcase is
+kept if it gives one of the PRUNE_KEEP_PER_ROW lowest RFs of any row (checked at both
+ends of the thickness range, so interaction criteria whose ranking moves with the stress
+level are covered) or if it is an extreme of any stress component. Every other subcase
+is dominated: at each row some kept subcase is at least as critical. The sizing then runs
+on the kept set and is verified against all subcases at the final thickness.
+"""
+import numpy as np
+
+# Smaller subcase sets are evaluated in full
+PRUNE_MIN_SUBCASES = 20
+
+# Lowest RF subcases kept per stress row
+PRUNE_KEEP_PER_ROW = 2
+
+
+def governing_subcases(rfs, keep=PRUNE_KEEP_PER_ROW):
+    """
+    Subcases among the keep lowest RFs of any row
+
+    Args:
+        rfs: (n_subcase, n_rows) RF array, NaN = not evaluated
+
+    Returns:
+        np.ndarray: Boolean mask over subcases
+    """
+    rfs = np.where(np.isnan(rfs), np.inf, rfs)
+    n_subcase = rfs.shape[0]
+    mask = np.zeros(n_subcase, dtype=bool)
+    if n_subcase <= keep:
+        mask[:] = True
+        return mask
+    lowest = np.argpartition(rfs, keep - 1, axis=0)[:keep]  # (keep, n_rows)
+    finite = np.isfinite(np.take_along_axis(rfs, lowest, axis=0))
+    mask[np.unique(lowest[finite])] = True
+    return mask
+
+
+def envelope_subcases(stress, subcase_axis=0):
+    """Subcases reaching the maximum or minimum of any stress component in any row"""
+    mask = None
+    for key in ('oxx', 'oyy', 'txy'):
+        values = np.moveaxis(np.asarray(stress[key]), subcase_axis, 0)
+        values = values.reshape(values.shape[0], -1)
+        if mask is None:
+            mask = np.zeros(values.shape[0], dtype=bool)
+        mask[np.unique(values.argmax(axis=0))] = True
+        mask[np.unique(values.argmin(axis=0))] = True
+    return mask
@@ -0,0 +1,48 @@
+"""
+Shell stress recovery from force resultants
+
+FORCE_SHELL output gives membrane forces (Nx, Ny, Nxy) and moments (Mx, My, Mxy) per unit
+length. For a homogeneous shell of thickness t the fibre stresses are
+
+    sigma(z) = N / t + 12 M z / t^3,   z = -t/2 (Z1) and +t/2 (Z2)
+
+so membrane stresses go with 1/t and bending stresses with 1/t^2. This is exact for any
+thickness as long as the load paths do not change, unlike scaling the OP2 stresses.
+"""
+import numpy as np
+
+# Fibre positions as a fraction of the thickness (Z1 bottom, Z2 top)
+FIBRES = np.array([-0.5, 0.5])
+
+# Thickness values evaluated per batch; batches hold n_t x 2 x n_subcase x n_elem values
+STRESS_BATCH_VALUES = 4_000_000
+
+
+def fibre_stresses(membrane, bending, thickness):
+    """
+    Bottom / top fibre stresses for any number of thicknesses at once
+
+    Args:
+        membrane: (n_subcase, n_elem, 3) Nx, Ny, Nxy force per length
+        bending: (n_subcase, n_elem, 3) Mx, My, Mxy moment per length
+        thickness: Scalar or (n_t,) array of shell thicknesses
+
+    Returns:
+        dict: 'oxx', 'oyy', 'txy' arrays (n_t, 2, n_subcase, n_elem) (fibres Z1, Z2) and the
+              mid-plane 'membrane_oxx', 'membrane_oyy', 'membrane_txy' (n_t, 1, n_subcase, n_elem)
+    """
+    t = np.atleast_1d(np.asarray(thickness, dtype=float))[:, None, None, None]
+    z = FIBRES[None, :, None, None]
+    membrane_factor = 1.0 / t   # (n_t, 1, 1, 1)
+    bending_factor = 12.0 * z / t**2  # 12 M (z/t) t / t^3, (n_t, 2, 1, 1)
+    stress = {}
+    for k, key in enumerate(('oxx', 'oyy', 'txy')):
+        stress[f'membrane_{key}'] = membrane[None, None, :, :, k] * membrane_factor
+        stress[key] = stress[f'membrane_{key}'] + bending[None, None, :, :, k] * bending_factor
+    return stress
+
+
+def thickness_batches(thickness_values, subcase_count, element_count):
+    """Slices of thickness_values keeping each fibre_stresses call within STRESS_BATCH_VALUES"""
+    size = max(1, STRESS_BATCH_VALUES // max(1, 2 * subcase_count * element_count))
+    return [slice(start, start + size) for start in range(0, len(thickness_values), size)]
@@ -1,10 +1,18 @@
 from tinysizer.visualization.plotter_vista import PyVistaMeshPlotter
 from tinysizer.sizing.calculations import Calculator
+from tinysizer.sizing.sizing_worker import SizingQueue
+from tinysizer.sizing.materials import MaterialDatabase
+from tinysizer.sizing.plies import PLY_MATERIALS
+from tinysizer.sizing.bars import base_sizing_values, sizing_dimensions
+from tinysizer.sizing.compression import COMPRESS_MIN_SUBCASES, COMPRESSION_TOLERANCES
+from tinysizer.sizing.mass import assembly_masses, model_material_id, property_masses
+from tinysizer.file.bdf_patcher import BdfPropertyPatcher
 from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QIcon, QAction, QColor
 from PySide6.QtWidgets import (QComboBox, QTableWidget, QTableWidgetItem, QFormLayout, QGroupBox,
                                 QWidget,QVBoxLayout, QPushButton, QDialog, QSpacerItem, QHeaderView,
-                                QHBoxLayout,QSizePolicy, QMenu,QFrame,QSplitter, QDialogButtonBox, QCheckBox,QMainWindow,QLabel)
+                                QHBoxLayout,QSizePolicy, QMenu,QFrame,QSplitter, QDialogButtonBox, QCheckBox,QMainWindow,QLabel,
+                                QProgressBar, QMessageBox, QScrollArea, QFileDialog, QLineEdit)
 
 class SizingTab(QWidget):               
     def __init__(self, parent=None, tabs=None):
@@ -15,6 +23,19 @@ class SizingTab(QWidget):
         self.assembly_selections = {}  # Format: {assembly_name: {'materials': [...], 'failures': [...]}}
         self.current_assembly_type = None
         self.sizing_pyv_plotter = None
+        self.calculator = None
+        self.sizing_results = {}  # Format: {property_id: results list of the last finished sizing}
+        self.material_db = MaterialDatabase()
+
+        # Background sizing jobs, results come back through signals
+        self.sizing_queue = SizingQueue(self)
+        self.sizing_queue.job_started.connect(self.on_sizing_job_started)
+        self.sizing_queue.job_progress.connect(self.on_sizing_job_progress)
+        self.sizing_queue.property_done.connect(self.on_sizing_property_done)
+        self.sizing_queue.job_finished.connect(self.on_sizing_job_finished)
+        self.sizing_queue.job_failed.connect(self.on_sizing_job_failed)
+        self.sizing_queue.job_cancelled.connect(self.on_sizing_job_cancelled)
+        self.sizing_queue.queue_changed.connect(self.on_sizing_queue_changed)
 
         load_stylesheet = lambda path: open(path, "r").read() #why ?
         self.setStyleSheet(load_stylesheet("tinysizer/gui/styles/dark_theme.qss"))
@@ -84,6 +105,14 @@ class SizingTab(QWidget):
         """Update the sizing tab with loaded model data"""
         if not model_data:
             return
+
+        # A new model invalidates the running/queued jobs and the old results
+        self.stop_sizing_jobs()
+        self.calculator = None
+        self.sizing_results = {}
+
+        # Materials of the deck (MAT1/MAT8) become selectable next to the library ones
+        self.material_db.import_bdf_materials(model_data.bdf)
         
         def toggle_nastran():
                 if self.nastran_switch.isChecked(): self.nastran_switch.setText("ON")
@@ -145,6 +174,17 @@ class SizingTab(QWidget):
             self.failures_btn.clicked.connect(self.open_failure_selection)
             left_layout.addRow("Failures:", self.failures_btn)
             
+            # Low rank compression of the stresses of large subcase sets
+            self.compression_combo = QComboBox()
+            self.compression_combo.addItems(["Off" if tolerance is None else f"{tolerance:g}"
+                                             for tolerance in COMPRESSION_TOLERANCES])
+            self.compression_combo.setToolTip(
+                f"Relative error of the SVD compression of the stresses, used by the stress sweep "
+                f"(PSHELL without FORCE_SHELL output, PCOMP plies) of {COMPRESS_MIN_SUBCASES} or more "
+                f"subcases. Resultant, laminate and bar sizing always use exact forces.")
+            self.compression_combo.currentIndexChanged.connect(self.apply_compression_tolerance)
+            left_layout.addRow("Compression:", self.compression_combo)
+            
             # 5. Toggle switches section
             # Update Nastran toggle
             nastran_widget = QWidget()
@@ -199,8 +239,47 @@ class SizingTab(QWidget):
             self.analyze_size_btn.clicked.connect(self.run_sizing)
             self.analyze_size_btn.setObjectName("sizeButton")
             
+            self.queue_assembly_btn = QPushButton("Queue Assembly")
+            self.queue_assembly_btn.setToolTip("Queue sizing of every property in the selected assembly")
+            self.queue_assembly_btn.clicked.connect(lambda: self.queue_assembly_sizing())
+            
+            self.fsd_btn = QPushButton("FSD Assembly")
+            self.fsd_btn.setToolTip("Resize all shell properties of the selected assembly together "
+                                    "toward the target RF (fully stressed design, thickness Min/Max are the gauges)")
+            self.fsd_btn.clicked.connect(self.queue_assembly_fsd)
+            
             button_wrapper_layout.addWidget(self.analyze_size_btn)
+            button_wrapper_layout.addWidget(self.queue_assembly_btn)
+            button_wrapper_layout.addWidget(self.fsd_btn)
             left_layout.addRow(button_wrapper)
+
+            # 7. Job progress - sizing runs in the background so the window stays usable
+            progress_widget = QWidget()
+            progress_layout = QHBoxLayout(progress_widget)
+            progress_layout.setContentsMargins(0, 0, 0, 0)
+
+            self.sizing_progress = QProgressBar()
+            self.sizing_progress.setRange(0, 100)
+            self.sizing_progress.setValue(0)
+            self.sizing_progress.setFormat("Idle")
+            self.sizing_progress.setTextVisible(True)
+
+            self.cancel_sizing_btn = QPushButton("Cancel")
+            self.cancel_sizing_btn.setEnabled(False)
+            self.cancel_sizing_btn.clicked.connect(self.sizing_queue.cancel_all)
+
+            progress_layout.addWidget(self.sizing_progress, 1)
+            progress_layout.addWidget(self.cancel_sizing_btn)
+            left_layout.addRow(progress_widget)
+
+            self.queue_label = QLabel("Queue: empty")
+            self.queue_label.setStyleSheet("color: gray;")
+            left_layout.addRow(self.queue_label)
+
+            self.mass_label = QLabel("Mass: -")
+            self.mass_label.setStyleSheet("color: gray;")
+            self.mass_label.setToolTip("Mass of the sized assembly with the deck and the sized properties")
+            left_layout.addRow(self.mass_label)
             
             # Add spacer to push everything to the top
             left_layout.addItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
@@ -351,7 +430,7 @@ class SizingTab(QWidget):
         if self.current_assembly_type == "web":
             # Web assemblies - typically shell elements, membrane/bending failures
             return ["Von Mises", "Maximum Principal Stress", "Maximum Strain", 
-                   "Tsai-Wu", "Tsai-Hill", "Maximum Stress"]
+                   "Tsai-Wu", "Tsai-Hill", "Maximum Stress", "Panel Buckling"]
         elif self.current_assembly_type == "cap":
             # Cap assemblies - typically beam/bar elements, axial/bending failures
             return ["Von Mises", "Maximum Principal Stress", "Maximum Strain",
@@ -360,7 +439,7 @@ class SizingTab(QWidget):
             # Other/mixed assemblies - show all options
             return ["Von Mises", "Maximum Principal Stress", "Tsai-Wu", 
                    "Tsai-Hill", "Maximum Strain", "Maximum Stress", "Hoffman",
-                   "Euler Buckling", "Johnson Column"]
+                   "Euler Buckling", "Johnson Column", "Panel Buckling"]
     
     def update_button_labels(self):
         """Update button labels to show selections while keeping them clickable"""
@@ -409,6 +488,7 @@ class SizingTab(QWidget):
         try:
             property_id = int(pid)
             self.sizing_pyv_plotter.plot_sizing_tab(self.parent.model_data, property_id)
+            self.show_results_for_property(property_id)
         except ValueError:
             print(f"Invalid property ID: {pid}") #seems harmless as its triggered after assembly deletion -ymn
             self.sizing_pyv_plotter.plotter.clear()
@@ -429,24 +509,40 @@ class SizingTab(QWidget):
         dialog.setMinimumSize(300, 400)
         
         layout = QVBoxLayout(dialog)
-        
-        # Create a list of materials with checkboxes
-        materials = ["Aluminum 6061-T6", "Steel AISI 4130", "Titanium Ti-6Al-4V", 
-                    "Composite Carbon/Epoxy", "Aluminum 7075-T6", "Steel 4340"]
+
+        # Filter box, the library plus the deck materials can be a long list
+        filter_input = QLineEdit()
+        filter_input.setPlaceholderText("Filter materials...")
+        layout.addWidget(filter_input)
         
         material_group = QGroupBox("Available Materials")
         material_layout = QVBoxLayout(material_group)
         
         material_checkboxes = []
-        for material in materials:
+        # Laminates can also be checked ply by ply with the MAT8 cards of the deck
+        for material in [PLY_MATERIALS] + self.material_db.names():
             checkbox = QCheckBox(material)
             # Pre-check if material was previously selected
             if self.materials and material in self.materials:
                 checkbox.setChecked(True)
             material_layout.addWidget(checkbox)
             material_checkboxes.append(checkbox)
-        
-        layout.addWidget(material_group)
+        material_layout.addStretch()
+
+        def apply_filter(text):
+            for checkbox in material_checkboxes:
+                checkbox.setVisible(text.lower() in checkbox.text().lower())
+        filter_input.textChanged.connect(apply_filter)
+
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setWidget(material_group)
+        layout.addWidget(scroll_area)
+
+        # Load another allowables library (.csv or SQLite), reopens the dialog with it
+        library_btn = QPushButton("Load Library...")
+        library_btn.clicked.connect(lambda: self.load_material_library(dialog))
+        layout.addWidget(library_btn)
         
         # Add OK and Cancel buttons
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -456,6 +552,24 @@ class SizingTab(QWidget):
         
         dialog.exec_()
 
+    def load_material_library(self, dialog=None):
+        """Replace the material library with a user file, deck materials are imported again"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Select Material Library", "",
+                                                  "Material libraries (*.csv *.db *.sqlite);;All files (*.*)")
+        if not filename:
+            return
+        self.stop_sizing_jobs()
+        try:
+            self.material_db.open(filename)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not load material library:\n{e}")
+            return
+        if self.parent and self.parent.model_data:
+            self.material_db.import_bdf_materials(self.parent.model_data.bdf)
+        if dialog is not None:
+            dialog.reject()
+            self.open_material_selection()
+
     def save_material_selection(self, checkboxes, dialog):
         """Save the selected materials and update display"""
         assembly_name = self.assembly_combo.currentText()
@@ -532,79 +646,331 @@ class SizingTab(QWidget):
         # Show the menu below the button
         menu.exec_(self.analyze_size_btn.mapToGlobal(QPoint(0, self.analyze_size_btn.height())))
 
+    def stop_sizing_jobs(self):
+        """Cancel the sizing jobs and wait for the worker before the model or material library changes"""
+        if not self.sizing_queue.cancel_all_and_wait():
+            print("Sizing worker still busy, its results are dropped")
+
+    def get_calculator(self):
+        """Calculator shared by all sizing jobs of the loaded model"""
+        if self.calculator is None:
+            self.calculator = Calculator(parent=self.parent, verbose=False, material_db=self.material_db)
+            self.apply_compression_tolerance()
+        return self.calculator
+
+    def apply_compression_tolerance(self, *_):
+        """Hand the selected compression tolerance to the calculator"""
+        if self.calculator is not None and hasattr(self, 'compression_combo'):
+            tolerance = COMPRESSION_TOLERANCES[max(self.compression_combo.currentIndex(), 0)]
+            self.calculator.compression_tolerance = tolerance
+            print(f"Stress compression: {'off' if tolerance is None else f'relative error {tolerance:g}'}")
+
+    def read_thickness_range(self):
+        """Read (min, max, step) thickness from the table, defaults if cells are empty"""
+        try:
+            min_thickness = float(self.sizing_table.item(0, 1).text() or "1.0")  # Min
+            max_thickness = float(self.sizing_table.item(0, 2).text() or "10.0")  # Max
+            step_thickness = float(self.sizing_table.item(0, 3).text() or "0.5")  # Step
+            return (min_thickness, max_thickness, step_thickness)
+        except (ValueError, AttributeError):
+            # Set default values if table cells are empty
+            print("Using default thickness range: 1.0 to 10.0 mm, step 0.5 mm")
+            return (1.0, 10.0, 0.5)
+
+    def read_width_range(self):
+        """Read (min, max, step) width from the table, None (keep the card width) if empty"""
+        if self.current_assembly_type == "web":
+            return None
+        try:
+            cells = [self.sizing_table.item(1, col).text() for col in range(1, 4)]
+            if not any(cells):
+                return None
+            return tuple(float(cell) for cell in cells)
+        except (ValueError, AttributeError):
+            print("Invalid width range, the PBARL width is kept")
+            return None
+
+    def validate_sizing_inputs(self):
+        """Check materials and failures are selected, warn the user otherwise"""
+        if not self.materials:
+            QMessageBox.warning(self, "Warning", "Please select at least one material!")
+            return False
+        
+        if not self.failures:
+            QMessageBox.warning(self, "Warning", "Please select at least one failure criterion!")
+            return False
+        return True
+
+    def submit_sizing_job(self, property_ids, mode="sweep"):
+        """Queue a background sizing job for the given properties of the current assembly"""
+        job = self.sizing_queue.create_job(
+            calculator=self.get_calculator(),
+            assembly_name=self.assembly_combo.currentText(),
+            property_ids=property_ids,
+            materials=self.materials,
+            failure_types=self.failures,
+            thickness_range=self.read_thickness_range(),
+            assembly_type=self.current_assembly_type,
+            width_range=self.read_width_range(),
+            mode=mode
+        )
+        self.sizing_queue.submit(job)
+        print(f"Queued sizing job {job.job_id}: {job.describe()}")
+        return job.job_id
+
     def run_sizing(self):
-        """Enhanced run_analysis function"""
+        """Queue sizing of the selected property, the result table is filled when the job finishes"""
         print("Running analysis...")
         print(f"Assembly type: {self.current_assembly_type}")
         print(f"Selected materials: {self.materials or []}")
         print(f"Selected failures: {self.failures or []}")
         
         # Validation checks
-        if not self.materials:
-            from PySide6.QtWidgets import QMessageBox
-            QMessageBox.warning(self, "Warning", "Please select at least one material!")
-            return
-        
-        if not self.failures:
-            from PySide6.QtWidgets import QMessageBox
-            QMessageBox.warning(self, "Warning", "Please select at least one failure criterion!")
+        if not self.validate_sizing_inputs():
             return
         
         # Get current property ID
         current_property = self.property_combo.currentText()
         if not current_property:
-            from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "Warning", "Please select a property!")
             return
         
         try:
             property_id = int(current_property)
         except ValueError:
-            from PySide6.QtWidgets import QMessageBox
             QMessageBox.critical(self, "Error", f"Invalid property ID: {current_property}")
             return
         
-        # Get thickness range from table
-        try:
-            min_thickness = float(self.sizing_table.item(0, 1).text() or "1.0")  # Min
-            max_thickness = float(self.sizing_table.item(0, 2).text() or "10.0")  # Max
-            step_thickness = float(self.sizing_table.item(0, 3).text() or "0.5")  # Step
-            thickness_range = (min_thickness, max_thickness, step_thickness)
-        except (ValueError, AttributeError):
-            # Set default values if table cells are empty
-            thickness_range = (1.0, 10.0, 0.5)
-            print("Using default thickness range: 1.0 to 10.0 mm, step 0.5 mm")
+        self.submit_sizing_job([property_id])
+
+    def queue_assembly_sizing(self, mode="sweep"):
+        """Queue sizing of every property in the selected assembly as one job"""
+        assembly_name = self.assembly_combo.currentText()
+        if not assembly_name or not self.parent or assembly_name not in self.parent.assemblies:
+            QMessageBox.warning(self, "Warning", "Please select an assembly!")
+            return
         
-        # Create analysis instance
-        self.calculator = Calculator(parent=self.parent)
+        if not self.validate_sizing_inputs():
+            return
         
-        # Run the sizing analysis
-        results = self.calculator.rf_materialStrength(
-            materials=self.materials,
-            failure_types=self.failures,
-            property_id=property_id,
-            thickness_range=thickness_range,
-            assembly_type=self.current_assembly_type
-        )
+        property_ids = list(self.parent.assemblies[assembly_name])
+        if not property_ids:
+            QMessageBox.warning(self, "Warning", f"Assembly '{assembly_name}' has no properties!")
+            return
         
+        self.submit_sizing_job(property_ids, mode=mode)
+
+    def queue_assembly_fsd(self):
+        """Resize every shell property of the selected assembly together (fully stressed design)"""
+        self.queue_assembly_sizing(mode="fsd")
+
+    #########################################
+    # S I Z I N G  J O B  S L O T S
+    #########################################
+    def on_sizing_job_started(self, job_id, description):
+        if hasattr(self, 'sizing_progress'):
+            self.sizing_progress.setValue(0)
+            self.sizing_progress.setFormat(f"{description}: %p%")
+            self.cancel_sizing_btn.setEnabled(True)
+
+    def on_sizing_job_progress(self, job_id, prop_idx, prop_count, step, step_count):
+        if not hasattr(self, 'sizing_progress'):
+            return
+        # Each property gets an equal share of the bar, thickness steps fill it
+        fraction = (prop_idx + (step / step_count if step_count else 1.0)) / max(prop_count, 1)
+        self.sizing_progress.setValue(int(round(100 * fraction)))
+
+    def on_sizing_property_done(self, job_id, property_id, results):
+        self.sizing_results[property_id] = results
+        self.parent.model_data.set_sized_thickness(property_id, self.get_sized_thickness(property_id, results))
+        if getattr(self.parent, 'result_type_combo', None) is not None and self.parent.result_type_combo.currentText() == "SIZED":
+            self.parent.display_result()  # live sized thicknesses on the mesh
+        if self.property_combo.currentText() == str(property_id):
+            self.update_results_table(results)
+        if results:
+            print(f"Sizing of property {property_id} completed (job {job_id})")
+        else:
+            print(f"Sizing of property {property_id} returned no results (job {job_id})")
+
+    def on_sizing_job_finished(self, job_id, job):
+        print(f"Sizing job {job_id} finished")
+        if getattr(job, 'fsd_history', None):
+            print("FSD history (iteration / mass / worst RF):")
+            for entry in job.fsd_history:
+                print(f"  {entry['iteration']:3d}  {entry['mass']:.4f} kg  {entry['worst_rf']:.3f} (PID {entry['worst_property']})")
+        self.report_sized_masses(job.results, job.assembly_name)
+        if hasattr(self, 'nastran_switch') and self.nastran_switch.isChecked():
+            self.write_sized_properties(job.results)
+
+    def report_sized_masses(self, results_by_pid, assembly_name=None):
+        """
+        Print the deck and sized mass of the sized properties and of their assemblies,
+        the assembly of the job is shown in the mass label
+
+        Returns:
+            dict: assembly name -> (deck mass, sized mass) in kg
+        """
+        model_data = self.parent.model_data
+        thickness_overrides, area_overrides, material_overrides = {}, {}, {}
+        for pid, results in results_by_pid.items():
+            if not results:
+                continue
+            optimal_result = self.get_optimal_result(results)
+            sized_thickness = self.get_sized_thickness(pid, results)
+            if sized_thickness is not None:
+                thickness_overrides[pid] = sized_thickness
+            elif 'area' in optimal_result:
+                area_overrides[pid] = optimal_result['area']
+            # deck ply materials (PLY_MATERIALS) keep the material of the card
+            if optimal_result.get('critical_material') in self.material_db:
+                material_overrides[pid] = optimal_result['critical_material']
+        sized_pids = set(thickness_overrides) | set(area_overrides)
+        if not sized_pids:
+            return {}
+
+        deck = property_masses(model_data, self.material_db)
+        sized = property_masses(model_data, self.material_db, thickness_overrides, area_overrides, material_overrides)
+        print("Property mass, deck -> sized:")
+        for pid in sorted(sized_pids):
+            print(f"  PID {pid}: {deck.get(pid, 0.0):.4f} -> {sized.get(pid, 0.0):.4f} kg")
+
+        assemblies = {name: pids for name, pids in getattr(self.parent, 'assemblies', {}).items()
+                      if sized_pids & set(pids)}
+        deck_assembly, sized_assembly = assembly_masses(deck, assemblies), assembly_masses(sized, assemblies)
+        report = {name: (deck_assembly[name], sized_assembly[name]) for name in assemblies}
+        for name, (deck_mass, sized_mass) in report.items():
+            print(f"Assembly {name}: {deck_mass:.4f} -> {sized_mass:.4f} kg")
+        if hasattr(self, 'mass_label') and assembly_name in report:
+            deck_mass, sized_mass = report[assembly_name]
+            self.mass_label.setText(f"Mass {assembly_name}: {sized_mass:.3f} kg (deck {deck_mass:.3f} kg)")
+        return report
+
+    def on_sizing_job_failed(self, job_id, error_text):
+        QMessageBox.critical(self, "Error", f"Sizing job {job_id} failed:\n{error_text}")
+
+    def on_sizing_job_cancelled(self, job_id):
+        print(f"Sizing job {job_id} cancelled")
+
+    def on_sizing_queue_changed(self, pending):
+        if not hasattr(self, 'sizing_progress'):
+            return
+        self.queue_label.setText(f"Queue: {pending} job(s)" if pending else "Queue: empty")
+        if not pending:
+            self.cancel_sizing_btn.setEnabled(False)
+            self.sizing_progress.setFormat("Idle")
+
+    def show_results_for_property(self, property_id):
+        """Fill the table with stored results of a property or clear the output columns"""
+        if not hasattr(self, 'sizing_table'):
+            return
+        results = self.sizing_results.get(property_id)
         if results:
-            # Update table with results
             self.update_results_table(results)
-            print("Analysis completed successfully!")
         else:
-            print("Analysis failed or returned no results")
+            for row in range(2):
+                for col in range(4, 8):
+                    item = QTableWidgetItem("")
+                    item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
+                    self.sizing_table.setItem(row, col, item)
+
+    @staticmethod
+    def get_optimal_result(results):
+        """Record flagged 'is_optimal' (target RF met), the last one when the target was not reached"""
+        return next((result for result in results if result.get('is_optimal')), results[-1])
+
+    def get_sized_thickness(self, property_id, results):
+        """Total shell / laminate thickness of a sized property, None without shell result"""
+        prop = self.parent.model_data.bdf.properties.get(property_id)
+        if not results or prop is None:
+            return None
+        optimal_result = self.get_optimal_result(results)
+        if prop.type == "PSHELL":
+            return optimal_result['thickness']
+        if prop.type == "PCOMP" and 'stacking_sequence' in optimal_result:
+            return optimal_result['ply_thickness'] * len(optimal_result['stacking_sequence'])
+        if prop.type == "PCOMP":
+            # the whole stack is scaled, as written by build_property_updates
+            return prop.Thickness() * optimal_result['thickness'] / self.get_calculator().get_base_thickness(property_id)
+        return None
+
+    def build_property_updates(self, results_by_pid):
+        """Sized values per property in the form BdfPropertyPatcher.write expects"""
+        bdf = self.parent.model_data.bdf
+        updates = {}
+        for pid, results in results_by_pid.items():
+            if not results or pid not in bdf.properties:
+                continue
+            if not any(result.get('is_optimal') for result in results):
+                print(f"PID {pid} did not reach the target RF in the given range, not written")
+                continue
+            optimal_result = self.get_optimal_result(results)
+            thickness = optimal_result['thickness']
+            prop = bdf.properties[pid]
+            if prop.type == "PSHELL":
+                updates[pid] = {'t': thickness}
+            elif prop.type == "PCOMP" and 'stacking_sequence' in optimal_result:
+                # ply count sizing: the full symmetric stack is written ply by ply with the
+                # deck material it was sized with, library materials have no MID to write
+                mid = model_material_id(bdf, optimal_result['critical_material'])
+                if mid is None:
+                    print(f"PID {pid} was sized with library material {optimal_result['critical_material']}, "
+                          f"not written (select its deck MAT8 to write the plies)")
+                    continue
+                sout = prop.souts[0] if prop.souts else ""
+                plies = [(mid, optimal_result['ply_thickness'], angle, sout)
+                         for angle in optimal_result['stacking_sequence']]
+                updates[pid] = {'plies': plies, 'old_ply_count': len(prop.thicknesses)}
+                if prop.lam == "SYM":
+                    updates[pid]['lam'] = ""
+            elif prop.type == "PCOMP":
+                # the whole stack is scaled like the stresses were during sizing
+                scale = thickness / self.get_calculator().get_base_thickness(pid)
+                updates[pid] = {'thicknesses': [t * scale for t in prop.thicknesses]}
+            elif prop.type == "PBARL":
+                width = optimal_result.get('width', base_sizing_values(prop.Type, prop.dim)[1])
+                dims = sizing_dimensions(prop.Type, prop.dim, thickness, width)
+                updates[pid] = {'dims': [float(dim) for dim in dims]}
+        return updates
+
+    def write_sized_properties(self, results_by_pid):
+        """Write sized properties into a copy of the loaded deck (Update Nastran switch)"""
+        model_data = self.parent.model_data
+        updates = self.build_property_updates(results_by_pid)
+        skipped = sorted(pid for pid, results in results_by_pid.items() if results and pid not in updates)
+        if not updates:
+            print("No sized properties to write")
+            if skipped:
+                QMessageBox.warning(self, "Update Nastran", f"Nothing written, not sized to the target RF: "
+                                    f"{', '.join(map(str, skipped))}")
+            return None
+        try:
+            if model_data.property_patcher is None:
+                model_data.property_patcher = BdfPropertyPatcher(model_data.bdf_file)
+            output = model_data.property_patcher.write(updates)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not write sized properties:\n{e}")
+            return None
+        text = f"{len(updates)} properties written to\n{output}"
+        if skipped:
+            text += f"\n\nNot written (target RF not reached or library ply material): {', '.join(map(str, skipped))}"
+        QMessageBox.information(self, "Update Nastran", text)
+        return output
 
     def update_results_table(self, results):
         """Update the sizing table with analysis results"""
         if not results:
             return
         
-        # Find the optimal result (first one that meets target RF)
-        optimal_result = results[-1]  # Last result is typically the optimal one -> WHAT !?
+        optimal_result = self.get_optimal_result(results)
         
         # Update the Result column (column 4) with optimal thickness
         result_item = QTableWidgetItem(f"{optimal_result['thickness']:.2f}")
         result_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
+        if 'ply_counts' in optimal_result:
+            # Ply count sizing: plies per orientation and the written stacking sequence
+            result_item.setToolTip("\n".join(
+                [f"{angle:g}°: {count} plies" for angle, count in optimal_result['ply_counts'].items()] +
+                ["[" + "/".join(f"{angle:g}" for angle in optimal_result['stacking_sequence']) + "]"]))
         self.sizing_table.setItem(0, 4, result_item)  # Row 0 (Thickness), Column 4 (Result)
         
         # Update the RF column (column 5) with minimum RF
@@ -612,15 +978,30 @@ class SizingTab(QWidget):
         rf_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
         self.sizing_table.setItem(0, 5, rf_item)  # Row 0 (Thickness), Column 5 (RF)
         
-        # Update the Failure column (column 6) with failure type
-        failure_item = QTableWidgetItem(self.failures[0] if self.failures else "N/A")
+        # Update the Failure column (column 6) with the critical failure type
+        failure_item = QTableWidgetItem(optimal_result.get('critical_failure_type') or "N/A")
         failure_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
         self.sizing_table.setItem(0, 6, failure_item)  # Row 0 (Thickness), Column 6 (Failure)
         
-        # Update the Material column (column 6) with failure type
-        material_item = QTableWidgetItem(self.materials[0] if self.failures else "N/A")
+        # Update the Material column (column 7) with the critical material
+        material_item = QTableWidgetItem(optimal_result.get('critical_material') or "N/A")
         material_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
-        self.sizing_table.setItem(0, 7, material_item)  # Row 0 (Thickness), Column 6 (Failure)
+        if optimal_result.get('material_ranking'):
+            # Candidate materials by mass at their own required size
+            material_item.setToolTip("\n".join(
+                f"{entry['material']}: {entry['mass']:.4f} kg" if entry['mass'] != float('inf')
+                else f"{entry['material']}: target RF not reached"
+                for entry in optimal_result['material_ranking']))
+        self.sizing_table.setItem(0, 7, material_item)  # Row 0 (Thickness), Column 7 (Material)
+
+        # Bar sizing also returns a width (Row 1)
+        if 'width' in optimal_result:
+            for col, text in ((4, f"{optimal_result['width']:.2f}"), (5, f"{optimal_result['min_rf']:.3f}"),
+                              (6, optimal_result.get('critical_failure_type') or "N/A"),
+                              (7, optimal_result.get('critical_material') or "N/A")):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
+                self.sizing_table.setItem(1, col, item)
 
         print(f"Updated table: Thickness={optimal_result['thickness']:.2f}, RF={optimal_result['min_rf']:.3f}")
 
@@ -0,0 +1,251 @@
+import threading
+import traceback
+from collections import deque
+from itertools import count
+from PySide6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, Signal, Slot
+from tinysizer.sizing.calculations import SizingCancelled
+from tinysizer.sizing.fsd import run_fully_stressed_design
+
+
+class SizingJobSignals(QObject):
+    """Signals emitted by a running SizingJob (QRunnable can't own signals itself)"""
+    started = Signal(int)                       # job id
+    progress = Signal(int, int, int, int, int)  # job id, property idx, property count, thickness step, step count
+    property_done = Signal(int, int, object)    # job id, property id, results list
+    finished = Signal(int, object)              # job id, {property id: results}
+    failed = Signal(int, str)                   # job id, error text
+    cancelled = Signal(int)                     # job id
+
+
+class SizingJob(QRunnable):
+    """
+    One queued sizing request: a list of properties sized with the same settings.
+
+    The job runs Calculator.rf_materialStrength (mode "sweep") or the fully stressed
+    design over all its properties at once (mode "fsd") on a worker thread and reports
+    back through SizingJobSignals, so the GUI thread never blocks on a sweep. The model
+    data is taken when the job is created and the calculator is pinned to it while the
+    job runs (Calculator.job_snapshot).
+    """
+    def __init__(self, job_id, calculator, assembly_name, property_ids, materials, failure_types,
+                 thickness_range, assembly_type="web", target_rf=1.1, width_range=None, mode="sweep"):
+        super().__init__()
+        self.setAutoDelete(False)  # queue keeps a reference for cancellation and bookkeeping
+        self.job_id = job_id
+        self.calculator = calculator
+        self.model_data = calculator.parent.model_data
+        self.assembly_name = assembly_name
+        self.property_ids = list(property_ids)
+        self.materials = list(materials)
+        self.failure_types = list(failure_types)
+        self.thickness_range = thickness_range
+        self.width_range = width_range
+        self.assembly_type = assembly_type
+        self.target_rf = target_rf
+        self.mode = mode
+        self.results = {}
+        self.fsd_history = []
+        self.signals = SizingJobSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Request cancellation, checked by the calculator between thickness steps"""
+        self.cancel_event.set()
+
+    @property
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def describe(self):
+        """Short human readable label for status bars and queue listings"""
+        prefix = "FSD " if self.mode == "fsd" else ""
+        if len(self.property_ids) == 1:
+            return f"{prefix}{self.assembly_name} / PID {self.property_ids[0]}"
+        return f"{prefix}{self.assembly_name} ({len(self.property_ids)} properties)"
+
+    def run_fsd(self):
+        """All properties resized together, every property gets a one record result list"""
+        def report(iteration, iteration_count):
+            self.signals.progress.emit(self.job_id, 0, 1, iteration, iteration_count)
+
+        fsd = run_fully_stressed_design(
+            self.calculator, self.property_ids, self.materials, self.failure_types,
+            target_rf=self.target_rf,
+            gauge_limits=(self.thickness_range[0], self.thickness_range[1]),
+            progress_callback=report,
+            cancel_event=self.cancel_event
+        )
+        self.fsd_history = fsd['history']
+        for property_id, record in fsd['properties'].items():
+            self.results[property_id] = [record]
+            self.signals.property_done.emit(self.job_id, property_id, [record])
+
+    def run_sweeps(self):
+        """Properties sized one after the other (Calculator.rf_materialStrength)"""
+        prop_count = len(self.property_ids)
+        for prop_idx, property_id in enumerate(self.property_ids):
+            def report(step, step_count, prop_idx=prop_idx):
+                self.signals.progress.emit(self.job_id, prop_idx, prop_count, step, step_count)
+
+            results = self.calculator.rf_materialStrength(
+                materials=self.materials,
+                failure_types=self.failure_types,
+                property_id=property_id,
+                thickness_range=self.thickness_range,
+                assembly_type=self.assembly_type,
+                target_rf=self.target_rf,
+                progress_callback=report,
+                cancel_event=self.cancel_event,
+                width_range=self.width_range
+            )
+            self.results[property_id] = results
+            self.signals.property_done.emit(self.job_id, property_id, results)
+
+    def run(self):
+        if self.is_cancelled:
+            self.signals.cancelled.emit(self.job_id)
+            return
+
+        self.signals.started.emit(self.job_id)
+
+        try:
+            with self.calculator.job_snapshot(self.model_data):
+                if self.mode == "fsd":
+                    self.run_fsd()
+                else:
+                    self.run_sweeps()
+
+        except SizingCancelled:
+            self.signals.cancelled.emit(self.job_id)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.job_id, str(e))
+            return
+
+        self.signals.finished.emit(self.job_id, self.results)
+
+
+class SizingQueue(QObject):
+    """
+    FIFO queue of SizingJobs executed one at a time on a private QThreadPool.
+
+    Jobs share the loaded model (pyNastran objects are not thread safe), so only a
+    single worker thread is used; the GUI stays responsive and more jobs can be queued
+    while one is running.
+    """
+    job_started = Signal(int, str)                  # job id, description
+    job_progress = Signal(int, int, int, int, int)  # job id, property idx, property count, step, step count
+    property_done = Signal(int, int, object)        # job id, property id, results
+    job_finished = Signal(int, object)              # job id, SizingJob
+    job_failed = Signal(int, str)                   # job id, error text
+    job_cancelled = Signal(int)                     # job id
+    queue_changed = Signal(int)                     # number of pending (not yet finished) jobs
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pending = deque()
+        self.running = None
+        self.jobs = {}
+        self._ids = count(1)
+
+    def create_job(self, *args, **kwargs):
+        """Build a SizingJob with a fresh id (see SizingJob for arguments)"""
+        return SizingJob(next(self._ids), *args, **kwargs)
+
+    def submit(self, job):
+        """Queue a job; it starts as soon as the worker is free"""
+        # bound slots on this (GUI thread) object make Qt queue worker-thread emissions
+        job.signals.started.connect(self._on_started)
+        job.signals.progress.connect(self.job_progress)
+        job.signals.property_done.connect(self.property_done)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.cancelled.connect(self._on_cancelled)
+
+        self.jobs[job.job_id] = job
+        self.pending.append(job)
+        self._start_next()
+        self.queue_changed.emit(self.pending_count())
+        return job.job_id
+
+    def cancel(self, job_id):
+        """Cancel a pending or running job"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.cancel()
+        if job in self.pending:
+            self.pending.remove(job)
+            del self.jobs[job_id]
+            self.job_cancelled.emit(job_id)
+            self.queue_changed.emit(self.pending_count())
+
+    def cancel_all(self):
+        """Drop every pending job and stop the running one"""
+        for job in list(self.pending):
+            self.cancel(job.job_id)
+        if self.running is not None:
+            self.running.cancel()
+
+    def cancel_all_and_wait(self, timeout_ms=-1):
+        """
+        Cancel every job and wait until the worker thread is idle
+
+        Reloading the model or the material library has to wait for this, cancel_all
+        alone leaves the running job going until its next thickness step.
+
+        Returns:
+            bool: True when no job is left
+        """
+        self.cancel_all()
+        self.pool.waitForDone(timeout_ms)
+        # deliver the queued signals of the stopped job, which reset self.running
+        QCoreApplication.processEvents()
+        return not self.is_busy()
+
+    def pending_count(self):
+        return len(self.pending) + (1 if self.running is not None else 0)
+
+    def is_busy(self):
+        return self.running is not None or bool(self.pending)
+
+    def _start_next(self):
+        if self.running is not None or not self.pending:
+            return
+        self.running = self.pending.popleft()
+        self.pool.start(self.running)
+
+    @Slot(int)
+    def _on_started(self, job_id):
+        job = self.jobs.get(job_id)
+        self.job_started.emit(job_id, job.describe() if job else "")
+
+    @Slot(int, object)
+    def _on_finished(self, job_id, _results):
+        self._on_job_done(job_id, "finished")
+
+    @Slot(int, str)
+    def _on_failed(self, job_id, text):
+        self._on_job_done(job_id, "failed", text)
+
+    @Slot(int)
+    def _on_cancelled(self, job_id):
+        self._on_job_done(job_id, "cancelled")
+
+    def _on_job_done(self, job_id, state, text=""):
+        job = self.jobs.pop(job_id, None)
+        if self.running is not None and self.running.job_id == job_id:
+            self.running = None
+
+        if state == "finished":
+            self.job_finished.emit(job_id, job)
+        elif state == "failed":
+            self.job_failed.emit(job_id, text)
+        else:
+            self.job_cancelled.emit(job_id)
+
+        self._start_next()
+        self.queue_changed.emit(self.pending_count())
@@ -4,6 +4,8 @@ import pandas as pd
 from matplotlib import cm
 from PySide6.QtWidgets import QFrame, QVBoxLayout
 from pyvistaqt import QtInteractor
+from tinysizer.file.envelope import ENVELOPE, object_arrays
+from tinysizer.file.principal import parse_derived_component
 
 class PyVistaMeshPlotter(QFrame):
     def __init__(self, parent=None):
@@ -456,13 +458,24 @@ class PyVistaMeshPlotter(QFrame):
                                 if eid in result_data and cell_idx < len(element_values):
                                     element_values[cell_idx] = result_data[eid]
                             
-                            # Add as cell data
-                            surface_mesh.cell_data[scalar_label] = element_values
+                            averaging = getattr(model_data, 'nodal_averaging', "none")
+                            averaged_mesh = None
+                            if averaging != "none":
+                                averaged_mesh = self.nodal_averaged_mesh(model_data, surface_mesh, node_id_to_idx,
+                                                                         list(cell_to_element_map.values()),
+                                                                         result_type, subcase_id, component,
+                                                                         scalar_label, averaging == "nodal by property")
+                            if averaged_mesh is not None:
+                                surface_mesh = averaged_mesh
+                            else:
+                                # Add as cell data
+                                surface_mesh.cell_data[scalar_label] = element_values
                             
                             # Add the mesh with the results
                             self.plotter.add_mesh(surface_mesh, scalars=scalar_label, show_edges=True,
-                                                cmap='jet', edge_color='black', line_width=1.5,
+                                                cmap='jet', edge_color='black', line_width=1.5, nan_color=[0.8, 0.8, 0.8],
                                                 scalar_bar_args={"title": f"{result_type} ({scalar_label})"})
+                            self.add_principal_glyphs(model_data, result_type, subcase_id, component)
         
                     else:
                         # No result data, add mesh with default appearance
@@ -535,12 +548,110 @@ class PyVistaMeshPlotter(QFrame):
 
         print("Rendering complete")
 
+    def nodal_averaged_mesh(self, model_data, surface_mesh, node_id_to_idx, cell_element_ids,
+                            result_type, subcase_id, component, scalar_label, by_property=False):
+        """
+        Surface mesh with nodal averaged element results as point data
+
+        Plain averages go on the shared points of surface_mesh; averages by property need
+        a split mesh where every cell has its own corner points, so contours stay
+        discontinuous across property boundaries. None when there is nothing to average.
+        """
+        nodal = model_data.get_nodal_result(result_type, subcase_id, component, by_property=by_property)
+        if nodal is None:
+            return None
+
+        if not by_property:
+            node_values = np.full(surface_mesh.n_points, np.nan)
+            for nid, value in zip(nodal[0].tolist(), nodal[1].tolist()):
+                if nid in node_id_to_idx:
+                    node_values[node_id_to_idx[nid]] = value
+            surface_mesh.point_data[scalar_label] = node_values
+            return surface_mesh
+
+        geometry = model_data.get_geometry()
+        element_ids, corner_nodes, corner_values = nodal
+        cell_element_ids = np.asarray(cell_element_ids, dtype=int)
+        cell_element_ids = cell_element_ids[np.isin(cell_element_ids, geometry.shell_ids)]
+        if len(cell_element_ids) == 0:
+            return None
+        # Corner values of every cell (NaN for elements without a result)
+        cell_values = np.full((len(cell_element_ids), 4), np.nan)
+        found = np.isin(cell_element_ids, element_ids)
+        order = np.argsort(element_ids)
+        cell_values[found] = corner_values[order[np.searchsorted(element_ids, cell_element_ids[found], sorter=order)]]
+
+        rows = geometry.shell_rows(cell_element_ids)
+        n_corner = np.where(geometry.shell_types[rows] == "CTRIA3", 3, 4)
+        used = np.arange(4)[None, :] < n_corner[:, None]
+        points = geometry.xyz[geometry.node_rows(geometry.shell_nodes[rows][used])]
+        # Faces [n, i0, ..., in-1] over consecutive points, one block of points per cell
+        starts = np.cumsum(n_corner) - n_corner
+        faces = np.empty(len(points) + len(n_corner), dtype=int)
+        header = starts + np.arange(len(n_corner))
+        is_point = np.ones(len(faces), dtype=bool)
+        is_point[header] = False
+        faces[header] = n_corner
+        faces[is_point] = np.arange(len(points))
+        split_mesh = pv.PolyData(points, faces=faces)
+        split_mesh.point_data[scalar_label] = cell_values[used]
+        return split_mesh
+
+    def add_principal_glyphs(self, model_data, result_type, subcase_id, component):
+        """
+        Arrows along the principal directions of a derived principal component
+
+        One arrow per shell at its centroid, in the element plane at the principal angle
+        from the element x axis (direction 2 for "principal 2"), sized to the element. The
+        angle comes from the row (corner, fibre) the displayed value was reduced from. All
+        arrows are instances of one arrow source (glyph filter) added as a single actor.
+        Ply results are in ply material axes, they get no arrows.
+        """
+        parsed = parse_derived_component(component)
+        geometry = model_data.get_geometry()
+        if parsed is None or subcase_id == ENVELOPE or geometry is None:
+            return
+        label, quantity = parsed
+        if label == "ply":
+            print("Principal directions of ply results are in ply material axes, no arrows drawn")
+            return
+        element_ids, angle = [], []
+        for result_obj in model_data.results.get(result_type, {}).get(subcase_id, []):
+            arrays = object_arrays(result_obj, result_type, component, model_data.element_reduction,
+                                   companion=f"{label} principal angle")
+            if arrays is not None:
+                element_ids.append(arrays[0])
+                angle.append(arrays[2])
+        if not element_ids:
+            return
+        element_ids, angle = np.concatenate(element_ids), np.concatenate(angle)
+        shells = np.isin(element_ids, geometry.shell_ids) & ~np.isnan(angle)
+        element_ids, angle = element_ids[shells], angle[shells]
+        if len(element_ids) == 0:
+            return
+
+        if quantity == "principal 2":
+            angle = angle + 90.0
+        x_axes, y_axes, _ = geometry.get_shell_axes(element_ids)
+        theta = np.radians(angle)[:, None]
+        directions = np.cos(theta) * x_axes + np.sin(theta) * y_axes
+        lengths = 0.6 * np.sqrt(geometry.get_shell_areas(element_ids))
+
+        # arrows centred on the centroids
+        starts = geometry.get_centroids(element_ids) - 0.5 * lengths[:, None] * directions
+        sources = pv.PolyData(starts)
+        sources.point_data['direction'] = directions
+        sources.point_data['length'] = lengths
+        arrows = sources.glyph(orient='direction', scale='length', factor=1.0, geom=pv.Arrow())
+        self.plotter.add_mesh(arrows, color='black', name='principal_directions', show_scalar_bar=False)
+
     #BUGGGGGGGGGY!-ymn / not properly but works-bydar
     def colorize_by_property(self, model_data):
         import matplotlib.colors as mcolors
         from collections import defaultdict
 
         pid2eid = model_data.bdf.get_property_id_to_element_ids_map()
+        geometry = model_data.get_geometry()
         golden_ratio = 0.618033988749895
 
         self.plotter.clear()
@@ -551,9 +662,8 @@ class PyVistaMeshPlotter(QFrame):
             hue = (i * golden_ratio) % 1.0
             rgb = mcolors.hsv_to_rgb([hue, 0.85, 0.95])
 
-            nodes = set()
-            for eid in elids:
-                nodes.update(model_data.bdf.elements[eid].nodes)
+            elids = np.asarray(elids, dtype=int)
+            nodes = geometry.nodes_of_elements(elids[np.isin(elids, geometry.element_ids)]).tolist()
 
             node_id_to_idx = {}
             points = []